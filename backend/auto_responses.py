@@ -1,8 +1,19 @@
 """
 Sistema de Respostas Automáticas baseado em Refugies.info
 Fornece informações úteis automaticamente quando alguém posta pedindo ajuda
+
+As mensagens automáticas guardam só uma referência ao modelo
+({'category', 'version'}); o texto vem da tabela em memória na leitura
+(expand_auto_response). Versões antigas ficam na coleção
+auto_response_templates para que mensagens antigas continuem legíveis;
+versões gravadas depois do startup (migração, outro worker) são buscadas
+no banco na primeira leitura (expand_auto_responses).
 """
 
+import hashlib
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
 AUTO_RESPONSES = {
     "work": {
         "title": "🔍 Recursos para Emprego",
@@ -314,3 +325,95 @@ def format_auto_response_post(category: str, original_post_id: str) -> dict:
         "is_auto_response": True,
         "reply_to": original_post_id
     }
+
+
+# ==================== MODELOS POR REFERÊNCIA ====================
+
+# (categoria, versão) -> texto da mensagem; strings internadas, uma cópia por versão
+_TEMPLATES: Dict[Tuple[str, str], str] = {}
+
+
+def auto_response_text(response: dict) -> str:
+    """Texto da mensagem automática (título + conteúdo)"""
+    return f"{response['title']}\n\n{response['content']}"
+
+
+def template_version(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def register_template(category: str, version: str, text: str) -> None:
+    _TEMPLATES[(category, version)] = sys.intern(text)
+
+
+def get_template(category: str, version: str) -> Optional[str]:
+    return _TEMPLATES.get((category, version))
+
+
+def auto_response_ref(category: str) -> Optional[dict]:
+    """Referência compacta à versão atual do modelo da categoria"""
+    response = get_auto_response(category)
+    if not response:
+        return None
+    return {'category': category, 'version': template_version(auto_response_text(response))}
+
+
+def expand_auto_response(message: dict) -> dict:
+    """Preenche `message` de uma mensagem automática guardada por referência"""
+    ref = message.get('auto_response')
+    if ref and 'message' not in message:
+        text = get_template(ref['category'], ref['version'])
+        if text is None:
+            # Versão desconhecida (ex.: removida do banco): usa o texto atual
+            response = get_auto_response(ref['category'])
+            text = auto_response_text(response) if response else ''
+        message['message'] = text
+    return message
+
+
+async def load_missing_templates(db, refs: Iterable[dict]) -> None:
+    """Busca no banco (uma consulta) as versões ainda ausentes da tabela em memória"""
+    missing = {
+        (ref['category'], ref['version']) for ref in refs
+        if get_template(ref['category'], ref['version']) is None
+    }
+    if not missing:
+        return
+    query = {'$or': [{'category': category, 'version': version} for category, version in missing]}
+    async for template in db.auto_response_templates.find(query, {'_id': 0}):
+        register_template(template['category'], template['version'], template['text'])
+
+
+async def expand_auto_responses(db, messages: List[dict]) -> List[dict]:
+    """expand_auto_response para uma lista, carregando antes as versões que faltam"""
+    refs = [message['auto_response'] for message in messages
+            if message.get('auto_response') and 'message' not in message]
+    await load_missing_templates(db, refs)
+    return [expand_auto_response(message) for message in messages]
+
+
+async def sync_templates(db) -> int:
+    """
+    Grava as versões atuais em auto_response_templates e carrega todas
+    (atuais e antigas) na tabela em memória. Executado no startup.
+    """
+    for category, response in AUTO_RESPONSES.items():
+        text = auto_response_text(response)
+        version = template_version(text)
+        await db.auto_response_templates.update_one(
+            {'category': category, 'version': version},
+            {'$setOnInsert': {'category': category, 'version': version, 'text': text}},
+            upsert=True
+        )
+    async for template in db.auto_response_templates.find({}, {'_id': 0}):
+        register_template(template['category'], template['version'], template['text'])
+    return len(_TEMPLATES)
+
+
+def _register_current_templates() -> None:
+    for category, response in AUTO_RESPONSES.items():
+        text = auto_response_text(response)
+        register_template(category, template_version(text), text)
+
+
+_register_current_templates()
@@ -0,0 +1,138 @@
+"""
+Benchmark: feed de voluntário por consulta filtrada x timelines (fan-out)
+
+    cd backend && MONGO_URL=mongodb://localhost:27017 \\
+        python benchmarks/bench_feed_timelines.py [--posts 100000] [--reads 200]
+
+Precisa de um MongoDB de verdade. Usa o banco `bench_feed` (apagado no
+início), cria os índices de indexes.py e mede a latência de leitura da
+primeira e da segunda página para voluntários com 1 a 4 categorias:
+- consulta: $or (ofertas + pedidos das categorias), ordenada por (created_at, id)
+- timeline: intercalação dos buckets + busca dos posts por id
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from indexes import ensure_indexes  # noqa: E402
+from timelines import TimelineStore, bucket_keys  # noqa: E402
+
+CATEGORIES = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'transport']
+FEED_SORT = [('created_at', -1), ('id', -1)]
+
+
+def make_posts(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': f'p{i:07d}',
+            'user_id': f'u{rng.randrange(5000)}',
+            'type': 'need' if rng.random() < 0.7 else 'offer',
+            'category': rng.choice(CATEGORIES),
+            'title': f'Post {i}',
+            'description': 'x' * rng.randint(50, 400),
+            'created_at': start + timedelta(seconds=i * 30),
+        }
+        for i in range(count)
+    ]
+
+
+async def query_page(db, categories: list, limit: int, after=None) -> list:
+    query = {'$or': [{'type': 'offer'}, {'type': 'need', 'category': {'$in': categories}}]}
+    if after is not None:
+        query = {'$and': [query, {'$or': [{'created_at': {'$lt': after[0]}},
+                                          {'created_at': after[0], 'id': {'$lt': after[1]}}]}]}
+    return await db.posts.find(query, {'_id': 0}).sort(FEED_SORT).to_list(limit)
+
+
+async def timeline_page(db, timelines: TimelineStore, categories: list, limit: int, after=None) -> list:
+    ids = await timelines.page(categories, after, limit)
+    if ids is None:
+        return await query_page(db, categories, limit, after)
+    posts = {post['id']: post async for post in db.posts.find({'id': {'$in': ids}}, {'_id': 0})}
+    return [posts[post_id] for post_id in ids]
+
+
+async def measure(read, profiles: list) -> dict:
+    first, second = [], []
+    for categories in profiles:
+        start = time.perf_counter()
+        page = await read(categories, None)
+        first.append(time.perf_counter() - start)
+        last = page[-1]
+        start = time.perf_counter()
+        await read(categories, (last['created_at'], last['id']))
+        second.append(time.perf_counter() - start)
+    return {'page 1': first, 'page 2': second}
+
+
+def describe(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"p50 {statistics.median(samples) * 1000:6.2f} ms | p95 {p95 * 1000:6.2f} ms"
+
+
+async def main(args) -> None:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[args.db]
+    await client.drop_database(args.db)
+    await ensure_indexes(db)
+
+    posts = make_posts(args.posts)
+    start = time.perf_counter()
+    for i in range(0, len(posts), 5000):
+        await db.posts.insert_many(posts[i:i + 5000])
+    print(f"{len(posts)} posts inseridos em {time.perf_counter() - start:.1f}s")
+
+    timelines = TimelineStore(db, cap=args.cap)
+    start = time.perf_counter()
+    for key in bucket_keys(CATEGORIES):
+        await timelines.warm(key)
+    print(f"{len(CATEGORIES) + 1} buckets aquecidos em {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"(cap {args.cap})")
+
+    # Custo do fan-out por post novo (um $push com $sort/$slice)
+    extra = make_posts(args.posts + 200, seed=7)[args.posts:]
+    start = time.perf_counter()
+    for post in extra:
+        await db.posts.insert_one(post)
+        await timelines.fan_out(post)
+    print(f"create_post + fan-out: {(time.perf_counter() - start) / len(extra) * 1000:.2f} ms por post")
+
+    rng = random.Random(1)
+    profiles = [rng.sample(CATEGORIES, rng.randint(1, 4)) for _ in range(args.reads)]
+    modes = {
+        'consulta': lambda cats, after: query_page(db, cats, args.limit, after),
+        'timeline': lambda cats, after: timeline_page(db, timelines, cats, args.limit, after),
+    }
+    for name, read in modes.items():
+        await measure(read, profiles[:20])  # aquece cache do Mongo
+        results = await measure(read, profiles)
+        for page, samples in results.items():
+            print(f"  {name:9s} {page}: {describe(samples)}")
+    print(f"timelines: {timelines.stats()}")
+
+    await client.drop_database(args.db)
+    client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--cap', type=int, default=500)
+    parser.add_argument('--db', default='bench_feed')
+    asyncio.run(main(parser.parse_args()))
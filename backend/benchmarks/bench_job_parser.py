@@ -0,0 +1,103 @@
+"""
+Benchmark: regex sobre a página inteira x parser incremental (job_sources)
+
+    cd backend && python benchmarks/bench_job_parser.py [--repeat 20]
+
+Usa a página salva em benchmarks/fixtures/rozgarline_home.html e versões
+ampliadas dela (o conteúdo de <main> repetido) para simular páginas grandes.
+"""
+
+import argparse
+import codecs
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from job_sources import STREAM_CHUNK_SIZE, RozgarLineSource  # noqa: E402
+
+FIXTURE = BENCH_DIR / 'fixtures' / 'rozgarline_home.html'
+JOB_PATTERN = r'<a[^>]*href="(https://rozgarline\.me/jobs/[^"]+)"[^>]*>([^<]+)</a>'
+
+
+def regex_whole_page(page: bytes, max_jobs: int = 15) -> list:
+    """Implementação anterior: decodifica tudo e roda o regex na página inteira"""
+    html = page.decode('utf-8')
+    jobs = []
+    seen_titles = set()
+    for url, title in re.findall(JOB_PATTERN, html):
+        clean_title = title.strip()
+        if clean_title and clean_title not in seen_titles and len(clean_title) > 5:
+            if 'more' not in clean_title.lower() and 'author' not in url:
+                seen_titles.add(clean_title)
+                jobs.append({'title': clean_title, 'url': url})
+    return jobs[:max_jobs]
+
+
+def streaming(page: bytes, source: RozgarLineSource) -> list:
+    """Mesmo caminho de read_jobs_streaming, sem a rede"""
+    parser = source.create_parser()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    received = 0
+    for start in range(0, len(page), STREAM_CHUNK_SIZE):
+        chunk = page[start:start + STREAM_CHUNK_SIZE]
+        received += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or received >= source.max_bytes:
+            break
+    parser.close()
+    return parser.jobs
+
+
+def enlarge(page: bytes, factor: int) -> bytes:
+    head, rest = page.split(b'<main', 1)
+    main, tail = rest.split(b'</main>', 1)
+    return head + b'<main' + main * factor + b'</main>' + tail
+
+
+def measure(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(repeat: int) -> None:
+    base = FIXTURE.read_bytes()
+    early_stop = RozgarLineSource()
+    full_scan = RozgarLineSource(max_jobs=10 ** 6)
+    full_scan.max_bytes = 10 ** 9
+
+    print(f"{'página':>10} {'método':<26} {'tempo (ms)':>11} {'pico mem (KB)':>14} {'vagas':>6}")
+    for factor in (1, 10, 50):
+        page = enlarge(base, factor) if factor > 1 else base
+        label = f"{len(page) // 1024} KB"
+        runs = [
+            ('regex (página inteira)', lambda: regex_whole_page(page)),
+            ('streaming (early stop)', lambda: streaming(page, early_stop)),
+            ('streaming (sem limite)', lambda: streaming(page, full_scan)),
+        ]
+        reference = None
+        for name, fn in runs:
+            jobs, elapsed, peak = measure(fn, repeat)
+            if reference is None:
+                reference = [job['url'] for job in jobs]
+            elif name.endswith('(early stop)') and [job['url'] for job in jobs] != reference:
+                print('  ⚠️  resultado diferente do regex')
+            print(f"{label:>10} {name:<26} {elapsed * 1000:>11.2f} {peak / 1024:>14.0f} {len(jobs):>6}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    main(parser.parse_args().repeat)
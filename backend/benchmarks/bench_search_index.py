@@ -0,0 +1,91 @@
+"""
+Benchmark: varredura por substring x índice BM25 (search_index)
+
+    cd backend && python benchmarks/bench_search_index.py [--docs 50000]
+
+O corpus é sintético: trechos da base de conhecimento do Watizat
+recombinados com palavras aleatórias, para simular um guia inteiro
+dividido em milhares de trechos.
+"""
+
+import argparse
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pdf_processor import CATEGORY_KEYWORDS, WatizatPDFProcessor  # noqa: E402
+from search_index import BM25Index, fold  # noqa: E402
+
+QUERIES = [
+    'Onde posso comer de graça?',
+    'preciso de um médico urgente',
+    'abrigos para dormir esta noite',
+    'como pedir asilo, preciso de advogado',
+    'escolas para minhas crianças',
+    'procuro emprego em Paris',
+    'cursos de francês gratuitos',
+    'documentos para a prefeitura',
+]
+
+
+def build_corpus(size: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    knowledge_base = WatizatPDFProcessor().knowledge_base
+    sentences = [(cat, text) for cat, texts in knowledge_base.items() for text in texts]
+    vocabulary = sorted({word for _, text in sentences for word in text.split()})
+    corpus = []
+    for _ in range(size):
+        category, text = rng.choice(sentences)
+        filler = ' '.join(rng.choices(vocabulary, k=rng.randint(10, 40)))
+        keywords = ' '.join(CATEGORY_KEYWORDS.get(category, ()))
+        corpus.append(f"{text} {filler} {keywords}")
+    return corpus
+
+
+def substring_scan(corpus: list, folded: list, query: str, k: int) -> list:
+    """Generalização da busca antiga: conta palavras da pergunta contidas em cada trecho"""
+    words = [word for word in fold(query).split() if len(word) > 3]
+    scores = []
+    for doc_id, text in enumerate(folded):
+        hits = sum(1 for word in words if word in text)
+        if hits:
+            scores.append((hits, -doc_id))
+    return [-doc for _, doc in heapq.nlargest(k, scores)]
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main(sizes: list, k: int) -> None:
+    for size in sizes:
+        corpus = build_corpus(size)
+        folded, fold_time = timed(lambda: [fold(text) for text in corpus])
+        index, build_time = timed(lambda: BM25Index(corpus))
+
+        _, scan_time = timed(lambda: [substring_scan(corpus, folded, q, k) for q in QUERIES])
+        _, bm25_time = timed(lambda: [index.search(q, k) for q in QUERIES], repeat=5)
+        batch = QUERIES * 25
+        _, batch_time = timed(lambda: index.search_batch(batch, k), repeat=5)
+
+        print(f"{size} trechos (k={k})")
+        print(f"  preparo:   fold {fold_time * 1000:.0f} ms | índice BM25 {build_time * 1000:.0f} ms "
+              f"({len(index.postings)} termos)")
+        print(f"  por busca: substring {scan_time / len(QUERIES) * 1000:.2f} ms | "
+              f"BM25 {bm25_time / len(QUERIES) * 1000:.2f} ms")
+        print(f"  lote de {len(batch)} buscas (BM25): {batch_time * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+    main(args.docs, args.k)
@@ -0,0 +1,113 @@
+"""
+Armazenamento compacto dos trechos do guia (gerado por ingest_pdfs.py)
+
+    knowledge_store/
+        manifest.json   fontes (PDF, sha1, páginas com fingerprint), parâmetros, embedder
+        chunks.bin      textos UTF-8 concatenados
+        offsets.npy     int64 (n + 1): trecho i = chunks.bin[offsets[i]:offsets[i + 1]]
+        pages.npy       int32 (n x 2): índice da fonte e número da página de cada trecho
+        vectors.npy     float32 (n x dim), só para embedders sem estado (opcional)
+
+Tudo é aberto com memory-map: só os trechos acessados são lidos do disco.
+"""
+
+import json
+import mmap
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+STORE_VERSION = 1
+
+
+class ChunkStore(Sequence):
+    """Leitura (somente) de um knowledge_store; funciona como uma lista de textos"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST, encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"unsupported chunk store version: {self.manifest.get('version')}")
+
+        self.offsets = np.load(self.path / 'offsets.npy', mmap_mode='r')
+        self.pages = np.load(self.path / 'pages.npy', mmap_mode='r')
+        vectors_path = self.path / 'vectors.npy'
+        self.vectors: Optional[np.ndarray] = (
+            np.load(vectors_path, mmap_mode='r') if vectors_path.exists() else None
+        )
+
+        blob_size = int(self.offsets[-1]) if len(self.offsets) else 0
+        self._blob = None
+        if blob_size:
+            with open(self.path / 'chunks.bin', 'rb') as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def exists(cls, path: Path) -> bool:
+        return (Path(path) / MANIFEST).exists()
+
+    @property
+    def sources(self) -> List[dict]:
+        return self.manifest['sources']
+
+    @property
+    def embedder_key(self) -> Optional[str]:
+        return self.manifest.get('embedder')
+
+    def __len__(self):
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._blob[start:end].decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def location(self, i: int) -> Tuple[str, int]:
+        """(arquivo, página) de onde veio o trecho i"""
+        source, page = self.pages[i]
+        return self.sources[int(source)]['name'], int(page)
+
+
+def write_chunk_store(path: Path, chunks: Sequence[str], pages: np.ndarray, manifest: dict,
+                      vectors: Optional[np.ndarray] = None) -> None:
+    """
+    Grava o knowledge_store. Cada arquivo é escrito como .tmp e renomeado;
+    o manifest por último, então um leitor nunca vê um manifest novo com dados velhos.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    encoded = [chunk.encode('utf-8') for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+
+    def replace(name: str, write) -> None:
+        tmp = path / f"{name}.tmp"
+        with open(tmp, 'wb') as f:
+            write(f)
+        os.replace(tmp, path / name)
+
+    replace('chunks.bin', lambda f: f.writelines(encoded))
+    replace('offsets.npy', lambda f: np.save(f, offsets))
+    replace('pages.npy', lambda f: np.save(f, np.asarray(pages, dtype=np.int32).reshape(-1, 2)))
+    if vectors is not None:
+        replace('vectors.npy', lambda f: np.save(f, np.ascontiguousarray(vectors, dtype=np.float32)))
+    elif (path / 'vectors.npy').exists():
+        os.remove(path / 'vectors.npy')
+
+    manifest = {**manifest, 'version': STORE_VERSION, 'chunks': len(encoded)}
+    replace(MANIFEST, lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')))
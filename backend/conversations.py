@@ -0,0 +1,101 @@
+"""
+Resumo das conversas (coleção `conversations`)
+
+Um documento por participante e parceiro: owner_id, partner_id, última
+mensagem, horário e número de mensagens não lidas. Atualizado a cada
+send_message, a lista de conversas vira uma única leitura indexada.
+"""
+
+from pymongo import UpdateOne
+
+
+def summary_update(owner_id: str, partner_id: str, message: dict, unread: int) -> UpdateOne:
+    """
+    Upsert (pipeline) do resumo de um lado da conversa. A última mensagem
+    só é trocada se esta não for mais antiga que a registrada: envios
+    concorrentes ou uma nova tentativa atrasada não voltam o resumo atrás.
+    """
+    newer = {'$lte': [{'$ifNull': ['$last_message_time', None]}, message['created_at']]}
+
+    def latest(field: str, value):
+        # $literal: o texto da mensagem pode começar com '$'
+        return {'$cond': [newer, {'$literal': value}, f'${field}']}
+
+    return UpdateOne(
+        {'owner_id': owner_id, 'partner_id': partner_id},
+        [{'$set': {
+            'last_message': latest('last_message', message['message']),
+            'last_message_time': latest('last_message_time', message['created_at']),
+            'last_from_user_id': latest('last_from_user_id', message['from_user_id']),
+            'unread_count': {'$add': [{'$ifNull': ['$unread_count', 0]}, unread]}
+        }}],
+        upsert=True
+    )
+
+
+async def record_message(db, message: dict) -> None:
+    """Atualiza o resumo dos dois lados da conversa (um único bulk_write)"""
+    await db.conversations.bulk_write([
+        summary_update(message['from_user_id'], message['to_user_id'], message, 0),
+        summary_update(message['to_user_id'], message['from_user_id'], message, 1),
+    ], ordered=False)
+
+
+async def mark_read(db, owner_id: str, partner_id: str) -> None:
+    """Zera as não lidas quando o usuário abre a conversa"""
+    await db.conversations.update_one(
+        {'owner_id': owner_id, 'partner_id': partner_id, 'unread_count': {'$gt': 0}},
+        {'$set': {'unread_count': 0}}
+    )
+
+
+async def delete_user_conversations(db, user_id: str) -> None:
+    await db.conversations.delete_many({'$or': [{'owner_id': user_id}, {'partner_id': user_id}]})
+
+
+async def rebuild_conversations(db) -> None:
+    """
+    Reconstrói os resumos a partir do histórico de `messages` (migração).
+    Resumos existentes mais recentes que o histórico são preservados;
+    o contador de não lidas de conversas antigas começa em zero.
+    """
+    pipeline = [
+        {'$match': {'from_user_id': {'$ne': 'system'}}},
+        {'$sort': {'created_at': 1}},
+        {'$project': {
+            'message': 1,
+            'created_at': 1,
+            'from_user_id': 1,
+            'sides': [
+                {'owner_id': '$from_user_id', 'partner_id': '$to_user_id'},
+                {'owner_id': '$to_user_id', 'partner_id': '$from_user_id'}
+            ]
+        }},
+        {'$unwind': '$sides'},
+        {'$group': {
+            '_id': {'owner_id': '$sides.owner_id', 'partner_id': '$sides.partner_id'},
+            'last_message': {'$last': '$message'},
+            'last_message_time': {'$last': '$created_at'},
+            'last_from_user_id': {'$last': '$from_user_id'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'owner_id': '$_id.owner_id',
+            'partner_id': '$_id.partner_id',
+            'last_message': 1,
+            'last_message_time': 1,
+            'last_from_user_id': 1,
+            'unread_count': {'$literal': 0}
+        }},
+        {'$merge': {
+            'into': 'conversations',
+            'on': ['owner_id', 'partner_id'],
+            'whenMatched': [{'$replaceWith': {'$cond': [
+                {'$gte': ['$last_message_time', '$$new.last_message_time']},
+                '$$ROOT',
+                {'$mergeObjects': ['$$new', {'_id': '$_id', 'unread_count': '$unread_count'}]}
+            ]}}],
+            'whenNotMatched': 'insert'
+        }}
+    ]
+    await db.messages.aggregate(pipeline, allowDiskUse=True).to_list(None)
@@ -0,0 +1,134 @@
+"""
+Embedders locais para a busca semântica (nenhum serviço externo)
+
+- HashingEmbedder: padrão; NumPy puro. Palavras normalizadas (sem acento,
+  singular) projetadas por hashing em `dim` posições com sinal, peso
+  tf sublinear x idf (ajustado nos trechos com fit) e norma 1
+  (produto interno = cosseno). Depois do fit, palavras que não aparecem
+  em nenhum trecho são ignoradas: só produziriam colisões de hashing
+- SentenceTransformerEmbedder: opcional (pacote sentence-transformers);
+  com o modelo que gerou o watizat_index.pkl os vetores gravados são usados
+  sem recalcular
+
+`min_score` é o cosseno mínimo para um trecho contar como relevante e
+`relevant()` uma verificação extra por trecho (no hashing, colisões dão
+cossenos altos a trechos sem nenhuma palavra da pergunta).
+
+Escolhido por EMBEDDER=hashing|sentence-transformers (create_embedder).
+"""
+
+import hashlib
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(ABC):
+    name = 'embedder'
+    dim = 0
+    # True se os vetores do watizat_index.pkl estão no espaço deste embedder
+    matches_shipped_index = False
+    # Identifica vetores reaproveitáveis entre execuções (None: dependem do fit)
+    key: Optional[str] = None
+    # Cosseno mínimo de um trecho relevante (SemanticRetriever)
+    min_score = 0.0
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """Ajusta o embedder aos documentos indexados (opcional)"""
+
+    @abstractmethod
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Matriz float32 (len(texts) x dim)"""
+
+    def relevant(self, query: str, text: str) -> bool:
+        """Se um trecho acima de min_score responde mesmo à pergunta"""
+        return True
+
+
+class HashingEmbedder(Embedder):
+    name = 'hashing'
+    # Um trecho que contém uma palavra da pergunta fica acima disso; sem
+    # palavra em comum, o cosseno é 0 ou ruído de colisão
+    min_score = 0.05
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self._buckets = {}
+        self._idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+
+    def fit(self, texts: Sequence[str]) -> None:
+        doc_freq: Dict[str, int] = {}
+        for text in texts:
+            for token in set(tokenize(text)):
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        total = len(texts)
+        self._idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in doc_freq.items()}
+        # Palavra que não aparece nos trechos: peso máximo
+        self._default_idf = math.log(1 + total) + 1
+
+    def relevant(self, query: str, text: str) -> bool:
+        # Pelo menos uma palavra em comum: descarta trechos trazidos só por colisão
+        return not set(tokenize(query)).isdisjoint(tokenize(text))
+
+    def _bucket(self, feature: str):
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            bucket = (value % self.dim, 1.0 if value >> 63 else -1.0)
+            if len(self._buckets) < 200_000:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                if self._idf and token not in self._idf:
+                    continue
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                position, sign = self._bucket(token)
+                weight = (1.0 + math.log(count)) * self._idf.get(token, self._default_idf)
+                vectors[row, position] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class SentenceTransformerEmbedder(Embedder):
+    name = 'sentence-transformers'
+    min_score = 0.3
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.matches_shipped_index = True
+        self.key = f"{self.name}:{model_name}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts)), dtype=np.float32)
+
+
+def create_embedder(kind: str = 'hashing', model_name: str = '') -> Embedder:
+    """Embedder configurado; cai para o HashingEmbedder se o opcional não estiver instalado"""
+    if kind == 'sentence-transformers':
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            logger.warning("sentence-transformers not installed, using hashing embedder")
+    elif kind != 'hashing':
+        logger.error(f"Unknown embedder: {kind}, using hashing embedder")
+    return HashingEmbedder()
@@ -0,0 +1,30 @@
+"""
+Localização dos usuários em GeoJSON (índice 2dsphere em users.geo)
+O campo `location` ({lat, lng, address}) continua sendo a fonte exibida
+no app; `geo` é a cópia indexável usada pelo $geoNear.
+"""
+
+from typing import Optional
+
+
+def location_to_point(location: Optional[dict]) -> Optional[dict]:
+    """Converte {lat, lng} em GeoJSON Point; None se ausente ou inválido"""
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat = float(location['lat'])
+        lng = float(location['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    # GeoJSON usa a ordem [longitude, latitude]
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+
+def geo_update(location: Optional[dict]) -> dict:
+    """Operadores de update que mantêm `geo` em sincronia com `location`"""
+    point = location_to_point(location)
+    if point is None:
+        return {'$unset': {'geo': ''}}
+    return {'$set': {'geo': point}}
@@ -0,0 +1,196 @@
+"""
+Registro declarativo dos índices do MongoDB
+
+- ensure_indexes(db): cria todos os índices (idempotente), chamado no startup
+- python indexes.py: cria os índices
+- python indexes.py --verify: roda explain() no formato de consulta de cada
+  endpoint e falha se algum ainda fizer COLLSCAN
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import PyMongoError
+
+from pagination import keyset_filter
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    'users': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+        IndexModel([('role', ASCENDING), ('professional_area', ASCENDING)], name='role_area'),
+        IndexModel([('created_at', DESCENDING)], name='created_at_desc'),
+        IndexModel([('geo', GEOSPHERE), ('role', ASCENDING)], name='geo_role'),
+    ],
+    'posts': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('created_at', DESCENDING), ('id', DESCENDING)], name='feed'),
+        IndexModel(
+            [('type', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+            name='feed_by_type'
+        ),
+        IndexModel(
+            [('category', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+            name='feed_by_category'
+        ),
+        IndexModel(
+            [('type', ASCENDING), ('category', ASCENDING), ('created_at', DESCENDING), ('id', DESCENDING)],
+            name='feed_by_type_category'
+        ),
+        IndexModel([('user_id', ASCENDING), ('type', ASCENDING)], name='user_posts'),
+    ],
+    'comments': [
+        IndexModel(
+            [('post_id', ASCENDING), ('created_at', ASCENDING), ('id', ASCENDING)],
+            name='post_comments'
+        ),
+    ],
+    'messages': [
+        IndexModel(
+            [('from_user_id', ASCENDING), ('to_user_id', ASCENDING), ('created_at', ASCENDING)],
+            name='chat'
+        ),
+    ],
+    'auto_response_templates': [
+        IndexModel([('category', ASCENDING), ('version', ASCENDING)], name='template_unique', unique=True),
+    ],
+    'conversations': [
+        IndexModel([('owner_id', ASCENDING), ('partner_id', ASCENDING)], name='pair_unique', unique=True),
+        IndexModel(
+            [('owner_id', ASCENDING), ('last_message_time', DESCENDING), ('partner_id', DESCENDING)],
+            name='owner_recent'
+        ),
+        IndexModel([('partner_id', ASCENDING)], name='partner'),
+    ],
+    'matches': [
+        IndexModel([('helper_id', ASCENDING)], name='helper_matches'),
+        IndexModel([('migrant_id', ASCENDING)], name='migrant_matches'),
+    ],
+    'advertisements': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('is_active', ASCENDING), ('priority', DESCENDING)], name='active_by_priority'),
+    ],
+    'services': [
+        IndexModel([('category', ASCENDING)], name='category'),
+    ],
+    'ai_chats': [
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)], name='user_chats'),
+    ],
+    'job_cache': [
+        IndexModel([('source', ASCENDING)], name='source_unique', unique=True),
+    ],
+}
+
+# Formato das consultas de cada endpoint (valores são apenas exemplos)
+QUERY_SHAPES = [
+    {'endpoint': 'get_current_user', 'collection': 'users', 'filter': {'id': 'u1'}},
+    {'endpoint': 'login', 'collection': 'users', 'filter': {'email': 'a@b.c'}},
+    {'endpoint': 'get_volunteers', 'collection': 'users',
+     'filter': {'role': 'volunteer', 'professional_area': 'legal'}},
+    {'endpoint': 'get_helpers_nearby', 'collection': 'users',
+     'filter': {'geo': {'$nearSphere': {'$geometry': {'type': 'Point', 'coordinates': [2.35, 48.85]},
+                                        '$maxDistance': 10000}},
+                'role': {'$in': ['helper', 'volunteer']}, 'show_location': True}},
+    {'endpoint': 'admin_get_users', 'collection': 'users', 'filter': {},
+     'sort': [('created_at', DESCENDING)]},
+    {'endpoint': 'get_posts', 'collection': 'posts', 'filter': {},
+     'sort': [('created_at', DESCENDING), ('id', DESCENDING)]},
+    {'endpoint': 'get_posts?cursor', 'collection': 'posts',
+     'filter': keyset_filter([('created_at', DESCENDING), ('id', DESCENDING)],
+                             [datetime(2025, 1, 1, tzinfo=timezone.utc), 'p1']),
+     'sort': [('created_at', DESCENDING), ('id', DESCENDING)]},
+    {'endpoint': 'get_posts?type', 'collection': 'posts', 'filter': {'type': 'need'},
+     'sort': [('created_at', DESCENDING), ('id', DESCENDING)]},
+    {'endpoint': 'get_posts?category', 'collection': 'posts', 'filter': {'category': 'food'},
+     'sort': [('created_at', DESCENDING), ('id', DESCENDING)]},
+    {'endpoint': 'get_posts(volunteer)', 'collection': 'posts',
+     'filter': {'$or': [{'type': 'offer'}, {'type': 'need', 'category': {'$in': ['food', 'legal']}}]},
+     'sort': [('created_at', DESCENDING), ('id', DESCENDING)]},
+    {'endpoint': 'can_chat_with_user', 'collection': 'posts',
+     'filter': {'user_id': 'u1', 'type': 'need'}},
+    {'endpoint': 'get_comments', 'collection': 'comments', 'filter': {'post_id': 'p1'},
+     'sort': [('created_at', ASCENDING), ('id', ASCENDING)]},
+    {'endpoint': 'get_messages', 'collection': 'messages',
+     'filter': {'$or': [{'from_user_id': 'u1', 'to_user_id': 'u2'},
+                        {'from_user_id': 'u2', 'to_user_id': 'u1'}]},
+     'sort': [('created_at', ASCENDING)]},
+    {'endpoint': 'get_conversations', 'collection': 'conversations', 'filter': {'owner_id': 'u1'},
+     'sort': [('last_message_time', DESCENDING), ('partner_id', DESCENDING)]},
+    {'endpoint': 'get_matches(migrant)', 'collection': 'matches', 'filter': {'migrant_id': 'u1'}},
+    {'endpoint': 'get_matches(helper)', 'collection': 'matches', 'filter': {'helper_id': 'u1'}},
+    {'endpoint': 'get_sidebar_content', 'collection': 'advertisements',
+     'filter': {'is_active': True}, 'sort': [('priority', DESCENDING)]},
+    {'endpoint': 'get_services?category', 'collection': 'services', 'filter': {'category': 'food'}},
+    {'endpoint': 'get_external_jobs', 'collection': 'job_cache', 'filter': {'source': 'rozgarline'}},
+]
+
+
+async def ensure_indexes(db) -> int:
+    """Cria os índices do registro. Falhas são registradas sem interromper o startup"""
+    created = 0
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection].create_indexes([index])
+                created += 1
+            except PyMongoError as e:
+                logger.error(f"Index {collection}.{index.document['name']} not created: {e}")
+    return created
+
+
+def _plan_stages(plan) -> set:
+    """Coleta recursivamente os nomes dos estágios de um plano de execução"""
+    stages = set()
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.add(plan['stage'])
+        for value in plan.values():
+            stages |= _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= _plan_stages(item)
+    return stages
+
+
+async def verify_query_shapes(db) -> list:
+    """Retorna os endpoints cujo plano vencedor ainda contém COLLSCAN"""
+    failures = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape['collection']].find(shape['filter'])
+        if shape.get('sort'):
+            cursor = cursor.sort(shape['sort'])
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get('queryPlanner', {}).get('winningPlan', {}))
+        status = 'COLLSCAN' if 'COLLSCAN' in stages else 'ok'
+        print(f"{status:8} {shape['endpoint']:28} {shape['collection']}: {sorted(stages)}")
+        if status == 'COLLSCAN':
+            failures.append(shape['endpoint'])
+    return failures
+
+
+async def main(verify: bool) -> int:
+    from server import db
+
+    created = await ensure_indexes(db)
+    print(f"{created} índices verificados/criados")
+
+    if verify:
+        failures = await verify_query_shapes(db)
+        if failures:
+            print(f"❌ COLLSCAN em: {', '.join(failures)}")
+            return 1
+        print("✅ Nenhuma consulta faz COLLSCAN")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cria e verifica os índices do MongoDB')
+    parser.add_argument('--verify', action='store_true', help='roda explain() em cada consulta')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.verify)))
@@ -0,0 +1,235 @@
+"""
+Ingestão dos PDFs do guia Watizat no knowledge_store (executar manualmente)
+
+    python ingest_pdfs.py guia-paris.pdf [outro.pdf ...] [--store knowledge_store]
+        [--workers 4] [--chunk-size 1200] [--overlap 200]
+        [--embedder hashing|sentence-transformers] [--model NOME] [--full]
+
+- As páginas são lidas uma a uma (PyPDF2) em um pool de processos, em lotes
+- Cada página vira trechos com sobreposição, sem atravessar páginas
+- Reingestão: PDF com o mesmo sha1 é reaproveitado inteiro; nos outros,
+  páginas com o mesmo fingerprint (sha1 do texto) mantêm os trechos e
+  vetores já gravados. --full ignora o que já existe
+- O resultado (chunk_store.py) é aberto com memory-map pelo servidor
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chunk_store import ChunkStore, write_chunk_store
+
+DEFAULT_STORE = Path(__file__).parent / 'knowledge_store'
+PAGES_PER_TASK = 8
+
+
+def file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_fingerprint(text: str) -> str:
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> List[str]:
+    """Janelas de ~chunk_size caracteres que se sobrepõem em ~overlap, cortadas entre palavras"""
+    words = text.split()
+    chunks = []
+    start = 0
+    while start < len(words):
+        length = 0
+        end = start
+        while end < len(words) and (length == 0 or length + len(words[end]) + 1 <= chunk_size):
+            length += len(words[end]) + 1
+            end += 1
+        chunks.append(' '.join(words[start:end]))
+        if end >= len(words):
+            break
+        # Volta palavras até cobrir `overlap` caracteres (sempre avança pelo menos uma)
+        back = end
+        covered = 0
+        while back > start + 1 and covered < overlap:
+            back -= 1
+            covered += len(words[back]) + 1
+        start = back
+    return chunks
+
+
+def extract_pages(path: str, page_numbers: List[int], known: Dict[int, str],
+                  chunk_size: int, overlap: int) -> List[Tuple[int, str, Optional[List[str]]]]:
+    """
+    Executa no pool: (página, fingerprint, trechos) para cada página do lote.
+    Trechos = None quando o fingerprint é igual ao já gravado (`known`).
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    results = []
+    for number in page_numbers:
+        text = reader.pages[number].extract_text() or ''
+        fingerprint = page_fingerprint(text)
+        if known.get(number) == fingerprint:
+            results.append((number, fingerprint, None))
+        else:
+            results.append((number, fingerprint, chunk_text(text, chunk_size, overlap)))
+    return results
+
+
+def count_pages(path: Path) -> int:
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(str(path)).pages)
+
+
+class _PreviousStore:
+    """Trechos/vetores da ingestão anterior, por (arquivo, página)"""
+
+    def __init__(self, store: Optional[ChunkStore], params: dict, embedder_key: Optional[str]):
+        self.store = store
+        self.sources: Dict[str, dict] = {}
+        self.rows: Dict[Tuple[str, int], List[int]] = {}
+        self.reuse_vectors = False
+        if store is None:
+            return
+        if any(store.manifest.get(name) != value for name, value in params.items()):
+            return  # parâmetros de corte mudaram: nada é reaproveitável
+
+        self.sources = {source['name']: source for source in store.sources}
+        for row, (source, page) in enumerate(store.pages):
+            name = store.sources[int(source)]['name']
+            self.rows.setdefault((name, int(page)), []).append(row)
+        self.reuse_vectors = (embedder_key is not None and store.embedder_key == embedder_key
+                              and store.vectors is not None)
+
+    def fingerprints(self, name: str) -> Dict[int, str]:
+        source = self.sources.get(name)
+        return {int(page): fp for page, fp in source['pages'].items()} if source else {}
+
+    def chunks(self, name: str, page: int) -> List[Tuple[str, Optional[np.ndarray]]]:
+        return [
+            (self.store[row], self.store.vectors[row] if self.reuse_vectors else None)
+            for row in self.rows.get((name, page), [])
+        ]
+
+
+def ingest(pdfs: List[Path], store_path: Path, workers: int, chunk_size: int, overlap: int,
+           embedder=None, full: bool = False) -> dict:
+    params = {'chunk_size': chunk_size, 'overlap': overlap}
+    embedder_key = embedder.key if embedder is not None else None
+    old = _PreviousStore(
+        None if full or not ChunkStore.exists(store_path) else ChunkStore(store_path),
+        params, embedder_key
+    )
+
+    chunks: List[str] = []
+    pages: List[Tuple[int, int]] = []
+    vectors: List[Optional[np.ndarray]] = []
+    sources = []
+    summary = {'pages': 0, 'pages_reused': 0, 'pages_extracted': 0, 'files_skipped': 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for source_id, pdf in enumerate(pdfs):
+            name = pdf.name
+            sha1 = file_sha1(pdf)
+            previous = old.sources.get(name)
+            fingerprints = old.fingerprints(name)
+
+            if previous and previous['sha1'] == sha1:
+                # PDF idêntico: nem abre o arquivo
+                summary['files_skipped'] += 1
+                page_results = [(page, fingerprints[page], None) for page in sorted(fingerprints)]
+            else:
+                total = count_pages(pdf)
+                batches = [list(range(i, min(i + PAGES_PER_TASK, total)))
+                           for i in range(0, total, PAGES_PER_TASK)]
+                futures = [
+                    pool.submit(extract_pages, str(pdf), batch,
+                                {p: fingerprints[p] for p in batch if p in fingerprints},
+                                chunk_size, overlap)
+                    for batch in batches
+                ]
+                page_results = [result for future in futures for result in future.result()]
+
+            page_fingerprints = {}
+            for page, fingerprint, page_chunks in page_results:
+                summary['pages'] += 1
+                page_fingerprints[str(page)] = fingerprint
+                if page_chunks is None:
+                    summary['pages_reused'] += 1
+                    reused = old.chunks(name, page)
+                    page_chunks = [text for text, _ in reused]
+                    page_vectors = [vector for _, vector in reused]
+                else:
+                    summary['pages_extracted'] += 1
+                    page_vectors = [None] * len(page_chunks)
+                chunks.extend(page_chunks)
+                vectors.extend(page_vectors)
+                pages.extend((source_id, page) for _ in page_chunks)
+            sources.append({'name': name, 'sha1': sha1, 'pages': page_fingerprints})
+
+    matrix = None
+    if embedder_key is not None:
+        # Só os trechos novos passam pelo modelo
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = embedder.encode([chunks[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        summary['chunks_embedded'] = len(missing)
+        matrix = np.stack(vectors) if vectors else np.zeros((0, embedder.dim), dtype=np.float32)
+
+    write_chunk_store(
+        store_path, chunks, np.asarray(pages, dtype=np.int32).reshape(-1, 2),
+        {**params, 'sources': sources, 'embedder': embedder_key},
+        vectors=matrix
+    )
+    summary['chunks'] = len(chunks)
+    return summary
+
+
+def main(args) -> int:
+    pdfs = [Path(p) for p in args.pdfs]
+    missing = [str(p) for p in pdfs if not p.is_file()]
+    if missing:
+        print(f"❌ Arquivos não encontrados: {', '.join(missing)}")
+        return 1
+
+    embedder = None
+    if args.embedder != 'hashing':
+        from embeddings import create_embedder
+
+        embedder = create_embedder(args.embedder, args.model)
+
+    started = time.perf_counter()
+    summary = ingest(pdfs, Path(args.store), args.workers, args.chunk_size, args.overlap,
+                     embedder=embedder, full=args.full)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {summary['chunks']} trechos de {summary['pages']} páginas em {elapsed:.1f}s "
+          f"({summary['pages_extracted']} processadas, {summary['pages_reused']} sem mudança, "
+          f"{summary['files_skipped']} PDFs idênticos)")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingestão dos PDFs do guia Watizat')
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--store', default=os.environ.get('KNOWLEDGE_STORE_PATH', str(DEFAULT_STORE)))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=1200)
+    parser.add_argument('--overlap', type=int, default=200)
+    parser.add_argument('--embedder', choices=['hashing', 'sentence-transformers'], default='hashing',
+                        help='hashing: vetores calculados no servidor; sentence-transformers: gravados no store')
+    parser.add_argument('--model', default='paraphrase-multilingual-MiniLM-L12-v2')
+    parser.add_argument('--full', action='store_true', help='ignora a ingestão anterior')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+"""
+Atualização periódica das vagas externas em segundo plano
+
+As requisições só leem o último snapshot bom (memória); a raspagem roda
+numa tarefa iniciada no startup, com intervalo + jitter e single-flight.
+Se a busca falhar, o snapshot anterior continua sendo servido.
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobRefresher:
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[List[dict]]],
+        db,
+        source: str = 'rozgarline',
+        interval: float = 3600.0,
+        jitter: float = 0.1
+    ):
+        self.fetch = fetch
+        self.db = db
+        self.source = source
+        self.interval = interval
+        self.jitter = jitter
+        self.jobs: List[dict] = []
+        self.updated_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.failures = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[], Awaitable[None]]] = []
+
+    def add_listener(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Chamado após cada atualização bem-sucedida do snapshot"""
+        self._listeners.append(callback)
+
+    def snapshot(self) -> dict:
+        return {'jobs': self.jobs, 'updated_at': self.updated_at}
+
+    async def start(self) -> None:
+        await self._load_cached()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _is_fresh(self) -> bool:
+        if self.updated_at is None:
+            return False
+        return datetime.now(timezone.utc) - self.updated_at < timedelta(seconds=self.interval)
+
+    async def _load_cached(self) -> bool:
+        """Adota o snapshot salvo no Mongo (por este ou outro worker) se for mais novo"""
+        try:
+            cached = await self.db.job_cache.find_one({'source': self.source}, {'_id': 0})
+        except Exception as e:
+            logger.error(f"Error loading job cache: {e}")
+            return False
+        if not cached or not cached.get('updated_at'):
+            return False
+
+        cached_time = cached['updated_at']
+        if cached_time.tzinfo is None:
+            cached_time = cached_time.replace(tzinfo=timezone.utc)
+        if self.updated_at is not None and cached_time <= self.updated_at:
+            return False
+
+        self.jobs = cached.get('jobs', [])
+        self.updated_at = cached_time
+        await self._notify()
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            if not self._is_fresh():
+                await self.refresh()
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            if self.updated_at is not None:
+                # Próxima rodada quando o snapshot atual vencer
+                age = (datetime.now(timezone.utc) - self.updated_at).total_seconds()
+                delay = max(60.0, delay - age)
+            elif self.last_error:
+                delay = min(delay, 300.0)
+            await asyncio.sleep(delay)
+
+    async def refresh(self) -> bool:
+        """Busca as vagas; chamadas concorrentes esperam a busca em andamento"""
+        if self._lock.locked():
+            async with self._lock:
+                return self.last_error is None
+
+        async with self._lock:
+            # Outro worker pode ter atualizado o cache compartilhado
+            await self._load_cached()
+            if self._is_fresh():
+                return True
+
+            try:
+                jobs = await self.fetch()
+                if not jobs:
+                    raise ValueError('no listings found')
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Error refreshing jobs from {self.source}, serving stale snapshot: {e}")
+                return False
+
+            self.jobs = jobs
+            self.updated_at = datetime.now(timezone.utc)
+            self.last_error = None
+            self.refreshes += 1
+            try:
+                await self.db.job_cache.update_one(
+                    {'source': self.source},
+                    {'$set': {'source': self.source, 'jobs': jobs, 'updated_at': self.updated_at}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error saving job cache: {e}")
+            await self._notify()
+            return True
+
+    async def _notify(self) -> None:
+        for callback in self._listeners:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Job refresh listener error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'source': self.source,
+            'jobs': len(self.jobs),
+            'updated_at': self.updated_at,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,378 @@
+"""
+Agregador de vagas de emprego de várias fontes
+
+- JobSource: interface das fontes (URL + parser incremental do HTML)
+- JobAggregator: uma ClientSession compartilhada (pool de conexões),
+  busca as fontes em paralelo com timeout por fonte, GET condicional
+  (ETag / If-Modified-Since) e circuit breaker por fonte; junta e
+  remove duplicadas por hash do título/URL normalizados
+- JobIndex: índice de busca em memória sobre as vagas agregadas
+"""
+
+import asyncio
+import bisect
+import codecs
+import hashlib
+import html
+import logging
+import re
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def job_key(value: str) -> str:
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+class JobSource(ABC):
+    """Uma fonte de vagas: `create_parser` devolve um parser incremental do HTML"""
+
+    name = 'source'
+    url = ''
+    location = 'Europa'
+    timeout = 10.0
+    max_jobs = 15
+    max_bytes = 2 * 1024 * 1024  # para de ler a página depois disso
+
+    @abstractmethod
+    def create_parser(self) -> 'JobPageParser':
+        """Parser novo, alimentado com os pedaços de uma página"""
+
+    def parse(self, html: str) -> List[dict]:
+        """Conveniência: processa uma página inteira de uma vez"""
+        parser = self.create_parser()
+        parser.feed(html)
+        parser.close()
+        return parser.jobs
+
+
+class JobPageParser(ABC):
+    """
+    Parser alimentado em pedaços: cada pedaço é juntado ao final incompleto
+    do anterior e entregue a `scan`; só esse final (no máximo `max_carry`
+    caracteres) fica em memória. `done` indica que já achou vagas suficientes.
+    """
+
+    max_carry = 8 * 1024
+
+    def __init__(self, max_jobs: int):
+        self.max_jobs = max_jobs
+        self.jobs: List[dict] = []
+        self._carry = ''
+
+    @property
+    def done(self) -> bool:
+        return len(self.jobs) >= self.max_jobs
+
+    def feed(self, data: str) -> None:
+        if self.done:
+            return
+        text = self._carry + data
+        carry = text[self.scan(text):]
+        # Um trecho incompleto maior que isso não é uma vaga: descarta
+        self._carry = carry if len(carry) <= self.max_carry else ''
+
+    def close(self) -> None:
+        self._carry = ''
+
+    @abstractmethod
+    def scan(self, text: str) -> int:
+        """Processa `text`; retorna a posição a partir da qual o texto precisa voltar com o próximo pedaço"""
+
+
+ANCHOR_PATTERN = re.compile(
+    r'<a\b[^>]*?\bhref\s*=\s*["\']([^"\']*)["\'][^>]*>([^<]*)</a\s*>', re.IGNORECASE
+)
+
+
+class LinkJobParser(JobPageParser):
+    """
+    Extrai <a href="...">título</a> cujo href casa com o padrão da fonte.
+    Link com tags internas não é uma vaga (mesmo critério do regex antigo).
+    """
+
+    def __init__(self, source: 'LinkPatternSource'):
+        super().__init__(source.max_jobs)
+        self.source = source
+        self._seen_titles = set()
+
+    def scan(self, text: str) -> int:
+        end = 0
+        for match in ANCHOR_PATTERN.finditer(text):
+            end = match.end()
+            url = html.unescape(match.group(1))
+            clean_title = html.unescape(match.group(2)).strip()
+            if not self.source.href_pattern.fullmatch(url):
+                continue
+            if clean_title and clean_title not in self._seen_titles and self.source.accept(url, clean_title):
+                self._seen_titles.add(clean_title)
+                self.jobs.append({'title': clean_title, 'url': url})
+                if self.done:
+                    return len(text)
+        # Depois da última âncora completa pode começar uma que continua no próximo pedaço
+        start = max(text.rfind('<a', end), text.rfind('<A', end))
+        if start == -1:
+            start = len(text) - 1 if text.endswith('<') else len(text)
+        return start
+
+
+class LinkPatternSource(JobSource):
+    """Fonte cujas vagas são links <a href="...">título</a> com URL reconhecível"""
+
+    def __init__(self, name: str, url: str, link_pattern: str, location: str = 'Europa',
+                 timeout: float = 10.0, max_jobs: int = 15):
+        self.name = name
+        self.url = url
+        self.location = location
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.href_pattern = re.compile(link_pattern)
+
+    def accept(self, url: str, title: str) -> bool:
+        return len(title) > 5
+
+    def create_parser(self) -> JobPageParser:
+        return LinkJobParser(self)
+
+
+class RozgarLineSource(LinkPatternSource):
+    def __init__(self, url: str = 'https://rozgarline.me/', **kwargs):
+        super().__init__('RozgarLine', url, r'https://rozgarline\.me/jobs/[^"]+', **kwargs)
+
+    def accept(self, url: str, title: str) -> bool:
+        # Ignorar links genéricos
+        return len(title) > 5 and 'more' not in title.lower() and 'author' not in url
+
+
+class CircuitBreaker:
+    """Abre após `failure_threshold` falhas seguidas; tenta de novo após `reset_timeout`"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 900.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        return self.state != 'open'
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class _SourceState:
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.listings: List[dict] = []
+        self.not_modified = 0
+        self.errors = 0
+
+
+class JobAggregator:
+    def __init__(self, sources: List[JobSource], max_connections: int = 10):
+        self.sources = sources
+        self.max_connections = max_connections
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._state: Dict[str, _SourceState] = {source.name: _SourceState() for source in sources}
+
+    async def start(self) -> None:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                headers={'User-Agent': 'WatizatJobsBot/1.0'}
+            )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+    async def fetch_all(self) -> List[dict]:
+        """Busca todas as fontes em paralelo e retorna as vagas sem duplicadas"""
+        await self.start()
+        results = await asyncio.gather(*(self._fetch_source(source) for source in self.sources))
+
+        if all(result is None for result in results):
+            raise RuntimeError('all job sources failed')
+        return merge_listings([jobs for jobs in results if jobs])
+
+    async def _fetch_source(self, source: JobSource) -> Optional[List[dict]]:
+        """Vagas da fonte; em 304 ou falha usa as últimas obtidas (None se não houver)"""
+        state = self._state[source.name]
+        if not state.breaker.allow():
+            return state.listings or None
+
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=source.timeout)
+            async with self.session.get(source.url, headers=headers, timeout=timeout) as response:
+                if response.status == 304:
+                    state.not_modified += 1
+                    state.breaker.record_success()
+                    return state.listings
+
+                response.raise_for_status()
+                raw_jobs = await read_jobs_streaming(response, source)
+                state.etag = response.headers.get('ETag')
+                state.last_modified = response.headers.get('Last-Modified')
+        except Exception as e:
+            state.errors += 1
+            state.breaker.record_failure()
+            logger.error(f"Error fetching jobs from {source.name}: {e}")
+            return state.listings or None
+
+        state.breaker.record_success()
+        fetched_on = datetime.now(timezone.utc).strftime('%d %b %Y')
+        state.listings = [
+            {
+                'title': job['title'],
+                'url': job['url'],
+                'source': source.name,
+                'location': job.get('location', source.location),
+                'date_posted': job.get('date_posted', fetched_on)
+            }
+            for job in raw_jobs
+        ]
+        return state.listings
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                'circuit': state.breaker.state,
+                'listings': len(state.listings),
+                'not_modified': state.not_modified,
+                'errors': state.errors
+            }
+            for name, state in self._state.items()
+        }
+
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+async def read_jobs_streaming(response: aiohttp.ClientResponse, source: JobSource) -> List[dict]:
+    """
+    Lê a página em pedaços e alimenta o parser, sem manter o HTML inteiro
+    em memória; para no limite de bytes ou quando há vagas suficientes.
+    O parser roda no próprio loop: um pedaço custa poucos microssegundos,
+    menos que uma ida e volta a uma thread.
+    """
+    parser = source.create_parser()
+    decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+    received = 0
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        received += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or received >= source.max_bytes:
+            break
+    else:
+        parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser.jobs
+
+
+def merge_listings(groups: List[List[dict]]) -> List[dict]:
+    """Junta as vagas das fontes, sem repetir título nem URL normalizados"""
+    merged = []
+    seen = set()
+    for jobs in groups:
+        for job in jobs:
+            title_key = job_key('title:' + normalize_text(job['title']))
+            url_key = job_key('url:' + normalize_url(job['url']))
+            if title_key in seen or url_key in seen:
+                continue
+            seen.update((title_key, url_key))
+            # id estável entre atualizações (derivado da URL)
+            merged.append({**job, 'id': url_key})
+    return merged
+
+
+class JobIndex:
+    """Busca por palavras do título/local (todas as palavras devem aparecer)"""
+
+    def __init__(self, jobs: List[dict]):
+        self.jobs = jobs
+        self._postings: Dict[str, set] = {}
+        for i, job in enumerate(jobs):
+            text = normalize_text(f"{job['title']} {job.get('location', '')} {job.get('source', '')}")
+            for token in re.findall(r'\w+', text):
+                self._postings.setdefault(token, set()).add(i)
+        # Termos ordenados: os que começam com um prefixo formam uma faixa contígua
+        self._terms = sorted(self._postings)
+
+    def _prefix_postings(self, prefix: str) -> set:
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + '\U0010ffff', start)
+        postings = set()
+        for term in self._terms[start:end]:
+            postings |= self._postings[term]
+        return postings
+
+    def search(self, query: str) -> List[dict]:
+        tokens = re.findall(r'\w+', normalize_text(query))
+        if not tokens:
+            return self.jobs
+        matches = None
+        for token in tokens:
+            # Prefixo: "cook" encontra "cooking"
+            postings = self._prefix_postings(token)
+            matches = postings if matches is None else matches & postings
+            if not matches:
+                return []
+        return [self.jobs[i] for i in sorted(matches)]
+
+
+def build_sources(names: List[str], rozgarline_url: str) -> List[JobSource]:
+    """Fontes habilitadas (JOB_SOURCES) a partir do registro"""
+    registry = {
+        'rozgarline': lambda: RozgarLineSource(url=rozgarline_url),
+    }
+    sources = []
+    for name in names:
+        factory = registry.get(name.strip().lower())
+        if factory is None:
+            logger.error(f"Unknown job source: {name}")
+            continue
+        sources.append(factory())
+    return sources
@@ -0,0 +1,237 @@
+"""
+Migrações de dados do MongoDB (executar manualmente)
+
+    python migrations.py datetimes [--batch-size 500] [--reset]
+    python migrations.py conversations
+    python migrations.py geo [--batch-size 500] [--reset]
+    python migrations.py auto-responses [--batch-size 500] [--reset]
+
+Cada migração grava o progresso na coleção `migrations`; se for
+interrompida, a próxima execução continua de onde parou. --reset
+descarta o progresso salvo e percorre as coleções de novo.
+
+`datetimes`, `conversations` e `geo` também rodam no startup do servidor
+(as leituras dependem delas); executá-las antes do deploy só evita esperar
+no primeiro startup.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+DATETIME_COLLECTIONS = [
+    'users', 'posts', 'comments', 'messages', 'matches',
+    'ai_chats', 'advertisements', 'help_locations'
+]
+
+
+def parse_iso_datetime(value: str):
+    """Converte string ISO em datetime UTC; retorna None se inválida"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def _load_checkpoint(db, key: str) -> dict:
+    return await db.migrations.find_one({'_id': key}) or {'_id': key, 'converted': 0, 'skipped': 0}
+
+
+async def _save_checkpoint(db, checkpoint: dict) -> None:
+    await db.migrations.replace_one({'_id': checkpoint['_id']}, checkpoint, upsert=True)
+
+
+async def migrate_datetimes(db, batch_size: int = 500, field: str = 'created_at') -> dict:
+    """Converte `created_at` de string ISO para datetime BSON em todas as coleções"""
+    summary = {}
+    for collection in DATETIME_COLLECTIONS:
+        checkpoint = await _load_checkpoint(db, f'datetimes:{collection}')
+        if checkpoint.get('done'):
+            summary[collection] = checkpoint['converted']
+            continue
+
+        while True:
+            query = {field: {'$type': 'string'}}
+            if checkpoint.get('last_id') is not None:
+                query['_id'] = {'$gt': checkpoint['last_id']}
+
+            batch = await db[collection].find(query, {field: 1}).sort('_id', 1).to_list(batch_size)
+            if not batch:
+                break
+
+            operations = []
+            for doc in batch:
+                parsed = parse_iso_datetime(doc[field])
+                if parsed is None:
+                    checkpoint['skipped'] += 1
+                    continue
+                # Condição no valor antigo: não sobrescreve escritas concorrentes
+                operations.append(UpdateOne(
+                    {'_id': doc['_id'], field: doc[field]},
+                    {'$set': {field: parsed}}
+                ))
+
+            if operations:
+                result = await db[collection].bulk_write(operations, ordered=False)
+                checkpoint['converted'] += result.modified_count
+
+            checkpoint['last_id'] = batch[-1]['_id']
+            await _save_checkpoint(db, checkpoint)
+            print(f"  {collection}: {checkpoint['converted']} convertidos")
+
+        checkpoint['done'] = True
+        await _save_checkpoint(db, checkpoint)
+        summary[collection] = checkpoint['converted']
+        if checkpoint['skipped']:
+            print(f"⚠️  {collection}: {checkpoint['skipped']} valores inválidos ignorados")
+
+    return summary
+
+
+async def migrate_conversations(db) -> bool:
+    """
+    Preenche a coleção `conversations` a partir do histórico (uma vez).
+    Retorna True se rodou agora, False se já estava concluída.
+    """
+    from conversations import rebuild_conversations
+
+    checkpoint = await _load_checkpoint(db, 'conversations:messages')
+    if checkpoint.get('done'):
+        return False
+    await rebuild_conversations(db)
+    checkpoint['done'] = True
+    await _save_checkpoint(db, checkpoint)
+    return True
+
+
+async def migrate_geo(db, batch_size: int = 500) -> int:
+    """Preenche users.geo (GeoJSON) a partir de users.location"""
+    from geo import location_to_point
+
+    checkpoint = await _load_checkpoint(db, 'geo:users')
+    while not checkpoint.get('done'):
+        query = {'location.lat': {'$exists': True}, 'geo': {'$exists': False}}
+        if checkpoint.get('last_id') is not None:
+            query['_id'] = {'$gt': checkpoint['last_id']}
+
+        batch = await db.users.find(query, {'location': 1}).sort('_id', 1).to_list(batch_size)
+        if not batch:
+            checkpoint['done'] = True
+            break
+
+        operations = []
+        for doc in batch:
+            point = location_to_point(doc['location'])
+            if point is None:
+                checkpoint['skipped'] += 1
+                continue
+            operations.append(UpdateOne({'_id': doc['_id'], 'geo': {'$exists': False}}, {'$set': {'geo': point}}))
+
+        if operations:
+            result = await db.users.bulk_write(operations, ordered=False)
+            checkpoint['converted'] += result.modified_count
+
+        checkpoint['last_id'] = batch[-1]['_id']
+        await _save_checkpoint(db, checkpoint)
+        print(f"  users: {checkpoint['converted']} localizações convertidas")
+
+    await _save_checkpoint(db, checkpoint)
+    return checkpoint['converted']
+
+
+def _template_category(text: str) -> str:
+    """Categoria de uma cópia antiga: pelo título (primeira linha) ou 'legacy'"""
+    from auto_responses import AUTO_RESPONSES
+
+    title = text.split('\n', 1)[0]
+    for category, response in AUTO_RESPONSES.items():
+        if response['title'] == title:
+            return category
+    return 'legacy'
+
+
+async def migrate_auto_responses(db, batch_size: int = 500) -> int:
+    """
+    Troca o texto copiado das mensagens automáticas por uma referência
+    {'category', 'version'}; cada texto distinto vira um único documento
+    em auto_response_templates (inclusive versões antigas dos modelos)
+    """
+    from auto_responses import sync_templates, template_version
+
+    await sync_templates(db)
+    known = set()
+    checkpoint = await _load_checkpoint(db, 'auto-responses:messages')
+    while not checkpoint.get('done'):
+        query = {'is_auto_response': True, 'message': {'$exists': True}, 'auto_response': {'$exists': False}}
+        if checkpoint.get('last_id') is not None:
+            query['_id'] = {'$gt': checkpoint['last_id']}
+
+        batch = await db.messages.find(query, {'message': 1}).sort('_id', 1).to_list(batch_size)
+        if not batch:
+            checkpoint['done'] = True
+            break
+
+        operations = []
+        for doc in batch:
+            text = doc['message']
+            ref = {'category': _template_category(text), 'version': template_version(text)}
+            if (ref['category'], ref['version']) not in known:
+                # O modelo é gravado antes das mensagens que apontam para ele
+                await db.auto_response_templates.update_one(
+                    {'category': ref['category'], 'version': ref['version']},
+                    {'$setOnInsert': {**ref, 'text': text}},
+                    upsert=True
+                )
+                known.add((ref['category'], ref['version']))
+            operations.append(UpdateOne(
+                {'_id': doc['_id'], 'message': text},
+                {'$set': {'auto_response': ref}, '$unset': {'message': ''}}
+            ))
+
+        result = await db.messages.bulk_write(operations, ordered=False)
+        checkpoint['converted'] += result.modified_count
+        checkpoint['last_id'] = batch[-1]['_id']
+        await _save_checkpoint(db, checkpoint)
+        print(f"  messages: {checkpoint['converted']} respostas automáticas convertidas")
+
+    await _save_checkpoint(db, checkpoint)
+    return checkpoint['converted']
+
+
+async def main(args) -> int:
+    from server import db
+
+    if args.reset:
+        await db.migrations.delete_many({'_id': {'$regex': f'^{args.migration}:'}})
+
+    if args.migration == 'datetimes':
+        summary = await migrate_datetimes(db, batch_size=args.batch_size)
+        print(f"✅ Datas convertidas: {summary}")
+    elif args.migration == 'conversations':
+        from indexes import ensure_indexes
+
+        await ensure_indexes(db)
+        await migrate_conversations(db)
+        print(f"✅ {await db.conversations.count_documents({})} resumos de conversa")
+    elif args.migration == 'geo':
+        converted = await migrate_geo(db, batch_size=args.batch_size)
+        print(f"✅ {converted} usuários com localização GeoJSON")
+    elif args.migration == 'auto-responses':
+        converted = await migrate_auto_responses(db, batch_size=args.batch_size)
+        templates = await db.auto_response_templates.count_documents({})
+        print(f"✅ {converted} mensagens automáticas agora apontam para {templates} modelos")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrações de dados do Watizat')
+    parser.add_argument('migration', choices=['datetimes', 'conversations', 'geo', 'auto-responses'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--reset', action='store_true', help='ignora o progresso salvo')
+    sys.exit(asyncio.run(main(parser.parse_args())))
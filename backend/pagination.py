@@ -0,0 +1,78 @@
+"""
+Paginação por cursor (keyset)
+O cursor é opaco para o cliente: base64 dos valores da última linha da página
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+    """Codifica os valores da chave de ordenação da última linha"""
+    payload = [{'$dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decodifica um cursor; levanta ValueError se for inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list):
+        raise ValueError('Invalid cursor')
+    return [_decode_value(v) for v in payload]
+
+
+def _decode_value(value: Any) -> Any:
+    """
+    Só strings e datetimes com fuso: os valores vêm do cliente e entram em
+    cláusulas de igualdade, então qualquer outro tipo (ex.: {"$gt": ""}) é
+    recusado em vez de virar operador do Mongo
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict) and set(value) == {'$dt'} and isinstance(value['$dt'], str):
+        try:
+            parsed = datetime.fromisoformat(value['$dt'])
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        if parsed.tzinfo is None:
+            raise ValueError('Invalid cursor')
+        return parsed
+    raise ValueError('Invalid cursor')
+
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], values: Sequence[Any]) -> dict:
+    """
+    Filtro que seleciona as linhas estritamente após `values` na ordem `sort`.
+    Ex: sort [(created_at, -1), (id, -1)] ->
+        created_at < v0 OR (created_at == v0 AND id < v1)
+    """
+    if len(sort) != len(values):
+        raise ValueError('Invalid cursor')
+
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        clause[field] = {'$lt' if direction < 0 else '$gt': values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+
+def apply_cursor(query: dict, sort: Sequence[Tuple[str, int]], cursor: str) -> dict:
+    """Combina a consulta original com o filtro do cursor"""
+    after = keyset_filter(sort, decode_cursor(cursor))
+    return {'$and': [query, after]} if query else after
+
+
+def clamp_limit(limit: int, default: int = MAX_PAGE_SIZE) -> int:
+    if not limit:
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,71 @@
+"""
+Hash de senhas (bcrypt) fora do event loop
+Executa hashpw/checkpw num pool de threads dedicado com limite de fila
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class HashingPoolSaturated(Exception):
+    """Fila de hashing cheia - a requisição deve ser rejeitada (429)"""
+
+
+class PasswordHasher:
+    """Pool limitado para operações bcrypt (o bcrypt libera o GIL)"""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='bcrypt'
+        )
+        # Operações aceitas e ainda não concluídas (em execução + na fila)
+        self._pending = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Operações aguardando uma thread livre"""
+        return max(0, self._pending - self.max_workers)
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HashingPoolSaturated()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    async def hash_password(self, password: str) -> str:
+        hashed = await self._run(_hash, password.encode())
+        return hashed.decode()
+
+    async def verify_password(self, password: str, hashed: str) -> bool:
+        return await self._run(bcrypt.checkpw, password.encode(), hashed.encode())
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': min(self._pending, self.max_workers),
+            'queue_depth': self.queue_depth,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _hash(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
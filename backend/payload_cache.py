@@ -0,0 +1,41 @@
+"""
+Respostas JSON pré-serializadas com ETag forte
+
+O corpo é serializado uma única vez; requisições com If-None-Match
+igual ao ETag recebem 304 sem corpo.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+class PrecomputedPayload:
+    def __init__(self, content: Any, version: Optional[str] = None):
+        self.body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{version}-{digest}"' if version else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Comparação fraca (RFC 9110): W/"x" corresponde a "x"
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def payload_response(request: Request, payload: PrecomputedPayload, max_age: int = 300) -> Response:
+    """200 com o corpo pré-serializado ou 304 se o cliente já tem esta versão"""
+    headers = {
+        'ETag': payload.etag,
+        'Cache-Control': f'public, max-age={max_age}'
+    }
+    if _etag_matches(request.headers.get('if-none-match'), payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type='application/json', headers=headers)
@@ -1,11 +1,34 @@
-import os
+import logging
 from pathlib import Path
-from typing import List
-import pickle
+from typing import List, Optional, Tuple
+
+from chunk_store import ChunkStore
+from embeddings import Embedder, HashingEmbedder
+from search_index import BM25Index
+from vector_index import SemanticRetriever
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = Path(__file__).parent / 'watizat_index.pkl'
+DEFAULT_STORE_PATH = Path(__file__).parent / 'knowledge_store'
+
+# Palavras-chave (sinônimos) de cada categoria, indexadas junto com os trechos
+CATEGORY_KEYWORDS = {
+    "alimentacao": ["comida", "alimento", "comer", "fome"],
+    "juridico": ["juridico", "legal", "advogado", "direito", "asilo"],
+    "saude": ["saude", "medico", "hospital", "doente"],
+    "moradia": ["moradia", "casa", "abrigo", "dormir"],
+    "trabalho": ["trabalho", "emprego", "trabalhar"],
+    "educacao": ["educacao", "escola", "estudar", "curso"],
+}
 
 class WatizatPDFProcessor:
     def __init__(self):
         self.knowledge_base = self._load_knowledge_base()
+        # Índice construído uma vez (na importação do servidor)
+        self.index = self._build_index()
+        # Busca semântica no guia completo (load_index)
+        self.retriever: Optional[SemanticRetriever] = None
         
     def _load_knowledge_base(self) -> dict:
         """Carrega base de conhecimento do Watizat"""
@@ -47,49 +70,54 @@ class WatizatPDFProcessor:
             ]
         }
     
+    def _build_index(self) -> BM25Index:
+        """Um documento por trecho; as palavras-chave da categoria entram junto para manter os sinônimos"""
+        self._chunks = []
+        documents = []
+        for category, texts in self.knowledge_base.items():
+            keywords = ' '.join(CATEGORY_KEYWORDS.get(category, ()))
+            for text in texts:
+                self._chunks.append(text)
+                documents.append(f"{text} {keywords}")
+        return BM25Index(documents)
+    
     def search(self, query: str, k: int = 3) -> List[str]:
-        """Busca informações relevantes na base de conhecimento"""
-        query_lower = query.lower()
-        results = []
-        
-        keywords_map = {
-            "comida": "alimentacao",
-            "alimento": "alimentacao",
-            "comer": "alimentacao",
-            "fome": "alimentacao",
-            "juridico": "juridico",
-            "legal": "juridico",
-            "advogado": "juridico",
-            "direito": "juridico",
-            "asilo": "juridico",
-            "saude": "saude",
-            "medico": "saude",
-            "hospital": "saude",
-            "doente": "saude",
-            "moradia": "moradia",
-            "casa": "moradia",
-            "abrigo": "moradia",
-            "dormir": "moradia",
-            "trabalho": "trabalho",
-            "emprego": "trabalho",
-            "trabalhar": "trabalho",
-            "educacao": "educacao",
-            "escola": "educacao",
-            "estudar": "educacao",
-            "curso": "educacao"
-        }
-        
-        for keyword, category in keywords_map.items():
-            if keyword in query_lower:
-                results.extend(self.knowledge_base[category])
-                if len(results) >= k:
-                    break
-        
-        if not results:
-            results = self.knowledge_base["geral"]
-        
-        return results[:k]
+        """Trechos mais relevantes para a pergunta (ranking BM25)"""
+        return self.keyword_search(query, k) or self.knowledge_base["geral"][:k]
     
-    def load_index(self) -> bool:
-        """Compatibilidade - sempre retorna True"""
+    def keyword_search(self, query: str, k: int = 3) -> List[str]:
+        """Como search(), mas vazio quando nenhuma palavra da pergunta aparece na base"""
+        return [self._chunks[doc_id] for doc_id, _ in self.index.search(query, k)]
+    
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[str]]:
+        return [
+            [self._chunks[doc_id] for doc_id, _ in hits] if hits else self.knowledge_base["geral"][:k]
+            for hits in self.index.search_batch(queries, k)
+        ]
+    
+    def load_index(self, embedder: Optional[Embedder] = None, path: Path = DEFAULT_INDEX_PATH,
+                   store_path: Path = DEFAULT_STORE_PATH) -> bool:
+        """
+        Carrega o índice vetorial do guia: o knowledge_store gerado pelo
+        ingest_pdfs.py, se existir; senão o watizat_index.pkl
+        """
+        embedder = embedder or HashingEmbedder()
+        source = store_path if ChunkStore.exists(store_path) else path
+        try:
+            if source == store_path:
+                self.retriever = SemanticRetriever.from_store(store_path, embedder)
+            else:
+                self.retriever = SemanticRetriever.from_pickle(path, embedder)
+        except Exception as e:
+            logger.error(f"Error loading vector index {source}: {e}")
+            return False
         return True
+    
+    def semantic_search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """
+        Trechos do guia mais próximos da pergunta, só os relevantes; vazio se
+        nada passar do corte ou se o índice não foi carregado
+        """
+        if self.retriever is None:
+            return []
+        return self.retriever.search(query, k)
@@ -0,0 +1,53 @@
+"""
+Contador de comandos MongoDB por requisição
+Usa o command monitoring do pymongo + contextvars (o motor propaga o
+contexto para as threads do executor)
+"""
+
+import contextvars
+from typing import Optional
+
+from pymongo import monitoring
+
+_current_counter: contextvars.ContextVar = contextvars.ContextVar('db_query_counter', default=None)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.commands = {}
+
+    def record(self, command_name: str) -> None:
+        self.count += 1
+        self.commands[command_name] = self.commands.get(command_name, 0) + 1
+
+
+class QueryCountListener(monitoring.CommandListener):
+    """Conta os comandos iniciados dentro de uma requisição"""
+
+    def started(self, event):
+        counter = _current_counter.get()
+        if counter is not None:
+            counter.record(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def start_query_count():
+    """Inicia a contagem para a requisição atual; retorna (contador, token)"""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    return counter, token
+
+
+def stop_query_count(token) -> None:
+    _current_counter.reset(token)
+
+
+def current_query_count() -> Optional[int]:
+    counter = _current_counter.get()
+    return counter.count if counter is not None else None
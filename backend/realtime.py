@@ -0,0 +1,137 @@
+"""
+Entrega de mensagens em tempo real (WebSocket)
+
+- MessageHub: conexões WebSocket deste processo, por user_id
+- MessageBroker: leva os eventos até o hub de cada worker
+    - LocalBroker: em memória, um único processo (dev e testes)
+    - MongoChangeStreamBroker: change stream em `messages`; cada worker
+      recebe todas as inserções e entrega aos seus próprios clientes
+      (exige replica set, como no MongoDB Atlas)
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Set
+
+from auto_responses import expand_auto_responses
+
+logger = logging.getLogger(__name__)
+
+
+class MessageHub:
+    """Filas de saída das conexões WebSocket locais"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def deliver(self, user_id: str, event: dict) -> int:
+        """Entrega o evento a todas as conexões do usuário; cliente lento perde eventos"""
+        count = 0
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+                count += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+        self.delivered += count
+        return count
+
+    def stats(self) -> dict:
+        return {
+            'connected_users': len(self._subscribers),
+            'connections': sum(len(q) for q in self._subscribers.values()),
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+
+class MessageBroker(ABC):
+    """Interface dos brokers: publish() é chamado após cada inserção em messages"""
+
+    def __init__(self, hub: MessageHub):
+        self.hub = hub
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: str, event: dict) -> None:
+        """Entrega `event` às conexões de `user_id` (em todos os workers)"""
+
+
+class LocalBroker(MessageBroker):
+    """Entrega direta no hub do próprio processo"""
+
+    async def publish(self, user_id: str, event: dict) -> None:
+        self.hub.deliver(user_id, event)
+
+
+class MongoChangeStreamBroker(MessageBroker):
+    """Fan-out entre workers via change stream da coleção messages"""
+
+    def __init__(self, hub: MessageHub, db, retry_delay: float = 5.0):
+        super().__init__(hub)
+        self.db = db
+        self.retry_delay = retry_delay
+        self._task = None
+        self._resume_token = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def publish(self, user_id: str, event: dict) -> None:
+        # A própria inserção em messages é o evento; nada a publicar
+        pass
+
+    async def _watch(self) -> None:
+        pipeline = [{'$match': {'operationType': 'insert'}}]
+        while True:
+            try:
+                async with self.db.messages.watch(pipeline, resume_after=self._resume_token) as stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        message = change['fullDocument']
+                        message.pop('_id', None)
+                        await expand_auto_responses(self.db, [message])
+                        self.hub.deliver(message['to_user_id'], {'type': 'message', 'message': message})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Message change stream error: {e}")
+                await asyncio.sleep(self.retry_delay)
+
+
+def create_broker(kind: str, hub: MessageHub, db) -> MessageBroker:
+    if kind == 'mongo':
+        return MongoChangeStreamBroker(hub, db)
+    if kind == 'local':
+        return LocalBroker(hub)
+    raise ValueError(f"Unknown realtime broker: {kind}")
@@ -0,0 +1,118 @@
+"""
+Índice invertido com ranking BM25 para a base de conhecimento
+
+- Tokens em minúsculas, sem acentos e com plurais simples reduzidos
+  ("médicos" -> "medico", "abrigos" -> "abrigo", "informações" -> "informacao")
+- O peso BM25 de cada (termo, documento) é calculado uma vez na construção;
+  a consulta só soma os pesos das listas de postings dos termos
+- Os k melhores são escolhidos com heapq.nlargest (sem ordenar tudo)
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Palavras muito comuns (pt/fr) que não ajudam a ranquear
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em eu me meu minha na nas no nos o os ou para
+pela pelo por que se sem sou um uma uns umas ja tem ter esta estou onde qual quais
+au aux avec ce dans des du en et il la le les mon ne ou par pas pour qui sur un une vous
+""".split())
+
+# Sufixos de plural (já sem acentos), do mais longo para o mais curto
+PLURAL_SUFFIXES = (
+    ('coes', 'cao'), ('soes', 'sao'), ('oes', 'ao'), ('aes', 'ao'),
+    ('ais', 'al'), ('eis', 'el'), ('ns', 'm'), ('res', 'r'), ('zes', 'z'), ('s', ''),
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+@lru_cache(maxsize=65536)
+def normalize_token(token: str) -> str:
+    """Forma indexada de uma palavra ('' para stopwords); cache porque o vocabulário é pequeno"""
+    token = fold(token)
+    return '' if token in STOPWORDS else stem(token)
+
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in map(normalize_token, TOKEN_RE.findall(text.lower())) if term]
+
+
+class BM25Index:
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+
+        term_freqs: List[Dict[str, int]] = []
+        lengths = []
+        for text in documents:
+            freqs: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                freqs[token] = freqs.get(token, 0) + 1
+            term_freqs.append(freqs)
+            lengths.append(len(tokens))
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+        doc_freq: Dict[str, int] = {}
+        for freqs in term_freqs:
+            for term in freqs:
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        # Peso de cada posting já com idf e normalização de tamanho
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, freqs in enumerate(term_freqs):
+            norm = k1 * (1 - b + b * lengths[doc_id] / avg_length) if avg_length else k1
+            for term, tf in freqs.items():
+                df = doc_freq[term]
+                idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                self.postings.setdefault(term, []).append((doc_id, weight))
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Pares (documento, score) dos k melhores, do maior score para o menor"""
+        return self._search_terms(tokenize(query), k)
+
+    def search_batch(self, queries: Iterable[str], k: int = 3) -> List[List[Tuple[int, float]]]:
+        """Várias consultas de uma vez; consultas iguais após normalização são calculadas uma vez"""
+        results = []
+        seen: Dict[Tuple[str, ...], List[Tuple[int, float]]] = {}
+        for query in queries:
+            terms = tuple(sorted(tokenize(query)))
+            if terms not in seen:
+                seen[terms] = self._search_terms(terms, k)
+            results.append(seen[terms])
+        return results
+
+    def _search_terms(self, terms: Iterable[str], k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        if not scores or k <= 0:
+            return []
+        # Empate: documento mais antigo primeiro (ordem estável)
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -10,23 +11,41 @@ from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import jwt
 # REMOVIDO: emergentintegrations não disponível no Render
 # from emergentintegrations.llm.chat import LlmChat, UserMessage
 from pdf_processor import WatizatPDFProcessor
-from auto_responses import get_auto_response, format_auto_response_post
+from embeddings import create_embedder
+from auto_responses import (
+    get_auto_response, format_auto_response_post, auto_response_ref, expand_auto_response, expand_auto_responses,
+    sync_templates
+)
 from help_locations import HELP_LOCATIONS, get_all_help_locations, get_help_locations_by_category
-import math
+from user_cache import UserCache
+from password_hashing import PasswordHasher, HashingPoolSaturated
+from indexes import ensure_indexes
+from migrations import migrate_conversations, migrate_datetimes, migrate_geo
+from pagination import apply_cursor, clamp_limit, decode_cursor, encode_cursor
+from query_counter import QueryCountListener, start_query_count, stop_query_count
+import conversations as conversation_summaries
+from realtime import MessageHub, create_broker
+from snapshot_cache import SnapshotCache
+from write_behind import WriteBehindBuffer
+from timelines import TimelineStore
+from geo import geo_update, location_to_point
+from spatial_index import HelpLocationIndex
+from payload_cache import PrecomputedPayload, payload_response
+from job_refresher import JobRefresher
+from job_sources import JobAggregator, JobIndex, build_sources
+import asyncio
 from urllib.parse import urlparse
-import aiohttp
-import re
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: created_at é armazenado como datetime BSON e lido já com timezone UTC
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[QueryCountListener()])
 
 # Extrai o nome do banco de dados da URL ou usa DB_NAME
 def get_database_name():
@@ -62,6 +81,17 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Número de comandos MongoDB executados pela requisição (header X-DB-Queries)
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    counter, token = start_query_count()
+    try:
+        response = await call_next(request)
+    finally:
+        stop_query_count(token)
+    response.headers['X-DB-Queries'] = str(counter.count)
+    return response
+
 api_router = APIRouter(prefix="/api")
 
 @api_router.get("/")
@@ -73,6 +103,39 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'default_secret')
 ALGORITHM = "HS256"
 
 pdf_processor = WatizatPDFProcessor()
+# Embedder local da busca semântica; EMBEDDING_MODEL deve ser o modelo que gerou o watizat_index.pkl
+EMBEDDER = os.environ.get('EMBEDDER', 'hashing')
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+# Trechos gerados pelo ingest_pdfs.py (se não existir, usa o watizat_index.pkl)
+KNOWLEDGE_STORE_PATH = Path(os.environ.get('KNOWLEDGE_STORE_PATH', ROOT_DIR / 'knowledge_store'))
+
+# Cache dos usuários autenticados (evita um find_one por requisição)
+user_cache = UserCache(
+    max_size=int(os.environ.get('USER_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('USER_CACHE_TTL', '60'))
+)
+
+# bcrypt roda num pool dedicado para não bloquear o event loop
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get('BCRYPT_WORKERS', '2')),
+    max_queue=int(os.environ.get('BCRYPT_MAX_QUEUE', '32'))
+)
+
+# Mensagens em tempo real: 'local' (um processo) ou 'mongo' (change stream, vários workers)
+message_hub = MessageHub()
+message_broker = create_broker(os.environ.get('REALTIME_BROKER', 'local'), message_hub, db)
+
+# Registros só inseridos (ai_chats, respostas automáticas) gravados em lote fora da requisição
+write_behind = WriteBehindBuffer(
+    db,
+    max_batch=int(os.environ.get('WRITE_BEHIND_BATCH', '100')),
+    flush_interval=float(os.environ.get('WRITE_BEHIND_INTERVAL', '1.0')),
+    max_pending=int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+)
+
+# Feed dos voluntários: 'query' (consulta filtrada) ou 'timeline' (buckets pré-calculados, fan-out na escrita)
+FEED_MODE = os.environ.get('FEED_MODE', 'query')
+timelines = TimelineStore(db, cap=int(os.environ.get('TIMELINE_CAP', '500'))) if FEED_MODE == 'timeline' else None
 
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -201,15 +264,24 @@ def create_token(user_id: str, email: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+async def authenticate_token(token: str) -> User:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
         user_id = payload.get('user_id')
         
+        cached_user = user_cache.get(user_id)
+        if cached_user is not None:
+            return cached_user
+        
         user = await db.users.find_one({'id': user_id}, {'_id': 0})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+        
+        validated_user = User(**user)
+        user_cache.set(user_id, validated_user)
+        return validated_user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception:
@@ -221,7 +293,10 @@ async def register(user_data: UserRegister):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_pw = bcrypt.hashpw(user_data.password.encode(), bcrypt.gensalt())
+    try:
+        hashed_pw = await password_hasher.hash_password(user_data.password)
+    except HashingPoolSaturated:
+        raise HTTPException(status_code=429, detail="Too many requests, try again later")
     
     user = User(
         email=user_data.email,
@@ -231,8 +306,7 @@ async def register(user_data: UserRegister):
     )
     
     user_dict = user.model_dump()
-    user_dict['password'] = hashed_pw.decode()
-    user_dict['created_at'] = user_dict['created_at'].isoformat()
+    user_dict['password'] = hashed_pw
     
     if user_data.role == 'volunteer':
         user_dict['professional_area'] = user_data.professional_area
@@ -261,6 +335,10 @@ async def register(user_data: UserRegister):
         user_dict['location'] = user_data.location
         user_dict['show_location'] = user_data.show_location
     
+    geo_point = location_to_point(user_dict.get('location'))
+    if geo_point:
+        user_dict['geo'] = geo_point
+    
     await db.users.insert_one(user_dict)
     
     token = create_token(user.id, user.email)
@@ -273,13 +351,15 @@ async def login(credentials: UserLogin):
     if not user_data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(credentials.password.encode(), user_data['password'].encode()):
+    try:
+        password_ok = await password_hasher.verify_password(credentials.password, user_data['password'])
+    except HashingPoolSaturated:
+        raise HTTPException(status_code=429, detail="Too many requests, try again later")
+    
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user_data.pop('password')
-    if isinstance(user_data['created_at'], str):
-        user_data['created_at'] = datetime.fromisoformat(user_data['created_at'])
-    
     user = User(**user_data)
     token = create_token(user.id, user.email)
     
@@ -294,12 +374,15 @@ async def update_profile(updates: dict, current_user: User = Depends(get_current
     allowed_fields = ['name', 'bio', 'location', 'languages', 'categories']
     update_data = {k: v for k, v in updates.items() if k in allowed_fields}
     
-    await db.users.update_one({'id': current_user.id}, {'$set': update_data})
+    update_ops = {'$set': update_data}
+    if 'location' in update_data:
+        for op, fields in geo_update(update_data['location']).items():
+            update_ops.setdefault(op, {}).update(fields)
     
-    updated_user = await db.users.find_one({'id': current_user.id}, {'_id': 0, 'password': 0})
-    if isinstance(updated_user['created_at'], str):
-        updated_user['created_at'] = datetime.fromisoformat(updated_user['created_at'])
+    await db.users.update_one({'id': current_user.id}, update_ops)
+    user_cache.invalidate(current_user.id)
     
+    updated_user = await db.users.find_one({'id': current_user.id}, {'_id': 0, 'password': 0})
     return User(**updated_user)
 
 @api_router.post("/posts", response_model=Post)
@@ -314,23 +397,27 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
     )
     
     post_dict = post.model_dump()
-    post_dict['created_at'] = post_dict['created_at'].isoformat()
     post_dict['images'] = post_data.images or []
     
     await db.posts.insert_one(post_dict)
+    if timelines is not None:
+        await timelines.fan_out(post_dict)
     
     if post_data.type == 'need':
         auto_response = get_auto_response(post_data.category)
         if auto_response:
+            # Referência ao modelo (categoria + versão) em vez de copiar o texto
             message_data = {
                 'id': str(uuid.uuid4()),
                 'from_user_id': 'system',
                 'to_user_id': current_user.id,
-                'message': f"{auto_response['title']}\n\n{auto_response['content']}",
-                'created_at': datetime.now(timezone.utc).isoformat(),
+                'auto_response': auto_response_ref(post_data.category),
+                'created_at': datetime.now(timezone.utc),
                 'is_auto_response': True
             }
-            await db.messages.insert_one(message_data)
+            # Só inserida: gravada em lote pelo write-behind
+            await write_behind.put('messages', message_data)
+            await publish_message(expand_auto_response(dict(message_data)))
     
     return post
 
@@ -343,38 +430,129 @@ async def add_comment(post_id: str, comment_data: PostCommentCreate, current_use
     )
     
     comment_dict = comment.model_dump()
-    comment_dict['created_at'] = comment_dict['created_at'].isoformat()
     
     await db.comments.insert_one(comment_dict)
     return comment
 
+COMMENTS_SORT = [('created_at', 1), ('id', 1)]
+
 @api_router.get("/posts/{post_id}/comments")
-async def get_comments(post_id: str):
-    comments = await db.comments.find({'post_id': post_id}, {'_id': 0}).sort('created_at', 1).to_list(1000)
+async def get_comments(post_id: str, response: Response, cursor: Optional[str] = None, limit: int = 100):
+    """
+    Comentários de um post em ordem cronológica, paginados por cursor.
+    Sempre 2 consultas: a página de comentários e os autores via $in.
+    """
+    query = {'post_id': post_id}
+    if cursor:
+        try:
+            query = apply_cursor(query, COMMENTS_SORT, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    limit = clamp_limit(limit)
+    comments = await db.comments.find(query, {'_id': 0}).sort(COMMENTS_SORT).to_list(limit)
+    
+    if len(comments) == limit:
+        last = comments[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last['created_at'], last['id'])
+    
+    # Batch fetch dos autores para evitar N+1 queries
+    user_ids = list(set(comment['user_id'] for comment in comments))
+    users_dict = {}
+    if user_ids:
+        users_cursor = db.users.find({'id': {'$in': user_ids}}, {'_id': 0, 'id': 1, 'name': 1, 'role': 1})
+        async for user in users_cursor:
+            users_dict[user['id']] = user
     
     for comment in comments:
-        if isinstance(comment['created_at'], str):
-            comment['created_at'] = datetime.fromisoformat(comment['created_at'])
-        
-        user = await db.users.find_one({'id': comment['user_id']}, {'_id': 0, 'password': 0, 'email': 0})
+        user = users_dict.get(comment['user_id'])
         if user:
             comment['user'] = {'name': user['name'], 'role': user['role']}
     
     return comments
 
+POSTS_FEED_SORT = [('created_at', -1), ('id', -1)]
+
+def volunteer_feed_filter(help_categories: List[str]) -> Optional[dict]:
+    """
+    Posts visíveis para voluntários: ofertas e pedidos das categorias em que
+    podem ajudar. Sem categorias definidas, vê tudo (None = sem filtro).
+    Cada ramo do $or usa um índice ordenado (feed_by_type e
+    feed_by_type_category), e o Mongo intercala os dois pela ordenação.
+    """
+    if not help_categories:
+        return None
+    return {'$or': [
+        {'type': 'offer'},
+        {'type': 'need', 'category': {'$in': help_categories}}
+    ]}
+
+async def timeline_page(help_categories: List[str], cursor: Optional[str], limit: int):
+    """Página do feed montada pelas timelines; None = usar a consulta normal"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Os valores são comparados em Python (não no Mongo): (datetime com fuso, id)
+    if after is not None and not (
+        len(after) == 2 and isinstance(after[0], datetime) and after[0].tzinfo is not None
+        and isinstance(after[1], str)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    ids = await timelines.page(help_categories, after, limit)
+    if ids is None:
+        return None
+    posts = {post['id']: post async for post in db.posts.find({'id': {'$in': ids}}, {'_id': 0})}
+    if len(posts) < len(ids):
+        return None  # post removido depois do fan-out
+    return [posts[post_id] for post_id in ids]
+
 @api_router.get("/posts")
-async def get_posts(type: Optional[str] = None, category: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def get_posts(
+    response: Response,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Feed de posts paginado por cursor em (created_at, id).
+    O cursor da próxima página vem no header X-Next-Cursor.
+    """
     query = {}
     if type:
         query['type'] = type
     if category:
         query['category'] = category
     
-    posts = await db.posts.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
-    
-    # Se o usuário é voluntário, filtrar posts baseado nas categorias que ele pode ajudar
-    user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0})
-    user_help_categories = user_data.get('help_categories', []) if user_data else []
+    # Voluntários e helpers só veem pedidos ("need") das categorias em que
+    # podem ajudar; o filtro vai para o Mongo para que cada página venha cheia
+    help_categories = []
+    if current_user.role in ['volunteer', 'helper']:
+        user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0, 'help_categories': 1})
+        help_categories = user_data.get('help_categories', []) if user_data else []
+        visibility = volunteer_feed_filter(help_categories)
+        if visibility:
+            query = {'$and': [query, visibility]} if query else visibility
+    
+    limit = clamp_limit(limit)
+    posts = None
+    if timelines is not None and help_categories and not type and not category:
+        posts = await timeline_page(help_categories, cursor, limit)
+    
+    if posts is None:
+        if cursor:
+            try:
+                query = apply_cursor(query, POSTS_FEED_SORT, cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        posts = await db.posts.find(query, {'_id': 0}).sort(POSTS_FEED_SORT).to_list(limit)
+    
+    if len(posts) == limit:
+        last = posts[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last['created_at'], last['id'])
     
     # Batch fetch all unique user_ids to avoid N+1 queries
     user_ids = list(set(post['user_id'] for post in posts if post['user_id'] != 'system'))
@@ -384,11 +562,7 @@ async def get_posts(type: Optional[str] = None, category: Optional[str] = None,
         async for user in users_cursor:
             users_dict[user['id']] = user
     
-    filtered_posts = []
     for post in posts:
-        if isinstance(post['created_at'], str):
-            post['created_at'] = datetime.fromisoformat(post['created_at'])
-        
         if post['user_id'] == 'system':
             post['user'] = {'name': 'Watizat Assistant', 'role': 'assistant'}
         else:
@@ -396,43 +570,59 @@ async def get_posts(type: Optional[str] = None, category: Optional[str] = None,
             if user:
                 display_name = user.get('display_name') if user.get('use_display_name') else user['name']
                 post['user'] = {'name': display_name, 'role': user['role']}
-        
-        # Se é voluntário ou helper e o post é do tipo "need" (precisa de ajuda)
-        # só mostrar se a categoria do post está nas categorias que ele pode ajudar
-        if current_user.role in ['volunteer', 'helper']:
-            if post['type'] == 'need':
-                # Se não tem categorias definidas ou a categoria do post está nas dele
-                if not user_help_categories or post['category'] in user_help_categories:
-                    post['can_help'] = True
-                    filtered_posts.append(post)
-            else:
-                # Posts de oferta (type='offer') todos podem ver
-                post['can_help'] = True
-                filtered_posts.append(post)
-        else:
-            # Migrantes e outros usuários veem todos os posts
-            post['can_help'] = True
-            filtered_posts.append(post)
+        post['can_help'] = True
     
-    return filtered_posts
+    return posts
+
+async def build_services_payloads():
+    """Serviços agrupados por categoria, já serializados (None = todos)"""
+    services = await db.services.find({}, {'_id': 0}).to_list(1000)
+    by_category = {}
+    for service in services:
+        by_category.setdefault(service.get('category'), []).append(service)
+    
+    payloads = {None: PrecomputedPayload(services[:100])}
+    for cat, items in by_category.items():
+        payloads[cat] = PrecomputedPayload(items[:100])
+    return payloads
+
+EMPTY_LIST_PAYLOAD = PrecomputedPayload([])
+
+# Serviços só mudam via scripts de seed; snapshot renovado após SERVICES_MAX_AGE
+services_cache = SnapshotCache(
+    build_services_payloads,
+    max_age=float(os.environ.get('SERVICES_MAX_AGE', '300')),
+    name='services'
+)
 
 @api_router.get("/services")
-async def get_services(category: Optional[str] = None):
-    query = {}
-    if category:
-        query['category'] = category
+async def get_services(request: Request, category: Optional[str] = None):
+    try:
+        payloads = await services_cache.get()
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Services temporarily unavailable")
     
-    services = await db.services.find(query, {'_id': 0}).to_list(100)
-    return services
+    payload = payloads.get(category or None) or EMPTY_LIST_PAYLOAD
+    return payload_response(request, payload, max_age=300)
 
 @api_router.post("/ai/chat")
 async def ai_chat(message_data: AIMessage, current_user: User = Depends(get_current_user)):
     """
-    Endpoint de chat com IA - DESABILITADO no Render
-    A funcionalidade de IA requer integração específica não disponível neste deploy.
+    Chat de ajuda sem LLM: responde com os trechos do guia Watizat mais
+    próximos da pergunta (busca semântica local no watizat_index.pkl)
     """
-    # Retornar resposta informativa em vez de erro
-    response_text = """Olá! O assistente de IA do Watizat está temporariamente indisponível nesta versão.
+    hits = await asyncio.to_thread(pdf_processor.semantic_search, message_data.message, 3)
+    sources = [chunk for chunk, _ in hits]
+    if not sources:
+        # Nada relevante no guia: tenta a base curada (BM25, com sinônimos em português)
+        sources = pdf_processor.keyword_search(message_data.message, 3)
+    
+    if sources:
+        excerpts = '\n\n'.join(f"• {chunk[:400].strip()}…" for chunk in sources)
+        response_text = f"Encontrei estas informações no guia Watizat:\n\n{excerpts}"
+    else:
+        # Retornar resposta informativa em vez de erro
+        response_text = """Olá! O assistente de IA do Watizat está temporariamente indisponível nesta versão.
 
 Para obter ajuda, você pode:
 • Criar um post na seção "Preciso de Ajuda"
@@ -449,11 +639,11 @@ Estamos trabalhando para restaurar esta funcionalidade em breve!"""
         'response': response_text,
         'language': message_data.language,
         'ai_enabled': False,
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'created_at': datetime.now(timezone.utc)
     }
-    await db.ai_chats.insert_one(chat_record)
+    await write_behind.put('ai_chats', chat_record)
     
-    return {'response': response_text, 'sources': [], 'ai_enabled': False}
+    return {'response': response_text, 'sources': sources, 'ai_enabled': False}
 
 @api_router.post("/matches")
 async def create_match(helper_id: str, current_user: User = Depends(get_current_user)):
@@ -467,7 +657,6 @@ async def create_match(helper_id: str, current_user: User = Depends(get_current_
     )
     
     match_dict = match.model_dump()
-    match_dict['created_at'] = match_dict['created_at'].isoformat()
     
     await db.matches.insert_one(match_dict)
     return match
@@ -483,39 +672,91 @@ async def get_matches(current_user: User = Depends(get_current_user)):
     matches = await db.matches.find(query, {'_id': 0}).to_list(100)
     return matches
 
+STATS_CATEGORIES = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport']
+
+def _collection_count(collection: str) -> dict:
+    """Estágio que acrescenta a contagem de outra coleção ({'c': coleção}, n) ao resultado"""
+    return {'$unionWith': {'coll': collection, 'pipeline': [
+        {'$count': 'n'},
+        {'$project': {'_id': {'c': collection}, 'n': 1}}
+    ]}}
+
+async def compute_admin_stats():
+    """
+    Duas consultas, em paralelo: uma agregação com as contagens agrupadas
+    de users e posts e a de matches (unidas com $unionWith), e o total de
+    messages pelos metadados da coleção (estimated_document_count), para
+    não percorrer a maior coleção a cada revalidação
+    """
+    rows, total_messages = await asyncio.gather(
+        db.users.aggregate([
+            {'$group': {'_id': {'c': 'users', 'role': '$role'}, 'n': {'$sum': 1}}},
+            {'$unionWith': {'coll': 'posts', 'pipeline': [
+                {'$group': {'_id': {'c': 'posts', 'category': '$category', 'type': '$type'}, 'n': {'$sum': 1}}}
+            ]}},
+            _collection_count('matches'),
+        ]).to_list(None),
+        db.messages.estimated_document_count()
+    )
+    
+    totals = {}
+    users_by_role = {}
+    posts_by_type = {}
+    category_counts = {}
+    for row in rows:
+        key = row['_id']
+        totals[key['c']] = totals.get(key['c'], 0) + row['n']
+        if key['c'] == 'users':
+            users_by_role[key.get('role')] = users_by_role.get(key.get('role'), 0) + row['n']
+        elif key['c'] == 'posts':
+            posts_by_type[key.get('type')] = posts_by_type.get(key.get('type'), 0) + row['n']
+            category_counts[key.get('category')] = category_counts.get(key.get('category'), 0) + row['n']
+    
+    return {
+        'total_users': totals.get('users', 0),
+        'total_posts': totals.get('posts', 0),
+        'total_matches': totals.get('matches', 0),
+        'total_volunteers': users_by_role.get('volunteer', 0),
+        'total_migrants': users_by_role.get('migrant', 0),
+        'total_messages': total_messages,
+        'posts_by_category': {cat: category_counts.get(cat, 0) for cat in STATS_CATEGORIES},
+        'needs_count': posts_by_type.get('need', 0),
+        'offers_count': posts_by_type.get('offer', 0)
+    }
+
+# Dashboard servido do snapshot; recalculado em segundo plano após ADMIN_STATS_MAX_AGE
+admin_stats_cache = SnapshotCache(
+    compute_admin_stats,
+    max_age=float(os.environ.get('ADMIN_STATS_MAX_AGE', '60')),
+    name='admin stats'
+)
+
 @api_router.get("/admin/stats")
 async def admin_stats(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
-    total_users = await db.users.count_documents({})
-    total_posts = await db.posts.count_documents({})
-    total_matches = await db.matches.count_documents({})
-    total_volunteers = await db.users.count_documents({'role': 'volunteer'})
-    total_migrants = await db.users.count_documents({'role': 'migrant'})
-    total_messages = await db.messages.count_documents({})
-    
-    # Posts por categoria
-    posts_by_category = {}
-    categories = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport']
-    for cat in categories:
-        count = await db.posts.count_documents({'category': cat})
-        posts_by_category[cat] = count
-    
-    # Posts por tipo
-    needs_count = await db.posts.count_documents({'type': 'need'})
-    offers_count = await db.posts.count_documents({'type': 'offer'})
+    try:
+        return await admin_stats_cache.get()
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Stats temporarily unavailable")
+
+@api_router.get("/admin/metrics")
+async def admin_metrics(current_user: User = Depends(get_current_user)):
+    """Métricas internas do processo (caches, filas)"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
     
     return {
-        'total_users': total_users,
-        'total_posts': total_posts,
-        'total_matches': total_matches,
-        'total_volunteers': total_volunteers,
-        'total_migrants': total_migrants,
-        'total_messages': total_messages,
-        'posts_by_category': posts_by_category,
-        'needs_count': needs_count,
-        'offers_count': offers_count
+        'user_cache': user_cache.stats(),
+        'password_hashing': password_hasher.stats(),
+        'realtime': message_hub.stats(),
+        'write_behind': write_behind.stats(),
+        'timelines': timelines.stats() if timelines is not None else None,
+        'admin_stats': admin_stats_cache.stats(),
+        'sidebar': sidebar_cache.stats(),
+        'jobs': job_refresher.stats(),
+        'job_sources': job_aggregator.stats()
     }
 
 @api_router.get("/admin/users")
@@ -524,11 +765,6 @@ async def admin_get_users(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin only")
     
     users = await db.users.find({}, {'_id': 0, 'password': 0}).sort('created_at', -1).to_list(1000)
-    
-    for user in users:
-        if isinstance(user.get('created_at'), str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-    
     return users
 
 @api_router.get("/admin/posts")
@@ -547,8 +783,6 @@ async def admin_get_posts(current_user: User = Depends(get_current_user)):
             users_dict[user['id']] = user
     
     for post in posts:
-        if isinstance(post.get('created_at'), str):
-            post['created_at'] = datetime.fromisoformat(post['created_at'])
         # Get user info from batch
         user = users_dict.get(post.get('user_id'))
         if user:
@@ -566,12 +800,16 @@ async def admin_delete_user(user_id: str, current_user: User = Depends(get_curre
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
     result = await db.users.delete_one({'id': user_id})
+    user_cache.invalidate(user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Also delete user's posts and messages
+    if timelines is not None:
+        await timelines.remove(await db.posts.distinct('id', {'user_id': user_id}))
     await db.posts.delete_many({'user_id': user_id})
     await db.messages.delete_many({'$or': [{'from_user_id': user_id}, {'to_user_id': user_id}]})
+    await conversation_summaries.delete_user_conversations(db, user_id)
     
     return {'message': 'User deleted successfully'}
 
@@ -583,6 +821,8 @@ async def admin_delete_post(post_id: str, current_user: User = Depends(get_curre
     result = await db.posts.delete_one({'id': post_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Post not found")
+    if timelines is not None:
+        await timelines.remove([post_id])
     
     # Also delete comments
     await db.comments.delete_many({'post_id': post_id})
@@ -599,6 +839,7 @@ async def admin_update_user_role(user_id: str, role_data: dict, current_user: Us
         raise HTTPException(status_code=400, detail="Invalid role")
     
     result = await db.users.update_one({'id': user_id}, {'$set': {'role': new_role}})
+    user_cache.invalidate(user_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -628,14 +869,55 @@ async def send_message(msg_data: DirectMessageCreate, current_user: User = Depen
     )
     
     msg_dict = message.model_dump()
-    msg_dict['created_at'] = msg_dict['created_at'].isoformat()
     msg_dict['location'] = msg_data.location
     msg_dict['media'] = msg_data.media or []
     msg_dict['media_type'] = msg_data.media_type
     
     await db.messages.insert_one(msg_dict)
+    await conversation_summaries.record_message(db, msg_dict)
+    await publish_message(msg_dict)
     return message
 
+async def publish_message(message: dict):
+    """Envia a nova mensagem ao destinatário pelos WebSockets conectados"""
+    payload = {k: v for k, v in message.items() if k != '_id'}
+    await message_broker.publish(payload['to_user_id'], {'type': 'message', 'message': payload})
+
+@api_router.websocket("/ws/messages")
+async def messages_websocket(websocket: WebSocket, token: str):
+    """
+    Canal de mensagens em tempo real. Autenticação pelo JWT em ?token=
+    (navegadores não enviam headers no handshake de WebSocket).
+    """
+    try:
+        user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = message_hub.subscribe(user.id)
+    
+    async def wait_disconnect():
+        # Mensagens do cliente (ex: pings) são ignoradas
+        while True:
+            await websocket.receive_text()
+    
+    receiver = asyncio.create_task(wait_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({next_event, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                next_event.cancel()
+                break
+            await websocket.send_json(jsonable_encoder(next_event.result()))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        message_hub.unsubscribe(user.id, queue)
+
 @api_router.get("/messages/{other_user_id}")
 async def get_messages(other_user_id: str, current_user: User = Depends(get_current_user)):
     messages = await db.messages.find({
@@ -645,59 +927,53 @@ async def get_messages(other_user_id: str, current_user: User = Depends(get_curr
         ]
     }, {'_id': 0}).sort('created_at', 1).to_list(1000)
     
-    for msg in messages:
-        if isinstance(msg['created_at'], str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
-    
-    return messages
+    await conversation_summaries.mark_read(db, current_user.id, other_user_id)
+    return await expand_auto_responses(db, messages)
+
+CONVERSATIONS_SORT = [('last_message_time', -1), ('partner_id', -1)]
 
 @api_router.get("/conversations")
-async def get_conversations(current_user: User = Depends(get_current_user)):
-    messages = await db.messages.find({
-        '$or': [
-            {'from_user_id': current_user.id},
-            {'to_user_id': current_user.id}
-        ]
-    }, {'_id': 0}).to_list(10000)
+async def get_conversations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Lista de conversas lida da coleção de resumos (atualizada em send_message),
+    paginada por cursor; o custo não depende do tamanho do histórico.
+    """
+    query = {'owner_id': current_user.id}
+    if cursor:
+        try:
+            query = apply_cursor(query, CONVERSATIONS_SORT, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    limit = clamp_limit(limit)
+    summaries = await db.conversations.find(query, {'_id': 0}).sort(CONVERSATIONS_SORT).to_list(limit)
     
-    user_ids = set()
-    for msg in messages:
-        if msg['from_user_id'] != current_user.id:
-            user_ids.add(msg['from_user_id'])
-        if msg['to_user_id'] != current_user.id:
-            user_ids.add(msg['to_user_id'])
+    if len(summaries) == limit:
+        last = summaries[-1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last['last_message_time'], last['partner_id'])
     
     # Batch fetch all users to avoid N+1 queries
-    user_ids_list = list(user_ids)
+    user_ids = [summary['partner_id'] for summary in summaries]
     users_dict = {}
-    if user_ids_list:
-        users_cursor = db.users.find({'id': {'$in': user_ids_list}}, {'_id': 0, 'password': 0})
+    if user_ids:
+        users_cursor = db.users.find({'id': {'$in': user_ids}}, {'_id': 0, 'password': 0})
         async for user in users_cursor:
             users_dict[user['id']] = user
     
-    # Get last messages for each conversation in batch
-    last_messages = {}
-    for uid in user_ids_list:
-        relevant_msgs = [m for m in messages if 
-            (m['from_user_id'] == uid and m['to_user_id'] == current_user.id) or
-            (m['from_user_id'] == current_user.id and m['to_user_id'] == uid)]
-        if relevant_msgs:
-            # Sort by created_at and get last one
-            sorted_msgs = sorted(relevant_msgs, key=lambda x: x.get('created_at', ''), reverse=True)
-            last_messages[uid] = sorted_msgs[0]
-    
     conversations = []
-    for uid in user_ids:
-        user = users_dict.get(uid)
+    for summary in summaries:
+        user = users_dict.get(summary['partner_id'])
         if user:
-            if isinstance(user.get('created_at'), str):
-                user['created_at'] = datetime.fromisoformat(user['created_at'])
-            
-            last_msg = last_messages.get(uid)
             conversations.append({
                 'user': user,
-                'last_message': last_msg['message'] if last_msg else '',
-                'last_message_time': last_msg['created_at'] if last_msg else None
+                'last_message': summary.get('last_message', ''),
+                'last_message_time': summary.get('last_message_time'),
+                'unread_count': summary.get('unread_count', 0)
             })
     
     return conversations
@@ -708,9 +984,6 @@ async def get_user_by_id(user_id: str, current_user: User = Depends(get_current_
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if isinstance(user.get('created_at'), str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
-    
     return user
 
 @api_router.get("/can-chat/{other_user_id}")
@@ -770,67 +1043,49 @@ async def get_volunteers(area: Optional[str] = None):
         query['professional_area'] = area
     
     volunteers = await db.users.find(query, {'_id': 0, 'password': 0, 'email': 0}).to_list(1000)
-    
-    for vol in volunteers:
-        if isinstance(vol.get('created_at'), str):
-            vol['created_at'] = datetime.fromisoformat(vol['created_at'])
-    
     return volunteers
 
 @api_router.get("/helpers-nearby")
 async def get_helpers_nearby(
-    lat: float, 
-    lng: float, 
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
     category: Optional[str] = None,
-    radius: float = 10.0,  # km
+    radius: float = Query(10.0, gt=0),  # km
+    offset: int = 0,
+    limit: int = 100,
     current_user: User = Depends(get_current_user)
 ):
     """
     Busca helpers e voluntários próximos que podem ajudar em uma categoria específica.
-    Usa fórmula de Haversine para calcular distância.
+    Usa $geoNear sobre o índice 2dsphere de users.geo (já ordenado por distância).
     """
-    import math
-    
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        R = 6371  # Raio da Terra em km
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lon2 - lon1)
-        
-        a = math.sin(delta_phi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
-    
     # Buscar helpers e voluntários com localização visível
     query = {
         'role': {'$in': ['helper', 'volunteer']},
-        'show_location': True,
-        'location': {'$ne': None}
+        'show_location': True
     }
     
     if category:
         query['help_categories'] = category
     
-    users = await db.users.find(query, {'_id': 0, 'password': 0, 'email': 0}).to_list(1000)
-    
-    nearby_users = []
-    for user in users:
-        if user.get('location') and user['location'].get('lat') and user['location'].get('lng'):
-            distance = haversine_distance(
-                lat, lng,
-                user['location']['lat'],
-                user['location']['lng']
-            )
-            if distance <= radius:
-                user['distance'] = round(distance, 2)
-                if isinstance(user.get('created_at'), str):
-                    user['created_at'] = datetime.fromisoformat(user['created_at'])
-                nearby_users.append(user)
-    
-    # Ordenar por distância
-    nearby_users.sort(key=lambda x: x['distance'])
+    pipeline = [
+        {'$geoNear': {
+            'near': {'type': 'Point', 'coordinates': [lng, lat]},
+            'key': 'geo',
+            'distanceField': 'distance',
+            'distanceMultiplier': 0.001,  # metros -> km
+            'maxDistance': radius * 1000,
+            'spherical': True,
+            'query': query
+        }},
+        {'$skip': max(0, offset)},
+        {'$limit': clamp_limit(limit)},
+        {'$project': {'_id': 0, 'password': 0, 'email': 0, 'geo': 0}}
+    ]
+    
+    nearby_users = await db.users.aggregate(pipeline).to_list(None)
+    for user in nearby_users:
+        user['distance'] = round(user['distance'], 2)
     
     return nearby_users
 
@@ -842,25 +1097,16 @@ async def update_location(location_data: dict, current_user: User = Depends(get_
         'show_location': location_data.get('show_location', False)
     }
     
-    await db.users.update_one({'id': current_user.id}, {'$set': update})
+    update_ops = {'$set': update}
+    for op, fields in geo_update(update['location']).items():
+        update_ops.setdefault(op, {}).update(fields)
+    
+    await db.users.update_one({'id': current_user.id}, update_ops)
+    user_cache.invalidate(current_user.id)
     return {'message': 'Location updated successfully'}
 
 # ==================== HELP LOCATIONS ENDPOINTS ====================
 
-def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calcula a distância em km entre duas coordenadas usando a fórmula de Haversine"""
-    R = 6371  # Raio da Terra em km
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lng = math.radians(lng2 - lng1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
-
 class HelpLocationResponse(BaseModel):
     id: str
     name: str
@@ -885,39 +1131,73 @@ CATEGORY_ICONS = {
     'work': {'icon': '💼', 'color': 'bg-yellow-500'}
 }
 
+CATEGORY_LABELS = {
+    'food': 'Alimentação',
+    'health': 'Saúde',
+    'legal': 'Jurídico',
+    'housing': 'Moradia',
+    'clothes': 'Roupas',
+    'social': 'Social',
+    'education': 'Educação',
+    'work': 'Trabalho'
+}
+
+# Catálogo carregado uma vez em arrays NumPy (decoração e coordenadas)
+help_location_index = HelpLocationIndex(get_all_help_locations(), CATEGORY_ICONS)
+
+def build_help_location_payloads(index: HelpLocationIndex) -> dict:
+    """Respostas sem coordenadas, serializadas uma vez por versão do catálogo"""
+    payloads = {}
+    for cat in ['all'] + index.categories:
+        locations = index.by_category(cat)
+        payloads[cat] = PrecomputedPayload({'locations': locations, 'total': len(locations)}, index.version)
+    payloads[None] = PrecomputedPayload({'locations': [], 'total': 0}, index.version)
+    
+    categories = [
+        {'value': 'all', 'label': 'Todos', 'icon': '🗺️', 'count': len(index.locations)}
+    ]
+    for cat in index.categories:
+        cat_info = CATEGORY_ICONS.get(cat, {'icon': '📍', 'color': 'bg-gray-500'})
+        categories.append({
+            'value': cat,
+            'label': CATEGORY_LABELS.get(cat, cat.title()),
+            'icon': cat_info['icon'],
+            'color': cat_info['color'],
+            'count': len(index.by_category(cat))
+        })
+    payloads['categories'] = PrecomputedPayload({'categories': categories}, index.version)
+    return payloads
+
+help_location_payloads = build_help_location_payloads(help_location_index)
+HELP_LOCATIONS_MAX_AGE = 3600
+
 @api_router.get("/help-locations")
 async def get_help_locations(
+    request: Request,
     category: Optional[str] = None,
     lat: Optional[float] = None,
-    lng: Optional[float] = None
+    lng: Optional[float] = None,
+    k: Optional[int] = None,
+    radius: Optional[float] = None,  # km
+    limit: Optional[int] = None
 ):
     """
     Retorna todos os locais de ajuda.
-    Pode filtrar por categoria e ordenar por distância se coordenadas forem fornecidas.
+    Pode filtrar por categoria e ordenar por distância se coordenadas forem fornecidas;
+    com coordenadas, `k` limita aos k mais próximos e `radius` ao raio em km.
     """
-    # Buscar locais do arquivo de dados
-    if category and category != 'all':
-        locations = get_help_locations_by_category(category)
+    if lat is not None and lng is not None:
+        nearest = help_location_index.query(lat, lng, category, k=k, radius=radius)
+        result = [{**loc, 'distance': round(distance, 2)} for loc, distance in nearest]
+    elif limit is None:
+        # Sem coordenadas a resposta é estática: corpo pré-serializado + ETag
+        payload = help_location_payloads.get(category or 'all') or help_location_payloads[None]
+        return payload_response(request, payload, max_age=HELP_LOCATIONS_MAX_AGE)
     else:
-        locations = get_all_help_locations()
-    
-    # Adicionar ícones e cores
-    result = []
-    for loc in locations:
-        loc_data = {**loc}
-        cat_info = CATEGORY_ICONS.get(loc['category'], {'icon': '📍', 'color': 'bg-gray-500'})
-        loc_data['icon'] = cat_info['icon']
-        loc_data['color'] = cat_info['color']
-        
-        # Calcular distância se coordenadas foram fornecidas
-        if lat is not None and lng is not None:
-            loc_data['distance'] = round(calculate_distance(lat, lng, loc['lat'], loc['lng']), 2)
-        
-        result.append(loc_data)
+        result = help_location_index.by_category(category)
     
-    # Ordenar por distância se aplicável
-    if lat is not None and lng is not None:
-        result.sort(key=lambda x: x.get('distance', float('inf')))
+    if limit is not None and limit > 0:
+        result = result[:limit]
     
     return {'locations': result, 'total': len(result)}
 
@@ -925,75 +1205,31 @@ async def get_help_locations(
 async def get_nearest_help_location(
     lat: float,
     lng: float,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    k: int = 1,
+    radius: Optional[float] = None  # km
 ):
     """
     Retorna o local de ajuda mais próximo das coordenadas fornecidas.
-    Pode filtrar por categoria.
+    Pode filtrar por categoria; com k > 1 também retorna os k mais próximos.
     """
-    if category and category != 'all':
-        locations = get_help_locations_by_category(category)
-    else:
-        locations = get_all_help_locations()
-    
-    if not locations:
+    if not help_location_index.by_category(category):
         raise HTTPException(status_code=404, detail="Nenhum local encontrado")
     
-    nearest = None
-    min_distance = float('inf')
-    
-    for loc in locations:
-        distance = calculate_distance(lat, lng, loc['lat'], loc['lng'])
-        if distance < min_distance:
-            min_distance = distance
-            cat_info = CATEGORY_ICONS.get(loc['category'], {'icon': '📍', 'color': 'bg-gray-500'})
-            nearest = {
-                **loc,
-                'distance': round(distance, 2),
-                'icon': cat_info['icon'],
-                'color': cat_info['color']
-            }
+    nearest = [
+        {**loc, 'distance': round(distance, 2)}
+        for loc, distance in help_location_index.query(lat, lng, category, k=max(1, k), radius=radius)
+    ]
     
-    return {'nearest': nearest}
+    response = {'nearest': nearest[0] if nearest else None}
+    if k > 1:
+        response['locations'] = nearest
+    return response
 
 @api_router.get("/help-locations/categories")
-async def get_help_location_categories():
+async def get_help_location_categories(request: Request):
     """Retorna todas as categorias disponíveis com contagem de locais"""
-    locations = get_all_help_locations()
-    
-    # Contar locais por categoria
-    category_counts = {}
-    for loc in locations:
-        cat = loc['category']
-        category_counts[cat] = category_counts.get(cat, 0) + 1
-    
-    # Formatar resposta com ícones
-    categories = [
-        {'value': 'all', 'label': 'Todos', 'icon': '🗺️', 'count': len(locations)}
-    ]
-    
-    category_labels = {
-        'food': 'Alimentação',
-        'health': 'Saúde',
-        'legal': 'Jurídico',
-        'housing': 'Moradia',
-        'clothes': 'Roupas',
-        'social': 'Social',
-        'education': 'Educação',
-        'work': 'Trabalho'
-    }
-    
-    for cat, count in sorted(category_counts.items()):
-        cat_info = CATEGORY_ICONS.get(cat, {'icon': '📍', 'color': 'bg-gray-500'})
-        categories.append({
-            'value': cat,
-            'label': category_labels.get(cat, cat.title()),
-            'icon': cat_info['icon'],
-            'color': cat_info['color'],
-            'count': count
-        })
-    
-    return {'categories': categories}
+    return payload_response(request, help_location_payloads['categories'], max_age=HELP_LOCATIONS_MAX_AGE)
 
 @api_router.post("/help-locations/seed")
 async def seed_help_locations():
@@ -1040,6 +1276,7 @@ async def create_advertisement(ad_data: AdvertisementCreate, current_user: User
     ad_dict = ad.model_dump()
     
     await db.advertisements.insert_one(ad_dict)
+    await sidebar_cache.reload()
     return {'message': 'Anúncio criado com sucesso', 'id': ad.id}
 
 @api_router.get("/admin/advertisements")
@@ -1065,6 +1302,7 @@ async def update_advertisement(ad_id: str, ad_data: dict, current_user: User = D
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
     
+    await sidebar_cache.reload()
     return {'message': 'Anúncio atualizado com sucesso'}
 
 @api_router.delete("/admin/advertisements/{ad_id}")
@@ -1077,6 +1315,7 @@ async def delete_advertisement(ad_id: str, current_user: User = Depends(get_curr
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
     
+    await sidebar_cache.reload()
     return {'message': 'Anúncio excluído com sucesso'}
 
 @api_router.post("/advertisements/seed")
@@ -1158,91 +1397,63 @@ async def seed_advertisements():
     for ad in default_ads:
         await db.advertisements.insert_one(ad)
     
+    await sidebar_cache.reload()
     return {'message': f'{len(default_ads)} anúncios criados com sucesso', 'seeded': True}
 
 # ==================== JOB LISTINGS ENDPOINTS (RozgarLine Integration) ====================
 
-async def fetch_rozgarline_jobs():
-    """Busca vagas de emprego do site RozgarLine"""
-    jobs = []
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get('https://rozgarline.me/', timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    
-                    # Parse job listings from HTML usando regex
-                    # Pattern para encontrar vagas
-                    job_pattern = r'<a[^>]*href="(https://rozgarline\.me/jobs/[^"]+)"[^>]*>([^<]+)</a>'
-                    matches = re.findall(job_pattern, html)
-                    
-                    seen_titles = set()
-                    for url, title in matches:
-                        # Limpar título
-                        clean_title = title.strip()
-                        if clean_title and clean_title not in seen_titles and len(clean_title) > 5:
-                            # Ignorar links genéricos
-                            if 'more' not in clean_title.lower() and 'author' not in url:
-                                seen_titles.add(clean_title)
-                                jobs.append({
-                                    'id': str(uuid.uuid4()),
-                                    'title': clean_title,
-                                    'url': url,
-                                    'source': 'RozgarLine',
-                                    'location': 'Europa',
-                                    'date_posted': datetime.now(timezone.utc).strftime('%d %b %Y')
-                                })
-                    
-    except Exception as e:
-        logging.error(f"Error fetching jobs from RozgarLine: {e}")
-    
-    return jobs[:15]  # Limitar a 15 vagas
+JOBS_SOURCE_URL = os.environ.get('JOBS_SOURCE_URL', 'https://rozgarline.me/')
+
+# Fontes de vagas (JOB_SOURCES, separadas por vírgula) com uma sessão HTTP compartilhada
+job_aggregator = JobAggregator(
+    build_sources(os.environ.get('JOB_SOURCES', 'rozgarline').split(','), JOBS_SOURCE_URL),
+    max_connections=int(os.environ.get('JOBS_MAX_CONNECTIONS', '10'))
+)
+
+# Vagas atualizadas em segundo plano; as requisições nunca fazem a raspagem
+job_refresher = JobRefresher(
+    job_aggregator.fetch_all,
+    db,
+    source='aggregated',
+    interval=float(os.environ.get('JOBS_REFRESH_INTERVAL', '3600')),
+    jitter=float(os.environ.get('JOBS_REFRESH_JITTER', '0.1'))
+)
+job_index = JobIndex([])
+
+async def rebuild_job_index():
+    global job_index
+    job_index = JobIndex(job_refresher.snapshot()['jobs'])
+
+job_refresher.add_listener(rebuild_job_index)
 
 @api_router.get("/jobs/external")
-async def get_external_jobs():
-    """Retorna vagas de emprego do RozgarLine"""
-    # Verificar cache
-    cached = await db.job_cache.find_one({'source': 'rozgarline'})
-    
-    # Se cache existe e tem menos de 1 hora, usar cache
-    if cached and cached.get('updated_at'):
-        try:
-            cached_time = cached['updated_at']
-            # Garantir que é aware
-            if cached_time.tzinfo is None:
-                cached_time = cached_time.replace(tzinfo=timezone.utc)
-            cache_age = datetime.now(timezone.utc) - cached_time
-            if cache_age < timedelta(hours=1):
-                return {'jobs': cached.get('jobs', []), 'cached': True}
-        except Exception as e:
-            logging.error(f"Cache time error: {e}")
-    
-    # Buscar novas vagas
-    jobs = await fetch_rozgarline_jobs()
-    
-    # Salvar no cache
-    await db.job_cache.update_one(
-        {'source': 'rozgarline'},
-        {'$set': {
-            'source': 'rozgarline',
-            'jobs': jobs,
-            'updated_at': datetime.now(timezone.utc)
-        }},
-        upsert=True
-    )
-    
-    return {'jobs': jobs, 'cached': False}
+async def get_external_jobs(q: Optional[str] = None):
+    """Retorna vagas de emprego agregadas (último snapshot bom), com busca opcional"""
+    snapshot = job_refresher.snapshot()
+    jobs = job_index.search(q) if q else snapshot['jobs']
+    return {'jobs': jobs, 'cached': True, 'updated_at': snapshot['updated_at']}
 
-@api_router.get("/sidebar-content")
-async def get_sidebar_content():
-    """Retorna todo o conteúdo da sidebar: anúncios + vagas de emprego"""
+def sidebar_job_item(job: dict, link_text: str, image_url: str) -> dict:
+    return {
+        'id': job['id'],
+        'item_type': 'job',
+        'type': 'job',
+        'title': f"💼 {job['title']}",
+        'content': f"📍 {job.get('location', 'Europa')} • {job.get('date_posted', 'Recente')}",
+        'link_url': job['url'],
+        'link_text': link_text,
+        'image_url': image_url,
+        'source': job.get('source', 'RozgarLine')
+    }
+
+async def build_sidebar_payload() -> PrecomputedPayload:
+    """Monta a sidebar: anúncios + vagas de emprego"""
     
     # Buscar anúncios ativos
     ads = await db.advertisements.find({'is_active': True}, {'_id': 0}).sort('priority', -1).to_list(10)
     
-    # Buscar vagas de emprego (do cache ou externo)
-    jobs_data = await get_external_jobs()
-    jobs = jobs_data.get('jobs', [])
+    # Vagas do snapshot em memória (atualizado pelo job_refresher)
+    jobs = job_refresher.snapshot()['jobs']
     
     # Intercalar conteúdo: motivação, vaga, doação, vaga, motivação...
     sidebar_items = []
@@ -1251,22 +1462,14 @@ async def get_sidebar_content():
     donation_ads = [a for a in ads if a.get('type') == 'donation']
     
     # Adicionar 2 motivações primeiro
-    for i, ad in enumerate(motivation_ads[:2]):
+    for ad in motivation_ads[:2]:
         sidebar_items.append({**ad, 'item_type': 'advertisement'})
     
     # Adicionar 3 vagas de emprego
     for job in jobs[:3]:
-        sidebar_items.append({
-            'id': job['id'],
-            'item_type': 'job',
-            'type': 'job',
-            'title': f"💼 {job['title']}",
-            'content': f"📍 {job.get('location', 'Europa')} • {job.get('date_posted', 'Recente')}",
-            'link_url': job['url'],
-            'link_text': 'Ver Vaga',
-            'image_url': 'https://images.unsplash.com/photo-1486312338219-ce68d2c6f44d?w=400',
-            'source': job.get('source', 'RozgarLine')
-        })
+        sidebar_items.append(sidebar_job_item(
+            job, 'Ver Vaga', 'https://images.unsplash.com/photo-1486312338219-ce68d2c6f44d?w=400'
+        ))
     
     # Adicionar doações
     for ad in donation_ads[:2]:
@@ -1274,17 +1477,9 @@ async def get_sidebar_content():
     
     # Adicionar mais vagas
     for job in jobs[3:6]:
-        sidebar_items.append({
-            'id': job['id'],
-            'item_type': 'job',
-            'type': 'job',
-            'title': f"💼 {job['title']}",
-            'content': f"📍 {job.get('location', 'Europa')} • {job.get('date_posted', 'Recente')}",
-            'link_url': job['url'],
-            'link_text': 'Ver Vaga',
-            'image_url': 'https://images.unsplash.com/photo-1521791136064-7986c2920216?w=400',
-            'source': job.get('source', 'RozgarLine')
-        })
+        sidebar_items.append(sidebar_job_item(
+            job, 'Ver Vaga', 'https://images.unsplash.com/photo-1521791136064-7986c2920216?w=400'
+        ))
     
     # Adicionar mais motivações
     for ad in motivation_ads[2:]:
@@ -1292,23 +1487,33 @@ async def get_sidebar_content():
     
     # Adicionar resto das vagas
     for job in jobs[6:]:
-        sidebar_items.append({
-            'id': job['id'],
-            'item_type': 'job',
-            'type': 'job',
-            'title': f"💼 {job['title']}",
-            'content': f"📍 {job.get('location', 'Europa')} • {job.get('date_posted', 'Recente')}",
-            'link_url': job['url'],
-            'link_text': 'Candidatar',
-            'image_url': 'https://images.unsplash.com/photo-1454165804606-c3d57bc86b40?w=400',
-            'source': job.get('source', 'RozgarLine')
-        })
+        sidebar_items.append(sidebar_job_item(
+            job, 'Candidatar', 'https://images.unsplash.com/photo-1454165804606-c3d57bc86b40?w=400'
+        ))
     
-    return {
+    return PrecomputedPayload({
         'items': sidebar_items,
         'total_ads': len(ads),
         'total_jobs': len(jobs)
-    }
+    })
+
+# A sidebar só muda quando um admin edita anúncios ou as vagas são atualizadas:
+# é remontada nesses eventos; SIDEBAR_MAX_AGE cobre edições feitas em outro worker
+sidebar_cache = SnapshotCache(
+    build_sidebar_payload,
+    max_age=float(os.environ.get('SIDEBAR_MAX_AGE', '600')),
+    name='sidebar'
+)
+job_refresher.add_listener(sidebar_cache.reload)
+
+@api_router.get("/sidebar-content")
+async def get_sidebar_content(request: Request):
+    """Retorna todo o conteúdo da sidebar: anúncios + vagas de emprego"""
+    try:
+        payload = await sidebar_cache.get()
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Sidebar temporarily unavailable")
+    return payload_response(request, payload, max_age=60)
 
 app.include_router(api_router)
 
@@ -1337,6 +1542,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_db_indexes():
+    created = await ensure_indexes(db)
+    logger.info(f"{created} MongoDB indexes ensured")
+
+@app.on_event("startup")
+async def migrate_created_at():
+    # As leituras assumem created_at como datetime (ordenação e cursores):
+    # o servidor só sobe depois da migração. Concluída, é só uma leitura
+    # dos checkpoints por coleção; uma falha interrompe o startup.
+    summary = await migrate_datetimes(db)
+    logger.info(f"created_at migration checked: {summary}")
+
+@app.on_event("startup")
+async def backfill_conversations():
+    # /conversations só lê os resumos: preenche a partir do histórico antes
+    # de servir (uma vez; depois é só a leitura do checkpoint)
+    if await migrate_conversations(db):
+        logger.info(f"Conversation summaries backfilled: {await db.conversations.count_documents({})}")
+
+@app.on_event("startup")
+async def backfill_geo():
+    # /helpers-nearby só encontra usuários com `geo` (GeoJSON): converte os
+    # `location` antigos antes de servir; concluída, é só ler o checkpoint
+    converted = await migrate_geo(db)
+    logger.info(f"GeoJSON location backfill checked: {converted} users converted")
+
+@app.on_event("startup")
+async def start_message_broker():
+    await message_broker.start()
+
+@app.on_event("startup")
+async def start_job_refresher():
+    await job_aggregator.start()
+    await job_refresher.start()
+
+@app.on_event("startup")
+async def load_semantic_index():
+    # Carregar um modelo sentence-transformers pode levar alguns segundos
+    embedder = await asyncio.to_thread(create_embedder, EMBEDDER, EMBEDDING_MODEL)
+    loaded = await asyncio.to_thread(pdf_processor.load_index, embedder, store_path=KNOWLEDGE_STORE_PATH)
+    logger.info(f"Semantic index loaded: {loaded} (embedder: {embedder.name})")
+
+@app.on_event("startup")
+async def warm_sidebar():
+    await sidebar_cache.reload()
+
+@app.on_event("startup")
+async def load_auto_response_templates():
+    try:
+        count = await sync_templates(db)
+        logger.info(f"{count} auto-response templates loaded")
+    except Exception as e:
+        logger.error(f"Error syncing auto-response templates: {e}")
+
+@app.on_event("startup")
+async def start_write_behind():
+    await write_behind.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Grava o que ainda está no buffer antes de fechar a conexão
+    await write_behind.stop()
+    await message_broker.stop()
+    await job_refresher.stop()
+    await job_aggregator.close()
     client.close()
+    password_hasher.shutdown()
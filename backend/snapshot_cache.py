@@ -0,0 +1,91 @@
+"""
+Snapshot em memória com stale-while-revalidate
+
+O valor é calculado por uma função assíncrona. Depois de `max_age`
+segundos, o valor antigo continua sendo servido enquanto uma única
+tarefa em segundo plano o recalcula.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    def __init__(self, loader: Callable[[], Awaitable[Any]], max_age: float = 60.0, name: str = 'snapshot'):
+        self.loader = loader
+        self.max_age = max_age
+        self.name = name
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    async def get(self) -> Any:
+        """Retorna o snapshot; só espera o cálculo na primeira carga"""
+        if self._loaded_at is None:
+            return await self._refresh()
+
+        if self.age > self.max_age:
+            self._schedule_refresh()
+        return self._value
+
+    def invalidate(self) -> None:
+        """Marca o snapshot como vencido; o próximo get() dispara a atualização"""
+        if self._loaded_at is not None:
+            self._loaded_at = -float('inf')
+
+    async def reload(self) -> None:
+        """
+        Recalcula agora (ex.: após uma escrita). Uma carga já em andamento
+        pode ter lido dados antigos, então espera ela e inicia outra.
+        """
+        if self._refresh_task is not None and not self._refresh_task.done():
+            await asyncio.shield(self._refresh_task)
+        if not await asyncio.shield(self._schedule_refresh()):
+            # Falhou: o próximo get() tenta de novo
+            self.invalidate()
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._load())
+        return self._refresh_task
+
+    async def _refresh(self) -> Any:
+        # shield: um cliente que desconecta não cancela a carga dos demais
+        await asyncio.shield(self._schedule_refresh())
+        if self._loaded_at is None:
+            raise RuntimeError(f"{self.name} unavailable")
+        return self._value
+
+    async def _load(self) -> bool:
+        """True se o snapshot foi substituído"""
+        try:
+            value = await self.loader()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error refreshing {self.name}: {e}")
+            return False
+        self._value = value
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+        return True
+
+    def stats(self) -> dict:
+        age = self.age
+        return {
+            'max_age_seconds': self.max_age,
+            'age_seconds': round(age, 1) if age not in (None, float('inf')) else None,
+            'refreshes': self.refreshes,
+            'failures': self.failures
+        }
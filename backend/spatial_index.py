@@ -0,0 +1,98 @@
+"""
+Índice espacial em memória dos locais de ajuda (HELP_LOCATIONS)
+
+O catálogo é carregado uma vez em arrays NumPy por categoria; as
+distâncias (Haversine) são calculadas de forma vetorizada e os k mais
+próximos selecionados com argpartition, sem copiar os dicts do catálogo.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_CATEGORY_INFO = {'icon': '📍', 'color': 'bg-gray-500'}
+
+
+def haversine_km(lat: float, lng: float, lats_rad: np.ndarray, lngs_rad: np.ndarray,
+                 cos_lats: np.ndarray) -> np.ndarray:
+    """Distância em km de (lat, lng) até cada ponto (arrays já em radianos)"""
+    lat0 = np.radians(lat)
+    lng0 = np.radians(lng)
+    a = (np.sin((lats_rad - lat0) / 2) ** 2
+         + np.cos(lat0) * cos_lats * np.sin((lngs_rad - lng0) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class _CategoryPoints:
+    """Coordenadas contíguas de um subconjunto do catálogo"""
+
+    def __init__(self, positions: List[int], lats: np.ndarray, lngs: np.ndarray):
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.lats_rad = np.radians(lats[self.positions])
+        self.lngs_rad = np.radians(lngs[self.positions])
+        self.cos_lats = np.cos(self.lats_rad)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class HelpLocationIndex:
+    def __init__(self, locations: List[dict], category_icons: Dict[str, dict]):
+        # Versão do catálogo: muda sempre que algum local ou ícone muda
+        catalog = json.dumps([locations, category_icons], sort_keys=True, ensure_ascii=False)
+        self.version = hashlib.sha1(catalog.encode('utf-8')).hexdigest()[:12]
+
+        # Decoração (ícone/cor) feita uma única vez
+        self.locations = []
+        for loc in locations:
+            cat_info = category_icons.get(loc['category'], DEFAULT_CATEGORY_INFO)
+            self.locations.append({**loc, 'icon': cat_info['icon'], 'color': cat_info['color']})
+
+        lats = np.array([loc['lat'] for loc in self.locations], dtype=np.float64)
+        lngs = np.array([loc['lng'] for loc in self.locations], dtype=np.float64)
+
+        self._by_category: Dict[str, List[dict]] = {}
+        positions: Dict[str, List[int]] = {}
+        for i, loc in enumerate(self.locations):
+            self._by_category.setdefault(loc['category'], []).append(loc)
+            positions.setdefault(loc['category'], []).append(i)
+
+        self._points = {'all': _CategoryPoints(list(range(len(self.locations))), lats, lngs)}
+        for category, cat_positions in positions.items():
+            self._points[category] = _CategoryPoints(cat_positions, lats, lngs)
+
+    @property
+    def categories(self) -> List[str]:
+        return sorted(self._by_category)
+
+    def by_category(self, category: Optional[str] = None) -> List[dict]:
+        """Locais decorados (compartilhados - não modificar)"""
+        if not category or category == 'all':
+            return self.locations
+        return self._by_category.get(category, [])
+
+    def query(self, lat: float, lng: float, category: Optional[str] = None,
+              k: Optional[int] = None, radius: Optional[float] = None) -> List[Tuple[dict, float]]:
+        """
+        Locais ordenados por distância: os k mais próximos e/ou os que estão
+        dentro de `radius` km. Retorna pares (local, distância em km).
+        """
+        points = self._points.get(category if category else 'all')
+        if points is None or len(points) == 0:
+            return []
+
+        distances = haversine_km(lat, lng, points.lats_rad, points.lngs_rad, points.cos_lats)
+        candidates = np.arange(len(distances))
+
+        if radius is not None:
+            candidates = candidates[distances <= radius]
+
+        if k is not None and 0 < k < len(candidates):
+            nearest = np.argpartition(distances[candidates], k - 1)[:k]
+            candidates = candidates[nearest]
+
+        order = candidates[np.argsort(distances[candidates], kind='stable')]
+        return [(self.locations[points.positions[i]], float(distances[i])) for i in order]
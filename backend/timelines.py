@@ -0,0 +1,209 @@
+"""
+Timelines pré-calculadas do feed (fan-out na escrita)
+
+Com FEED_MODE=timeline, create_post empurra (created_at, id) do post novo
+para um bucket limitado na coleção `timelines`:
+- 'offer': todas as ofertas
+- 'need:<categoria>': pedidos de ajuda de uma categoria
+
+O feed de um voluntário é a intercalação (heapq.merge) dos buckets das
+categorias dele + 'offer', sem reexecutar a consulta filtrada e ordenada.
+Os buckets guardam só os `cap` posts mais recentes; páginas além disso,
+buckets ainda frios (nunca aquecidos) ou posts removidos no meio da página
+fazem o chamador voltar para a consulta normal (page() retorna None).
+"""
+
+import asyncio
+import heapq
+import logging
+from typing import Dict, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+ENTRY_SORT = {'created_at': -1, 'id': -1}
+
+
+def post_bucket(post: dict) -> Optional[str]:
+    if post.get('type') == 'offer':
+        return 'offer'
+    if post.get('type') == 'need':
+        return f"need:{post.get('category')}"
+    return None
+
+
+def bucket_keys(help_categories: Sequence[str]) -> List[str]:
+    return ['offer'] + [f"need:{category}" for category in sorted(set(help_categories))]
+
+
+def bucket_query(key: str) -> dict:
+    if key == 'offer':
+        return {'type': 'offer'}
+    return {'type': 'need', 'category': key.split(':', 1)[1]}
+
+
+def _entry_key(entry: dict):
+    return (entry['created_at'], entry['id'])
+
+
+def _after_condition(after: Sequence) -> dict:
+    """Expressão: a entrada vem depois de `after` na ordem do feed (created_at, id decrescentes)"""
+    created_at, post_id = after
+    return {'$or': [
+        {'$lt': ['$$entry.created_at', created_at]},
+        {'$and': [{'$eq': ['$$entry.created_at', created_at]}, {'$lt': ['$$entry.id', post_id]}]}
+    ]}
+
+
+class TimelineStore:
+    def __init__(self, db, cap: int = 500, collection: str = 'timelines'):
+        self.db = db
+        self.cap = cap
+        self.collection = collection
+        self._warming: Set[str] = set()
+        # O loop só guarda referência fraca às tarefas: sem este set, um
+        # aquecimento em segundo plano pode ser coletado antes de terminar
+        self._tasks: Set[asyncio.Task] = set()
+        self.fan_outs = 0
+        self.warms = 0
+        self.hits = 0
+        self.cold = 0
+        self.deep = 0
+
+    @property
+    def buckets(self):
+        return self.db[self.collection]
+
+    async def fan_out(self, post: dict) -> None:
+        """Empurra o post para o bucket dele, descartando os mais antigos além do cap"""
+        key = post_bucket(post)
+        if key is None:
+            return
+        entry = {'created_at': post['created_at'], 'id': post['id']}
+        await self.buckets.update_one(
+            {'_id': key},
+            {'$push': {'entries': {'$each': [entry], '$sort': ENTRY_SORT, '$slice': self.cap}}},
+            upsert=True
+        )
+        self.fan_outs += 1
+
+    async def remove(self, post_ids: List[str]) -> None:
+        """
+        Tira posts removidos dos buckets. O bucket passa a ser tratado como
+        cortado (`trimmed`): pode haver posts mais antigos que não cabiam
+        nele, então é reaquecido do banco na próxima leitura.
+        """
+        if not post_ids:
+            return
+        await self.buckets.update_many(
+            {'entries.id': {'$in': post_ids}},
+            {'$pull': {'entries': {'id': {'$in': post_ids}}}, '$set': {'trimmed': True}}
+        )
+
+    async def warm(self, key: str) -> None:
+        """
+        Preenche um bucket frio (ou cortado) com os posts mais recentes.
+        Mescla com o que o fan-out já tiver empurrado (duplicatas são
+        ignoradas na leitura).
+        """
+        posts = await self.db.posts.find(
+            bucket_query(key), {'_id': 0, 'created_at': 1, 'id': 1}
+        ).sort([('created_at', -1), ('id', -1)]).to_list(self.cap)
+        await self.buckets.update_one(
+            {'_id': key},
+            {'$push': {'entries': {'$each': posts, '$sort': ENTRY_SORT, '$slice': self.cap}},
+             '$set': {'warm': True, 'trimmed': False}},
+            upsert=True
+        )
+        self.warms += 1
+
+    async def _warm_in_background(self, keys: List[str]) -> None:
+        try:
+            for key in keys:
+                await self.warm(key)
+        except Exception as e:
+            logger.error(f"Error warming timelines {keys}: {e}")
+        finally:
+            self._warming.difference_update(keys)
+
+    async def page(self, help_categories: Sequence[str], after: Optional[Sequence] = None,
+                   limit: int = 100) -> Optional[List[str]]:
+        """
+        ids da página (mais recentes primeiro) estritamente após `after`
+        (created_at, id), ou None se a timeline não consegue responder
+        """
+        keys = bucket_keys(help_categories)
+        # Só as `limit` primeiras entradas após o cursor de cada bucket saem do
+        # Mongo, mais o tamanho e a última entrada (para o horizonte)
+        entries = {'$ifNull': ['$entries', []]}
+        if after is not None:
+            entries = {'$filter': {'input': entries, 'as': 'entry', 'cond': _after_condition(after)}}
+        docs = await self.buckets.aggregate([
+            {'$match': {'_id': {'$in': keys}}},
+            {'$project': {
+                'warm': 1,
+                'trimmed': 1,
+                'size': {'$size': {'$ifNull': ['$entries', []]}},
+                'last': {'$arrayElemAt': ['$entries', -1]},
+                'entries': {'$slice': [entries, limit]}
+            }}
+        ]).to_list(None)
+        docs = {doc['_id']: doc for doc in docs}
+
+        # Frio: nunca aquecido, ou cortado por remove() e agora incompleto
+        cold = [
+            key for key in keys
+            if not docs.get(key, {}).get('warm')
+            or (docs[key].get('trimmed') and docs[key]['size'] < self.cap)
+        ]
+        if cold:
+            self.cold += 1
+            pending = [key for key in cold if key not in self._warming]
+            if pending:
+                self._warming.update(pending)
+                task = asyncio.create_task(self._warm_in_background(pending))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return None
+
+        # Abaixo do horizonte algum bucket cheio pode ter perdido posts
+        horizon = None
+        for doc in docs.values():
+            if doc['size'] >= self.cap:
+                last = _entry_key(doc['last'])
+                horizon = last if horizon is None else max(horizon, last)
+
+        ids: List[str] = []
+        seen = set()
+        merged = heapq.merge(*(doc['entries'] for doc in docs.values()), key=_entry_key, reverse=True)
+        for entry in merged:
+            if horizon is not None and _entry_key(entry) < horizon:
+                self.deep += 1
+                return None
+            if entry['id'] in seen:
+                continue
+            seen.add(entry['id'])
+            ids.append(entry['id'])
+            if len(ids) == limit:
+                break
+        else:
+            # Acabaram as entradas: a página só termina aqui se nenhum bucket
+            # foi cortado (pelo cap ou pelo $slice, quando havia duplicatas)
+            cut = any(len(doc['entries']) == limit for doc in docs.values())
+            if len(ids) < limit and (horizon is not None or cut):
+                self.deep += 1
+                return None
+
+        self.hits += 1
+        return ids
+
+    def stats(self) -> dict:
+        reads = self.hits + self.cold + self.deep
+        return {
+            'cap': self.cap,
+            'fan_outs': self.fan_outs,
+            'warms': self.warms,
+            'hits': self.hits,
+            'fallback_cold': self.cold,
+            'fallback_deep': self.deep,
+            'hit_rate': round(self.hits / reads, 4) if reads else 0.0
+        }
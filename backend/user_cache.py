@@ -0,0 +1,75 @@
+"""
+Cache em memória dos usuários autenticados (LRU + TTL)
+Evita um find_one em db.users a cada requisição autenticada
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Optional
+
+
+class UserCache:
+    """Cache LRU com expiração por tempo, indexado por user_id"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[Any]:
+        """Retorna o usuário em cache ou None se ausente/expirado"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return user
+
+    def set(self, user_id: str, user: Any) -> None:
+        """Armazena o usuário validado, removendo o menos recente se cheio"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Remove um usuário do cache (perfil, role ou conta alterados)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Contadores de hit/miss para monitoramento"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
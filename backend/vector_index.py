@@ -0,0 +1,232 @@
+"""
+Busca vetorial exata em NumPy (substitui o IndexFlatL2 do FAISS)
+
+O índice do guia são dois arquivos:
+- watizat_index.pkl: só metadados, {'chunks': textos, 'metric': 'l2',
+  'vectors': nome do .npy}
+- watizat_index.npy: vetores float32 (n x d), abertos com memory-map;
+  só as páginas usadas na busca são lidas do disco
+
+Um .pkl no formato antigo ({'index': bytes do FAISS, 'chunks'}) ainda é
+aceito, mas é desserializado inteiro; `python vector_index.py split`
+converte para o formato novo. A busca é em lote: uma multiplicação de
+matrizes para todas as consultas + argpartition para os k melhores.
+
+O SemanticRetriever pontua por cosseno e descarta trechos abaixo de
+`min_score`: sem nada relevante, a busca volta vazia.
+"""
+
+import argparse
+import logging
+import pickle
+import struct
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chunk_store import ChunkStore
+
+logger = logging.getLogger(__name__)
+
+FAISS_FLAT_MAGIC = b'IxF2'
+FAISS_METRIC_INNER_PRODUCT = 0
+FAISS_METRIC_L2 = 1
+# magic, d (int32), ntotal (int64), 2 x int64 (não usados), is_trained (byte), metric (int32)
+_FAISS_HEADER = struct.Struct('<4siqqqBi')
+CANDIDATES_PER_RESULT = 4
+
+
+def read_faiss_flat(buffer, offset: int = 0) -> Tuple[np.ndarray, str]:
+    """
+    Vetores (ntotal x d, float32) e métrica ('l2' ou 'ip') de um IndexFlat
+    serializado pelo FAISS. Sem cópia se o buffer estiver alinhado.
+    """
+    magic, dim, ntotal, _, _, _, metric = _FAISS_HEADER.unpack_from(buffer, offset)
+    if magic != FAISS_FLAT_MAGIC:
+        raise ValueError(f"unsupported FAISS index type: {magic!r}")
+    if metric not in (FAISS_METRIC_L2, FAISS_METRIC_INNER_PRODUCT):
+        raise ValueError(f"unsupported FAISS metric: {metric}")
+
+    offset += _FAISS_HEADER.size
+    (count,) = struct.unpack_from('<Q', buffer, offset)
+    offset += 8
+    if count != dim * ntotal or offset + count * 4 > len(buffer):
+        raise ValueError('corrupt FAISS index: vector data does not match header')
+
+    vectors = np.frombuffer(buffer, dtype='<f4', count=count, offset=offset).reshape(ntotal, dim)
+    if not vectors.flags.aligned:
+        vectors = vectors.copy()
+    return vectors, ('l2' if metric == FAISS_METRIC_L2 else 'ip')
+
+
+def load_pickled_index(path: Path) -> Tuple[np.ndarray, str, List[str]]:
+    """
+    (vetores, métrica, trechos) do watizat_index.pkl. No formato novo os
+    vetores são o .npy mapeado em memória (nada é lido até a busca); no
+    antigo, uma cópia tirada do array desserializado junto com os textos.
+    """
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    chunks = list(data.get('chunks', []))
+    if 'index' in data:
+        vectors, metric = read_faiss_flat(data['index'])
+    else:
+        vectors = np.load(path.parent / data['vectors'], mmap_mode='r')
+        metric = data.get('metric', 'l2')
+    if vectors.dtype != np.float32 or vectors.ndim != 2:
+        raise ValueError(f"{path}: vectors must be a float32 matrix")
+    if len(chunks) != len(vectors):
+        raise ValueError(f"{path}: {len(vectors)} vectors for {len(chunks)} chunks")
+    return vectors, metric, chunks
+
+
+def split_pickled_index(path: Path) -> Path:
+    """Converte um .pkl no formato antigo: vetores para <nome>.npy, só metadados no .pkl"""
+    vectors, metric, chunks = load_pickled_index(path)
+    vectors_path = path.with_suffix('.npy')
+    np.save(vectors_path, np.ascontiguousarray(vectors, dtype='<f4'))
+    with open(path, 'wb') as f:
+        pickle.dump({'chunks': chunks, 'metric': metric, 'vectors': vectors_path.name}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    return vectors_path
+
+
+class VectorIndex:
+    """
+    Índice exato: distância L2 ('l2', menor é melhor), produto interno
+    ('ip', maior é melhor) ou cosseno ('cosine', maior é melhor)
+    """
+
+    def __init__(self, vectors: np.ndarray, metric: str = 'l2'):
+        if metric not in ('l2', 'ip', 'cosine'):
+            raise ValueError(f"unknown metric: {metric}")
+        self.metric = metric
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        # ||x||² pré-calculado: L2 vira uma multiplicação de matrizes
+        self._sq_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        # Cosseno sem copiar os vetores (que podem estar no mmap): divide os produtos pela norma
+        self._inv_norms = np.divide(1.0, np.sqrt(self._sq_norms), out=np.zeros_like(self._sq_norms),
+                                    where=self._sq_norms > 0)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Consultas em lote (m x d). Retorna (scores, ids), ambos m x k, do melhor
+        para o pior; scores são distâncias L2², produtos internos ou cossenos.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"query dimension {queries.shape[1]} != index dimension {self.dim}")
+        k = min(k, len(self))
+        if k <= 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.float32), empty.astype(np.intp)
+
+        products = queries @ self.vectors.T
+        if self.metric == 'l2':
+            # ||q - x||² = ||q||² - 2 q·x + ||x||²
+            q_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+            keys = np.maximum(q_norms - 2 * products + self._sq_norms, 0)
+        elif self.metric == 'cosine':
+            q_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            q_inv = np.divide(1.0, q_norms, out=np.zeros_like(q_norms), where=q_norms > 0)
+            keys = -(products * q_inv * self._inv_norms)
+        else:
+            keys = -products
+
+        if k < len(self):
+            ids = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        else:
+            ids = np.broadcast_to(np.arange(len(self)), keys.shape)
+        order = np.take_along_axis(keys, ids, axis=1).argsort(axis=1, kind='stable')
+        ids = np.take_along_axis(ids, order, axis=1)
+        best = np.take_along_axis(keys, ids, axis=1)
+        return (best if self.metric == 'l2' else -best), ids
+
+
+class SemanticRetriever:
+    """
+    Trechos + índice vetorial + embedder; usado pelo /api/ai/chat.
+    Scores são cossenos; trechos abaixo de `min_score` (padrão: o do
+    embedder) não são retornados.
+    """
+
+    def __init__(self, index: VectorIndex, chunks: Sequence[str], embedder, min_score: Optional[float] = None):
+        if index.dim != embedder.dim:
+            raise ValueError(f"embedder dimension {embedder.dim} != index dimension {index.dim}")
+        self.index = index
+        self.chunks = chunks
+        self.embedder = embedder
+        self.min_score = embedder.min_score if min_score is None else min_score
+
+    @classmethod
+    def from_pickle(cls, path: Path, embedder) -> 'SemanticRetriever':
+        """
+        Os vetores gravados (384-d) vêm do modelo sentence-transformers que
+        gerou o índice, e só servem com consultas codificadas pelo mesmo
+        modelo (EMBEDDER=sentence-transformers). Com o HashingEmbedder
+        (padrão) eles NÃO são usados: do arquivo só se aproveitam os textos,
+        que são recodificados localmente, e o .npy mapeado nunca é lido.
+        """
+        vectors, metric, chunks = load_pickled_index(path)
+        if not embedder.matches_shipped_index or embedder.dim != vectors.shape[1]:
+            logger.info(f"{path.name}: shipped vectors unused with the {embedder.name} embedder, "
+                        f"re-encoding {len(chunks)} chunks")
+            embedder.fit(chunks)
+            vectors = embedder.encode(chunks)
+        return cls(VectorIndex(vectors, metric='cosine'), chunks, embedder)
+
+    @classmethod
+    def from_store(cls, path: Path, embedder) -> 'SemanticRetriever':
+        """
+        Trechos do knowledge_store (ingest_pdfs.py), mapeados em memória; os
+        vetores gravados são usados se vierem do mesmo embedder
+        """
+        store = ChunkStore(path)
+        if embedder.key is not None and store.embedder_key == embedder.key and store.vectors is not None:
+            index = VectorIndex(store.vectors, metric='cosine')
+        else:
+            texts = list(store)
+            embedder.fit(texts)
+            index = VectorIndex(embedder.encode(texts), metric='cosine')
+        return cls(index, store, embedder)
+
+    def search_batch(self, queries: Sequence[str], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        Pares (trecho, score) por consulta, só os com score >= min_score e
+        aceitos por embedder.relevant (lista vazia se nada for relevante);
+        um único encode + busca para o lote
+        """
+        if not queries:
+            return []
+        # Candidatos extras: alguns podem ser descartados por embedder.relevant
+        scores, ids = self.index.search(self.embedder.encode(list(queries)), k * CANDIDATES_PER_RESULT)
+        results = []
+        for query, row_scores, row_ids in zip(queries, scores, ids):
+            hits = []
+            for score, idx in zip(row_scores, row_ids):
+                if score < self.min_score or len(hits) == k:
+                    break
+                chunk = self.chunks[idx]
+                if self.embedder.relevant(query, chunk):
+                    hits.append((chunk, float(score)))
+            results.append(hits)
+        return results
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        return self.search_batch([query], k)[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ferramentas do índice vetorial')
+    parser.add_argument('command', choices=['split'])
+    parser.add_argument('path', type=Path, help='.pkl no formato antigo')
+    args = parser.parse_args()
+    print(f"✅ vetores gravados em {split_pickled_index(args.path)}")
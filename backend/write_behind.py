@@ -0,0 +1,162 @@
+"""
+Gravação assíncrona (write-behind) de registros que ninguém lê na hora
+
+Histórico do chat de IA e respostas automáticas são só inseridos; a
+requisição não precisa esperar o Mongo. Os documentos ficam num buffer
+por coleção e são gravados com insert_many quando:
+- uma coleção junta `max_batch` documentos, ou
+- passam `flush_interval` segundos desde a última gravação.
+
+O buffer é limitado (`max_pending`): se encher, put() espera a próxima
+gravação em vez de crescer sem limite. No shutdown, stop() grava tudo.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindBuffer:
+    def __init__(self, db, max_batch: int = 100, flush_interval: float = 1.0,
+                 max_pending: int = 10000, max_retries: int = 3):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._pending: Dict[str, List[dict]] = {}
+        self._retries: Dict[str, int] = {}
+        self._size = 0
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+
+    async def put(self, collection: str, document: dict) -> None:
+        """Agenda a inserção; só espera se o buffer estiver cheio"""
+        if self._task is None:
+            # Sem a tarefa de gravação (ex.: scripts): grava direto
+            await self.db[collection].insert_one(document)
+            return
+
+        async with self._space:
+            await self._space.wait_for(lambda: self._size < self.max_pending)
+            docs = self._pending.setdefault(collection, [])
+            docs.append(document)
+            self._size += 1
+        if len(docs) >= self.max_batch:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Para a tarefa e grava o que estiver pendente. A tarefa não é
+        cancelada: termina a gravação em andamento e sai do laço.
+        """
+        task, self._task = self._task, None
+        if task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await task
+            except asyncio.CancelledError:
+                # Cancelada de fora: o flush interrompido já devolveu o buffer
+                if not task.cancelled():
+                    raise
+        await self.flush(final=True)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self, final: bool = False) -> int:
+        """Grava tudo que está no buffer; retorna quantos documentos foram gravados"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            written = 0
+            try:
+                for collection, docs in pending.items():
+                    while docs:
+                        batch = docs[:self.max_batch]
+                        if await self._insert(collection, batch, final):
+                            written += len(batch)
+                        del docs[:len(batch)]
+            except asyncio.CancelledError:
+                # Devolve ao buffer o que não foi gravado, na frente do que
+                # chegou depois; o lote em voo pode ter sido gravado, mas o
+                # _id duplicado na nova tentativa conta como gravado
+                for collection, docs in pending.items():
+                    if docs:
+                        self._pending[collection] = docs + self._pending.get(collection, [])
+                raise
+            finally:
+                async with self._space:
+                    self._size = sum(len(docs) for docs in self._pending.values())
+                    self._space.notify_all()
+            return written
+
+    async def _insert(self, collection: str, batch: List[dict], final: bool) -> bool:
+        try:
+            await self.db[collection].insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # O _id é gerado no cliente na primeira tentativa: duplicado = já gravado
+            failed = [
+                batch[error['index']] for error in e.details.get('writeErrors', [])
+                if error.get('code') != DUPLICATE_KEY
+            ]
+            self.written += len(batch) - len(failed)
+            if not failed:
+                self._retries.pop(collection, None)
+                return True
+            return self._failed(collection, failed, final, e)
+        except Exception as e:
+            return self._failed(collection, batch, final, e)
+
+        self._retries.pop(collection, None)
+        self.written += len(batch)
+        self.batches += 1
+        return True
+
+    def _failed(self, collection: str, batch: List[dict], final: bool, error: Exception) -> bool:
+        self.errors += 1
+        retries = self._retries.get(collection, 0) + 1
+        self._retries[collection] = retries
+        if final or retries > self.max_retries:
+            self.dropped += len(batch)
+            logger.error(f"Write-behind dropped {len(batch)} {collection} documents: {error}")
+        else:
+            logger.error(f"Write-behind insert into {collection} failed, will retry: {error}")
+            self._pending.setdefault(collection, []).extend(batch)
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'pending': self._size,
+            'max_pending': self.max_pending,
+            'max_batch': self.max_batch,
+            'flush_interval_seconds': self.flush_interval,
+            'written': self.written,
+            'batches': self.batches,
+            'errors': self.errors,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,134 @@
+"""
+Cache das respostas do assistente (LRU + TTL) com coalescência
+
+A chave é a pergunta normalizada + idioma + hash do contexto recuperado
+do guia: perguntas frequentes ("onde posso comer?") não chamam o modelo
+de novo enquanto a resposta estiver no cache, e pedidos idênticos que
+chegam juntos esperam a mesma chamada em andamento.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple, Type
+
+
+def normalize_question(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def cache_key(question: str, language: str, context: str) -> str:
+    context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+    raw = f"{normalize_question(question)}\x00{language.strip().lower()}\x00{context_hash}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AIResponseCache:
+    def __init__(self, max_size: int = 512, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key: str):
+        """Resposta em cache ou None se ausente/expirada"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]],
+                             retry_on: Tuple[Type[BaseException], ...] = ()) -> Tuple[str, bool]:
+        """
+        (resposta, veio_do_cache). Só uma chamada ao modelo por chave: quem
+        chega enquanto ela está em andamento espera o mesmo resultado. Se a
+        chamada de outro falhar com uma exceção de `retry_on` (ex.: fila do
+        limitador cheia), quem esperava tenta de novo em vez de herdar o erro.
+        """
+        while True:
+            response = self.get(key)
+            if response is not None:
+                self.hits += 1
+                return response, True
+
+            task = self._in_flight.get(key)
+            leader = task is None
+            if leader:
+                self.misses += 1
+                task = asyncio.create_task(self._compute(key, compute))
+                self._in_flight[key] = task
+            else:
+                self.coalesced += 1
+            try:
+                return await self._wait(task), not leader
+            except retry_on:
+                if leader:
+                    raise
+
+    async def _wait(self, task: asyncio.Task) -> str:
+        """Espera a chamada; se o último interessado desistir, ela é cancelada"""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: um cliente que desconecta não cancela a chamada dos demais
+            return await asyncio.shield(task)
+        finally:
+            remaining = self._waiters.pop(task) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            elif not task.done():
+                task.cancel()
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        try:
+            response = await compute()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            del self._in_flight[key]
+        self.set(key, response)
+        return response
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.coalesced + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'in_flight': len(self._in_flight),
+            'hit_rate': round((self.hits + self.coalesced) / total, 4) if total else 0.0
+        }
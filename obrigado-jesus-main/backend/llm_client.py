@@ -0,0 +1,134 @@
+"""
+Cliente do modelo de linguagem usado pelo /api/ai/chat
+
+LLM_BACKEND=emergent (padrão) usa o LlmChat da emergentintegrations;
+LLM_BACKEND=litellm chama o provedor direto pelo litellm (LLM_API_KEY);
+LLM_BACKEND=fake responde localmente, sem chave nem rede (testes e
+desenvolvimento), com atraso configurável em LLM_FAKE_DELAY.
+
+`stream` entrega a resposta em pedaços conforme chegam. O LlmChat só
+devolve a resposta pronta (send_message), então no backend emergent o
+stream é um único pedaço com a resposta inteira; litellm e fake entregam
+token a token.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+
+class LLMClient(ABC):
+    name = 'llm'
+
+    @abstractmethod
+    async def complete(self, system_message: str, message: str, session_id: str) -> str:
+        """Resposta inteira do modelo"""
+
+    async def stream(self, system_message: str, message: str, session_id: str) -> AsyncIterator[str]:
+        yield await self.complete(system_message, message, session_id)
+
+
+class EmergentLLMClient(LLMClient):
+    name = 'emergent'
+
+    def __init__(self, api_key: str, provider: str = 'openai', model: str = 'gpt-5.1'):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+
+    async def complete(self, system_message: str, message: str, session_id: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(self.provider, self.model)
+        return await chat.send_message(UserMessage(text=message))
+
+
+class LiteLLMClient(LLMClient):
+    """Provedor direto via litellm, com streaming de verdade"""
+
+    name = 'litellm'
+
+    def __init__(self, api_key: str, provider: str = 'openai', model: str = 'gpt-5.1'):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+
+    def _request(self, system_message: str, message: str) -> dict:
+        return {
+            'model': f"{self.provider}/{self.model}",
+            'api_key': self.api_key,
+            'messages': [
+                {'role': 'system', 'content': system_message},
+                {'role': 'user', 'content': message}
+            ]
+        }
+
+    async def complete(self, system_message: str, message: str, session_id: str) -> str:
+        import litellm
+
+        response = await litellm.acompletion(**self._request(system_message, message))
+        return response.choices[0].message.content or ''
+
+    async def stream(self, system_message: str, message: str, session_id: str) -> AsyncIterator[str]:
+        import litellm
+
+        response = await litellm.acompletion(**self._request(system_message, message), stream=True)
+        async for chunk in response:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+
+class FakeLLMClient(LLMClient):
+    """Resposta determinística (mesma pergunta + contexto = mesma resposta)"""
+
+    name = 'fake'
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def _answer(self, system_message: str, message: str) -> str:
+        digest = hashlib.sha1(f"{system_message}\n{message}".encode('utf-8')).hexdigest()[:8]
+        return f"[fake-llm {digest}] Resposta para: {message}"
+
+    async def complete(self, system_message: str, message: str, session_id: str) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._answer(system_message, message)
+
+    async def stream(self, system_message: str, message: str, session_id: str) -> AsyncIterator[str]:
+        self.calls += 1
+        tokens = re.findall(r'\S+\s*', self._answer(system_message, message))
+        for token in tokens:
+            # O atraso total é o mesmo do complete, distribuído entre os tokens
+            if self.delay:
+                await asyncio.sleep(self.delay / len(tokens))
+            yield token
+
+
+def create_llm_client(backend: str = '') -> LLMClient:
+    backend = backend or os.environ.get('LLM_BACKEND', 'emergent')
+    if backend == 'fake':
+        return FakeLLMClient(delay=float(os.environ.get('LLM_FAKE_DELAY', '0')))
+    if backend == 'emergent':
+        return EmergentLLMClient(
+            api_key=os.environ.get('EMERGENT_LLM_KEY', ''),
+            provider=os.environ.get('LLM_PROVIDER', 'openai'),
+            model=os.environ.get('LLM_MODEL', 'gpt-5.1')
+        )
+    if backend == 'litellm':
+        return LiteLLMClient(
+            api_key=os.environ.get('LLM_API_KEY', ''),
+            provider=os.environ.get('LLM_PROVIDER', 'openai'),
+            model=os.environ.get('LLM_MODEL', 'gpt-5.1')
+        )
+    raise ValueError(f"unknown LLM_BACKEND: {backend}")
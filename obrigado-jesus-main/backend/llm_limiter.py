@@ -0,0 +1,104 @@
+"""
+Limite de chamadas simultâneas ao modelo de linguagem
+
+- Global: no máximo `max_concurrent` chamadas; as demais esperam na fila
+  até `queue_timeout` segundos e então recebem LLMBusy (503)
+- Por usuário: no máximo `per_user` perguntas em andamento (esperando ou
+  executando); a seguinte recebe UserLimitExceeded (429), para que um
+  usuário não ocupe todas as vagas
+
+As duas partes são separadas: a admissão por usuário é feita antes de
+entrar numa chamada compartilhada (coalescida pelo cache de respostas) e
+a vaga global só por quem de fato chama o modelo. Assim quem espera a
+chamada de outro nunca herda o 429 de outro usuário.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class LLMBusy(Exception):
+    """Fila cheia: nenhuma vaga liberada dentro do queue_timeout"""
+
+
+class UserLimitExceeded(Exception):
+    """O usuário já tem o máximo de perguntas em andamento"""
+
+
+class LLMConcurrencyLimiter:
+    def __init__(self, max_concurrent: int = 8, queue_timeout: float = 10.0, per_user: int = 2):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.per_user = per_user
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._per_user: Dict[str, int] = {}
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected_busy = 0
+        self.rejected_user = 0
+
+    def admit(self, user_id: str) -> None:
+        """
+        Conta uma pergunta em andamento do usuário (inclusive esperando a
+        chamada de outro); quem admitir deve chamar dismiss() depois
+        """
+        if self._per_user.get(user_id, 0) >= self.per_user:
+            self.rejected_user += 1
+            raise UserLimitExceeded(user_id)
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def dismiss(self, user_id: str) -> None:
+        remaining = self._per_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    async def acquire_model(self) -> None:
+        """Reserva uma vaga global; quem chamar deve chamar release_model() depois"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_busy += 1
+            raise LLMBusy()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release_model(self) -> None:
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def user_slot(self, user_id: str):
+        """Admissão por usuário: fica com ele enquanto espera ou recebe a resposta"""
+        self.admit(user_id)
+        try:
+            yield
+        finally:
+            self.dismiss(user_id)
+
+    @asynccontextmanager
+    async def model_slot(self):
+        """Vaga global: só durante a chamada ao modelo"""
+        await self.acquire_model()
+        try:
+            yield
+        finally:
+            self.release_model()
+
+    def stats(self) -> dict:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'per_user': self.per_user,
+            'queue_timeout_seconds': self.queue_timeout,
+            'active': self.active,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected_busy': self.rejected_busy,
+            'rejected_user': self.rejected_user
+        }
@@ -1,4 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -9,11 +10,16 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
+import json
+import asyncio
+from contextlib import nullcontext
 from datetime import datetime, timezone, timedelta
 import bcrypt
 import jwt
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 from pdf_processor import WatizatPDFProcessor
+from llm_client import create_llm_client
+from ai_response_cache import AIResponseCache, cache_key
+from llm_limiter import LLMBusy, LLMConcurrencyLimiter, UserLimitExceeded
 from auto_responses import get_auto_response, format_auto_response_post
 from help_locations import HELP_LOCATIONS, get_all_help_locations, get_help_locations_by_category
 import math
@@ -62,6 +68,19 @@ ALGORITHM = "HS256"
 
 pdf_processor = WatizatPDFProcessor()
 
+# Modelo de linguagem (LLM_BACKEND=emergent|fake) e cache das respostas
+llm_client = create_llm_client()
+ai_response_cache = AIResponseCache(
+    max_size=int(os.environ.get('AI_CACHE_SIZE', '512')),
+    ttl=float(os.environ.get('AI_CACHE_TTL', '3600'))
+)
+# Chamadas simultâneas ao modelo: limite global com fila e limite por usuário
+llm_limiter = LLMConcurrencyLimiter(
+    max_concurrent=int(os.environ.get('LLM_MAX_CONCURRENT', '8')),
+    queue_timeout=float(os.environ.get('LLM_QUEUE_TIMEOUT', '10')),
+    per_user=int(os.environ.get('LLM_MAX_PER_USER', '2'))
+)
+
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -413,43 +432,158 @@ async def get_services(category: Optional[str] = None):
     services = await db.services.find(query, {'_id': 0}).to_list(100)
     return services
 
+def build_system_message(language: str, context: str) -> str:
+    return f"""Você é um assistente especializado em ajudar migrantes em Paris. 
+        Use as informações do guia Watizat abaixo para responder perguntas.
+        Seja empático, claro e objetivo. Responda em {language}.
+        
+        Contexto do Watizat:
+        {context}
+        """
+
+def llm_admission(user_id: str, key: str):
+    """
+    Vaga por usuário, tomada antes de entrar na chamada compartilhada do
+    cache: o 429 é sempre de quem excedeu. Respostas em cache não contam.
+    """
+    if ai_response_cache.get(key) is not None:
+        return nullcontext()
+    return llm_limiter.user_slot(user_id)
+
+async def limited_complete(user_id: str, system_message: str, message: str) -> str:
+    async with llm_limiter.model_slot():
+        return await llm_client.complete(system_message, message, f"user_{user_id}")
+
+async def save_ai_chat(user_id: str, message_data: AIMessage, response: str, cached: bool):
+    chat_record = {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'message': message_data.message,
+        'response': response,
+        'language': message_data.language,
+        'cached': cached,
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    await db.ai_chats.insert_one(chat_record)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def next_token(tokens: asyncio.Queue, result: asyncio.Future) -> Optional[str]:
+    """Próximo pedaço vindo do modelo, ou None quando a resposta terminou"""
+    if tokens.empty() and not result.done():
+        getter = asyncio.ensure_future(tokens.get())
+        try:
+            await asyncio.wait({getter, result}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not getter.done():
+                getter.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+    return None if tokens.empty() else tokens.get_nowait()
+
+async def ai_chat_events(message_data: AIMessage, user_id: str, system_message: str, key: str, sources: List[str]):
+    """
+    Eventos SSE: start, token (um ou vários), done | error.
+
+    Passa pelo mesmo cache e coalescência do JSON. Quem dispara a chamada
+    ao modelo recebe os pedaços conforme chegam; resposta em cache ou de
+    uma pergunta idêntica em andamento chega inteira num único token. O
+    primeiro evento só sai quando já há resposta ou pedaço, então 429/503
+    ainda viram status HTTP. Se o cliente desconecta e ninguém mais espera
+    a mesma resposta, a chamada é cancelada e a vaga liberada.
+    """
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    async def compute() -> str:
+        async with llm_limiter.model_slot():
+            parts = []
+            async for token in llm_client.stream(system_message, message_data.message, f"user_{user_id}"):
+                parts.append(token)
+                tokens.put_nowait(token)
+            return ''.join(parts)
+
+    async with llm_admission(user_id, key):
+        result = asyncio.ensure_future(
+            ai_response_cache.get_or_compute(key, compute, retry_on=(LLMBusy,))
+        )
+        try:
+            token = await next_token(tokens, result)
+            if token is None:
+                response, cached = result.result()
+                yield sse_event('start', {'cached': cached})
+                yield sse_event('token', {'text': response})
+            else:
+                yield sse_event('start', {'cached': False})
+                try:
+                    while token is not None:
+                        yield sse_event('token', {'text': token})
+                        token = await next_token(tokens, result)
+                    response, cached = result.result()
+                except Exception as e:
+                    logging.error(f"AI Chat stream error: {str(e)}")
+                    yield sse_event('error', {'detail': 'Error processing message'})
+                    return
+        finally:
+            if not result.done():
+                result.cancel()
+
+    await save_ai_chat(user_id, message_data, response, cached)
+    yield sse_event('done', {'sources': sources, 'cached': cached})
+
 @api_router.post("/ai/chat")
-async def ai_chat(message_data: AIMessage, current_user: User = Depends(get_current_user)):
+async def ai_chat(message_data: AIMessage, stream: bool = False, current_user: User = Depends(get_current_user)):
+    """
+    Resposta completa em JSON ou, com ?stream=true, Server-Sent Events.
+    O stream só chega token a token com LLM_BACKEND=litellm (ou fake): o
+    LlmChat do backend emergent não tem streaming e a resposta vem num
+    único evento token, depois que o modelo termina.
+    """
     try:
         pdf_processor.load_index()
         relevant_chunks = pdf_processor.search(message_data.message, k=3)
         
         context = "\n\n".join(relevant_chunks) if relevant_chunks else "Informação não encontrada no guia Watizat."
+        system_message = build_system_message(message_data.language, context)
+        sources = relevant_chunks[:2] if relevant_chunks else []
         
-        system_message = f"""Você é um assistente especializado em ajudar migrantes em Paris. 
-        Use as informações do guia Watizat abaixo para responder perguntas.
-        Seja empático, claro e objetivo. Responda em {message_data.language}.
+        # Mesma pergunta + idioma + contexto: reaproveita a resposta (ou a chamada em andamento)
+        key = cache_key(message_data.message, message_data.language, context)
         
-        Contexto do Watizat:
-        {context}
-        """
-        
-        chat = LlmChat(
-            api_key=os.environ['EMERGENT_LLM_KEY'],
-            session_id=f"user_{current_user.id}",
-            system_message=system_message
-        ).with_model("openai", "gpt-5.1")
-        
-        user_message = UserMessage(text=message_data.message)
-        response = await chat.send_message(user_message)
+        if stream:
+            events = ai_chat_events(message_data, current_user.id, system_message, key, sources)
+            # O primeiro evento só sai depois de conseguir a vaga: 429/503 ainda viram status HTTP
+            first_event = await events.__anext__()
+            
+            async def body():
+                yield first_event
+                async for event in events:
+                    yield event
+            
+            return StreamingResponse(
+                body(),
+                media_type='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
-        chat_record = {
-            'id': str(uuid.uuid4()),
-            'user_id': current_user.id,
-            'message': message_data.message,
-            'response': response,
-            'language': message_data.language,
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }
-        await db.ai_chats.insert_one(chat_record)
+        async with llm_admission(current_user.id, key):
+            response, cached = await ai_response_cache.get_or_compute(
+                key,
+                lambda: limited_complete(current_user.id, system_message, message_data.message),
+                retry_on=(LLMBusy,)
+            )
+        await save_ai_chat(current_user.id, message_data, response, cached)
         
-        return {'response': response, 'sources': relevant_chunks[:2] if relevant_chunks else []}
-    
+        return {'response': response, 'sources': sources}
+    
+    except UserLimitExceeded:
+        raise HTTPException(status_code=429, detail="Aguarde a resposta anterior antes de enviar outra pergunta")
+    except LLMBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Assistente ocupado, tente novamente em instantes",
+            headers={'Retry-After': str(max(1, int(llm_limiter.queue_timeout)))}
+        )
     except Exception as e:
         logging.error(f"AI Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error processing message")
@@ -517,6 +651,18 @@ async def admin_stats(current_user: User = Depends(get_current_user)):
         'offers_count': offers_count
     }
 
+@api_router.get("/admin/metrics")
+async def admin_metrics(current_user: User = Depends(get_current_user)):
+    """Métricas internas do processo (cache e fila do modelo)"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {
+        'llm_backend': llm_client.name,
+        'ai_cache': ai_response_cache.stats(),
+        'llm_limiter': llm_limiter.stats()
+    }
+
 @api_router.get("/admin/users")
 async def admin_get_users(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
@@ -176,6 +176,52 @@ class WatizatAPITester:
             return True
         return False
 
+    def test_ai_chat_cache(self):
+        """Test that repeated questions reuse the cached AI answer (run the server with LLM_BACKEND=fake)"""
+        first_ok, first = self.run_test(
+            "AI Chat (cache miss)",
+            "POST",
+            "ai/chat",
+            200,
+            data={"message": "Onde posso comer?", "language": "pt"}
+        )
+        second_ok, second = self.run_test(
+            "AI Chat (cache hit)",
+            "POST",
+            "ai/chat",
+            200,
+            data={"message": "onde posso COMER", "language": "pt"}
+        )
+        
+        if first_ok and second_ok:
+            same = first.get('response') == second.get('response')
+            self.log_test("AI Chat cached answer reused", same,
+                          "" if same else "Normalized question returned a different answer")
+            return same
+        return False
+
+    def test_ai_chat_stream(self):
+        """Test AI chat in Server-Sent Events mode (?stream=true)"""
+        print(f"\n🔍 Testing AI Chat (stream)...")
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/ai/chat?stream=true",
+                json={"message": "Onde posso dormir hoje?", "language": "pt"},
+                headers={'Authorization': f'Bearer {self.token}'},
+                stream=True,
+                timeout=60
+            )
+            events = [line[len('event: '):] for line in response.iter_lines(decode_unicode=True)
+                      if line and line.startswith('event: ')]
+            success = (response.status_code == 200 and events[:1] == ['start']
+                       and 'token' in events and events[-1:] == ['done'])
+            self.log_test("AI Chat (stream)", success,
+                          "" if success else f"Status {response.status_code}, events {events}")
+            return success
+        except Exception as e:
+            self.log_test("AI Chat (stream)", False, f"Exception: {str(e)}")
+            return False
+
     def test_send_message(self):
         """Test sending direct message"""
         # First create another user to send message to
@@ -545,6 +591,8 @@ class WatizatAPITester:
         # Test AI functionality (might be slow)
         print("\n🤖 Testing AI Chat (this may take a few seconds)...")
         self.test_ai_chat()
+        self.test_ai_chat_cache()
+        self.test_ai_chat_stream()
         
         # Test messaging
         self.test_send_message()
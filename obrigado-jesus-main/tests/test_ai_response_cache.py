@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+import ai_response_cache
+from ai_response_cache import AIResponseCache, cache_key
+from llm_client import FakeLLMClient, LLMClient, create_llm_client
+
+SYSTEM = 'Você é o assistente do Watizat'
+
+
+def ask(cache: AIResponseCache, llm: FakeLLMClient, question: str, context: str = 'guia'):
+    key = cache_key(question, 'pt', context)
+    return cache.get_or_compute(key, lambda: llm.complete(f"{SYSTEM}\n{context}", question, 'session'))
+
+
+def test_concurrent_identical_questions_make_one_call():
+    async def scenario():
+        llm = FakeLLMClient(delay=0.05)
+        cache = AIResponseCache()
+        results = await asyncio.gather(*(ask(cache, llm, 'Onde posso comer?') for _ in range(10)))
+
+        assert llm.calls == 1
+        assert len({response for response, _ in results}) == 1
+        assert sum(1 for _, cached in results if not cached) == 1
+        stats = cache.stats()
+        assert stats['misses'] == 1
+        assert stats['coalesced'] == 9
+        assert stats['in_flight'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_normalized_question_hits_cache():
+    async def scenario():
+        llm = FakeLLMClient()
+        cache = AIResponseCache()
+        first, cached_first = await ask(cache, llm, 'Onde posso comer?')
+        second, cached_second = await ask(cache, llm, '  onde POSSO comer ')
+
+        assert (cached_first, cached_second) == (False, True)
+        assert first == second
+        assert llm.calls == 1
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['hit_rate'] == 0.5
+
+    asyncio.run(scenario())
+
+
+def test_different_context_is_a_different_entry():
+    async def scenario():
+        llm = FakeLLMClient()
+        cache = AIResponseCache()
+        await ask(cache, llm, 'Onde posso comer?', context='guia v1')
+        await ask(cache, llm, 'Onde posso comer?', context='guia v2')
+        assert llm.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ai_response_cache.time, 'monotonic', lambda: now[0])
+
+    async def scenario():
+        llm = FakeLLMClient()
+        cache = AIResponseCache(ttl=60)
+        await ask(cache, llm, 'Onde posso dormir?')
+        now[0] += 59
+        assert (await ask(cache, llm, 'Onde posso dormir?'))[1] is True
+        now[0] += 2
+        assert (await ask(cache, llm, 'Onde posso dormir?'))[1] is False
+        assert llm.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AIResponseCache(max_size=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'  # 'a' passa a ser o mais recente
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_failed_call_is_not_cached():
+    class FailingLLM(FakeLLMClient):
+        async def complete(self, system_message, message, session_id):
+            self.calls += 1
+            raise RuntimeError('provider down')
+
+    async def scenario():
+        llm = FailingLLM()
+        cache = AIResponseCache()
+        with pytest.raises(RuntimeError):
+            await ask(cache, llm, 'Onde posso comer?')
+        with pytest.raises(RuntimeError):
+            await ask(cache, llm, 'Onde posso comer?')
+        assert llm.calls == 2
+        assert cache.stats()['errors'] == 2
+        assert cache.stats()['size'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_fake_client_stream_matches_complete():
+    async def scenario():
+        llm = FakeLLMClient()
+        full = await llm.complete(SYSTEM, 'Onde posso comer?', 's')
+        streamed = ''.join([token async for token in llm.stream(SYSTEM, 'Onde posso comer?', 's')])
+        assert streamed == full
+
+    asyncio.run(scenario())
+
+
+def test_create_llm_client_fake(monkeypatch):
+    monkeypatch.setenv('LLM_FAKE_DELAY', '0.25')
+    llm = create_llm_client('fake')
+    assert isinstance(llm, FakeLLMClient)
+    assert llm.delay == 0.25
+
+
+def test_client_without_complete_cannot_be_created():
+    class Incomplete(LLMClient):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_waiters_retry_when_the_leader_fails_with_a_retryable_error():
+    class Busy(Exception):
+        pass
+
+    async def scenario():
+        cache = AIResponseCache()
+        gate = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                await gate.wait()
+                raise Busy()
+            return 'resposta'
+
+        leader = asyncio.create_task(cache.get_or_compute('k', compute, retry_on=(Busy,)))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute('k', compute, retry_on=(Busy,)))
+        await asyncio.sleep(0)
+        gate.set()
+
+        with pytest.raises(Busy):
+            await leader
+        assert await waiter == ('resposta', False)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_when_the_last_waiter_leaves():
+    async def scenario():
+        cache = AIResponseCache()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return 'resposta'
+
+        first = asyncio.create_task(cache.get_or_compute('k', compute))
+        second = asyncio.create_task(cache.get_or_compute('k', compute))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()  # o segundo ainda espera
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert cache.stats()['in_flight'] == 0
+
+    asyncio.run(scenario())
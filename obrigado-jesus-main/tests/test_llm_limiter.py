@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import Request
+
+import server
+from ai_response_cache import AIResponseCache
+from llm_client import FakeLLMClient
+from llm_limiter import LLMBusy, LLMConcurrencyLimiter, UserLimitExceeded
+
+
+def test_per_user_cap_rejects_the_next_question():
+    async def scenario():
+        limiter = LLMConcurrencyLimiter(per_user=1)
+        async with limiter.user_slot('u1'):
+            with pytest.raises(UserLimitExceeded):
+                async with limiter.user_slot('u1'):
+                    pass
+            async with limiter.user_slot('u2'):  # outros usuários não são afetados
+                pass
+        async with limiter.user_slot('u1'):  # a vaga voltou
+            pass
+        assert limiter.stats()['rejected_user'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_global_queue_times_out_with_busy():
+    async def scenario():
+        limiter = LLMConcurrencyLimiter(max_concurrent=1, queue_timeout=0.05)
+        async with limiter.model_slot():
+            with pytest.raises(LLMBusy):
+                async with limiter.model_slot():
+                    pass
+        stats = limiter.stats()
+        assert (stats['active'], stats['waiting'], stats['rejected_busy']) == (0, 0, 1)
+        async with limiter.model_slot():
+            pass
+
+    asyncio.run(scenario())
+
+
+class StubPDF:
+    def load_index(self):
+        pass
+
+    def search(self, query, k=3):
+        return ['Restos du Coeur: refeições gratuitas']
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """ai_chat com modelo fake lento; o usuário vem do cabeçalho X-User"""
+    llm = FakeLLMClient(delay=0.2)
+    limiter = LLMConcurrencyLimiter(max_concurrent=1, queue_timeout=0.05, per_user=1)
+    saved = []
+
+    async def save_ai_chat(user_id, message_data, response, cached):
+        saved.append((user_id, cached))
+
+    monkeypatch.setattr(server, 'llm_client', llm)
+    monkeypatch.setattr(server, 'llm_limiter', limiter)
+    monkeypatch.setattr(server, 'ai_response_cache', AIResponseCache())
+    monkeypatch.setattr(server, 'pdf_processor', StubPDF())
+    monkeypatch.setattr(server, 'save_ai_chat', save_ai_chat)
+
+    def current_user(request: Request):
+        user_id = request.headers['X-User']
+        return server.User(id=user_id, email=f'{user_id}@example.com', name=user_id, role='migrant')
+
+    server.app.dependency_overrides[server.get_current_user] = current_user
+    yield llm, limiter, saved
+    server.app.dependency_overrides.clear()
+
+
+def ask(client, user, message, stream=False):
+    return client.post(
+        '/api/ai/chat', params={'stream': 'true'} if stream else None,
+        json={'message': message}, headers={'X-User': user}
+    )
+
+
+def run(requests):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test', timeout=5) as client:
+            return await requests(client)
+    return asyncio.run(scenario())
+
+
+def sse_events(response):
+    return [
+        (block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+        for block in response.text.strip().split('\n\n')
+    ]
+
+
+def test_waiters_do_not_inherit_other_users_limits(chat):
+    llm, limiter, saved = chat
+
+    async def requests(client):
+        first = asyncio.create_task(ask(client, 'ana', 'Onde posso comer?'))
+        await asyncio.sleep(0.05)
+        # Ana já está no limite dela; Bruno pergunta o mesmo e espera a chamada dela
+        again = ask(client, 'ana', 'Onde posso dormir?')
+        joined = ask(client, 'bruno', 'Onde posso comer?')
+        # A vaga global está ocupada pela Ana: outra pergunta espera e desiste
+        busy = ask(client, 'carla', 'Onde tomar banho?')
+        return await asyncio.gather(first, again, joined, busy)
+
+    first, again, joined, busy = run(requests)
+    assert (first.status_code, again.status_code, joined.status_code, busy.status_code) == (200, 429, 200, 503)
+    assert joined.json()['response'] == first.json()['response']
+    assert llm.calls == 1
+    assert sorted(saved) == [('ana', False), ('bruno', True)]
+    assert limiter.stats()['active'] == 0
+
+
+def test_identical_streams_share_one_model_call(chat):
+    llm, limiter, saved = chat
+
+    async def requests(client):
+        leader = asyncio.create_task(ask(client, 'ana', 'Onde posso comer?', stream=True))
+        await asyncio.sleep(0.05)
+        follower = ask(client, 'bruno', 'Onde posso comer?', stream=True)
+        return await asyncio.gather(leader, follower)
+
+    leader, follower = run(requests)
+    assert llm.calls == 1
+    leader_events, follower_events = sse_events(leader), sse_events(follower)
+    assert [name for name, _ in leader_events].count('token') > 1
+    assert [name for name, _ in follower_events] == ['start', 'token', 'done']
+    leader_text = ''.join(data['text'] for name, data in leader_events if name == 'token')
+    assert follower_events[1][1]['text'] == leader_text
+    assert follower_events[-1][1]['cached'] is True
+
+
+def test_stream_disconnect_releases_the_slot(chat):
+    llm, limiter, saved = chat
+
+    async def scenario():
+        message = server.AIMessage(message='Onde posso comer?')
+        events = server.ai_chat_events(message, 'ana', 'sistema', 'key', [])
+        assert (await events.__anext__()).startswith('event: start')
+        assert (await events.__anext__()).startswith('event: token')
+        assert limiter.stats()['active'] == 1
+
+        await events.aclose()  # o cliente desconectou no meio do stream
+        await asyncio.sleep(0.01)
+        assert limiter.stats()['active'] == 0
+        assert limiter._per_user == {}
+        assert server.ai_response_cache.stats()['in_flight'] == 0
+        assert saved == []
+
+        # A vaga liberada atende a próxima pergunta sem esperar o modelo anterior
+        async with limiter.model_slot():
+            pass
+
+    asyncio.run(scenario())
@@ -47,7 +47,7 @@ async def popular_dados():
                 'name': 'Administrador',
                 'role': 'admin',
                 'languages': ['pt', 'en', 'fr'],
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': datetime.now(timezone.utc)
             },
             {
                 'id': str(uuid.uuid4()),
@@ -58,7 +58,7 @@ async def popular_dados():
                 'languages': ['pt', 'fr'],
                 'professional_area': 'legal',
                 'help_categories': ['legal', 'housing'],
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': datetime.now(timezone.utc)
             },
             {
                 'id': str(uuid.uuid4()),
@@ -68,7 +68,7 @@ async def popular_dados():
                 'role': 'migrant',
                 'languages': ['pt'],
                 'need_categories': ['food', 'housing'],
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': datetime.now(timezone.utc)
             }
         ]
         
@@ -99,7 +99,7 @@ async def popular_dados():
                     'category': 'food',
                     'title': 'Preciso de ajuda com alimentação',
                     'description': 'Olá, estou precisando de ajuda para conseguir alimentos. Cheguei recentemente em Paris e ainda não tenho trabalho.',
-                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'created_at': datetime.now(timezone.utc),
                     'images': []
                 },
                 {
@@ -109,7 +109,7 @@ async def popular_dados():
                     'category': 'legal',
                     'title': 'Ofereço ajuda jurídica gratuita',
                     'description': 'Sou advogada e posso ajudar com documentação, visto e questões legais. Atendo em português e francês.',
-                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'created_at': datetime.now(timezone.utc),
                     'images': []
                 },
                 {
@@ -119,7 +119,7 @@ async def popular_dados():
                     'category': 'housing',
                     'title': 'Procuro moradia temporária',
                     'description': 'Preciso de um lugar para ficar por algumas semanas enquanto procuro trabalho e moradia definitiva.',
-                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'created_at': datetime.now(timezone.utc),
                     'images': []
                 }
             ]
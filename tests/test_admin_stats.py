@@ -0,0 +1,70 @@
+import asyncio
+
+import server
+
+
+class FakeAggregation:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows
+
+
+class FakeCollection:
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+
+    def aggregate(self, pipeline):
+        self.calls.append(pipeline)
+        return FakeAggregation(self.rows)
+
+
+class FakeMessages:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def estimated_document_count(self):
+        self.calls.append('estimated_document_count')
+        return 40
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.calls = []
+        self.users = FakeCollection(rows, self.calls)
+        self.messages = FakeMessages(self.calls)
+
+    def __getattr__(self, name):
+        raise AssertionError(f'admin stats must not query {name} directly')
+
+
+def test_admin_stats_takes_two_queries_without_counting_messages(monkeypatch):
+    fake = FakeDB([
+        {'_id': {'c': 'users', 'role': 'volunteer'}, 'n': 3},
+        {'_id': {'c': 'users', 'role': 'migrant'}, 'n': 5},
+        {'_id': {'c': 'posts', 'category': 'food', 'type': 'need'}, 'n': 4},
+        {'_id': {'c': 'posts', 'category': 'food', 'type': 'offer'}, 'n': 1},
+        {'_id': {'c': 'posts', 'category': 'legal', 'type': 'need'}, 'n': 2},
+        {'_id': {'c': 'matches'}, 'n': 7},
+    ])
+    monkeypatch.setattr(server, 'db', fake)
+
+    stats = asyncio.run(server.compute_admin_stats())
+
+    assert len(fake.calls) == 2
+    pipeline = next(call for call in fake.calls if call != 'estimated_document_count')
+    assert [stage['$unionWith']['coll'] for stage in pipeline if '$unionWith' in stage] == ['posts', 'matches']
+    assert 'estimated_document_count' in fake.calls
+    assert stats['total_users'] == 8
+    assert stats['total_volunteers'] == 3
+    assert stats['total_migrants'] == 5
+    assert stats['total_posts'] == 7
+    assert stats['needs_count'] == 6
+    assert stats['offers_count'] == 1
+    assert stats['posts_by_category']['food'] == 5
+    assert stats['posts_by_category']['legal'] == 2
+    assert stats['posts_by_category']['health'] == 0
+    assert stats['total_matches'] == 7
+    assert stats['total_messages'] == 40
@@ -0,0 +1,49 @@
+import asyncio
+
+import auto_responses
+from auto_responses import auto_response_ref, expand_auto_responses
+
+
+class FakeTemplates:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        wanted = {(q['category'], q['version']) for q in query['$or']}
+        matches = [dict(doc) for doc in self.docs if (doc['category'], doc['version']) in wanted]
+
+        async def cursor():
+            for doc in matches:
+                yield doc
+        return cursor()
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.auto_response_templates = FakeTemplates(docs)
+
+
+def test_template_written_after_startup_is_loaded_on_first_read(monkeypatch):
+    monkeypatch.setattr(auto_responses, '_TEMPLATES', dict(auto_responses._TEMPLATES))
+    db = FakeDB([{'category': 'legacy', 'version': 'abc123', 'text': 'Texto antigo copiado'}])
+    messages = [
+        {'id': 'm1', 'auto_response': {'category': 'legacy', 'version': 'abc123'}},
+        {'id': 'm2', 'auto_response': auto_response_ref('food')},
+        {'id': 'm3', 'message': 'oi'},
+    ]
+
+    async def scenario():
+        expanded = await expand_auto_responses(db, [dict(m) for m in messages])
+        assert expanded[0]['message'] == 'Texto antigo copiado'
+        assert expanded[1]['message'].startswith('🍽️ Recursos para Alimentação')
+        assert expanded[2]['message'] == 'oi'
+        # Só a versão ausente foi buscada; na leitura seguinte ela já está em memória
+        assert db.auto_response_templates.queries == [
+            {'$or': [{'category': 'legacy', 'version': 'abc123'}]}
+        ]
+        await expand_auto_responses(db, [dict(messages[0])])
+        assert len(db.auto_response_templates.queries) == 1
+
+    asyncio.run(scenario())
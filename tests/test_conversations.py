@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from conversations import record_message
+from migrations import migrate_conversations
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def evaluate(expr, doc):
+    """Só as expressões que o resumo de conversa usa"""
+    if isinstance(expr, str) and expr.startswith('$'):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    if op == '$literal':
+        return args
+    if op == '$cond':
+        condition, then, otherwise = args
+        return evaluate(then if evaluate(condition, doc) else otherwise, doc)
+    values = [evaluate(arg, doc) for arg in args]
+    if op == '$ifNull':
+        return values[0] if values[0] is not None else values[1]
+    if op == '$add':
+        return sum(values)
+    if op == '$lte':
+        return values[0] is None or values[0] <= values[1]
+    raise NotImplementedError(op)
+
+
+class FakeConversations:
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            query, pipeline = operation._filter, operation._doc
+            key = (query['owner_id'], query['partner_id'])
+            doc = self.docs.get(key, dict(query))
+            for stage in pipeline:
+                doc = {**doc, **{field: evaluate(expr, doc) for field, expr in stage['$set'].items()}}
+            self.docs[key] = doc
+
+
+class FakeDB:
+    def __init__(self):
+        self.conversations = FakeConversations()
+
+
+def message(text, minutes, sender='ana', recipient='bruno'):
+    return {'message': text, 'from_user_id': sender, 'to_user_id': recipient,
+            'created_at': T0 + timedelta(minutes=minutes)}
+
+
+def test_both_sides_are_summarised():
+    async def scenario():
+        db = FakeDB()
+        await record_message(db, message('oi', 1))
+        await record_message(db, message('$tudo bem?', 2, sender='bruno', recipient='ana'))
+
+        ana, bruno = db.conversations.docs[('ana', 'bruno')], db.conversations.docs[('bruno', 'ana')]
+        assert ana['last_message'] == bruno['last_message'] == '$tudo bem?'
+        assert ana['last_from_user_id'] == 'bruno'
+        assert (ana['unread_count'], bruno['unread_count']) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_older_message_does_not_replace_the_latest():
+    async def scenario():
+        db = FakeDB()
+        await record_message(db, message('segunda', 2))
+        await record_message(db, message('primeira (atrasada)', 1))
+
+        summary = db.conversations.docs[('bruno', 'ana')]
+        assert summary['last_message'] == 'segunda'
+        assert summary['last_message_time'] == T0 + timedelta(minutes=2)
+        assert summary['unread_count'] == 2  # ainda conta como não lida
+
+    asyncio.run(scenario())
+
+
+class FakeMigrationsDB:
+    def __init__(self):
+        self.checkpoints = {}
+        self.migrations = self
+
+    async def find_one(self, query):
+        return self.checkpoints.get(query['_id'])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.checkpoints[query['_id']] = dict(doc)
+
+
+def test_conversation_backfill_runs_once(monkeypatch):
+    import conversations
+
+    runs = []
+
+    async def rebuild(db):
+        runs.append(db)
+
+    monkeypatch.setattr(conversations, 'rebuild_conversations', rebuild)
+
+    async def scenario():
+        db = FakeMigrationsDB()
+        assert await migrate_conversations(db) is True
+        assert await migrate_conversations(db) is False
+        assert len(runs) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+
+
+class FakeUsers:
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    async def to_list(self, length):
+        return [{'id': 'h1', 'name': 'Helper', 'distance': 1.23456}]
+
+
+class FakeDB:
+    def __init__(self):
+        self.users = FakeUsers()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    user = server.User(id='m1', email='m1@example.com', name='M', role='migrant')
+    monkeypatch.setattr(server, 'db', db)
+    server.app.dependency_overrides[server.get_current_user] = lambda: user
+    yield db
+    server.app.dependency_overrides.clear()
+
+
+def get(params):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.get('/api/helpers-nearby', params=params)
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('params', [
+    {'lat': 91, 'lng': 2.35},
+    {'lat': -90.5, 'lng': 2.35},
+    {'lat': 48.85, 'lng': 180.1},
+    {'lat': 48.85, 'lng': 2.35, 'radius': -1},
+])
+def test_out_of_range_coordinates_are_rejected(fake_db, params):
+    assert get(params).status_code == 422
+    assert fake_db.users.pipelines == []
+
+
+def test_valid_coordinates_reach_geo_near(fake_db):
+    response = get({'lat': 48.85, 'lng': 2.35, 'radius': 5})
+    assert response.status_code == 200
+    assert response.json()[0]['distance'] == 1.23
+    geo_near = fake_db.users.pipelines[0][0]['$geoNear']
+    assert geo_near['near']['coordinates'] == [2.35, 48.85]
+    assert geo_near['maxDistance'] == 5000
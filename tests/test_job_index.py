@@ -0,0 +1,37 @@
+import random
+
+from job_sources import JobIndex, normalize_text
+
+JOBS = [
+    {'title': 'Cook in a Paris restaurant', 'location': 'Paris', 'source': 'RozgarLine'},
+    {'title': 'Cooking assistant', 'location': 'Lyon', 'source': 'RozgarLine'},
+    {'title': 'Délivery driver', 'location': 'Marseille', 'source': 'RozgarLine'},
+    {'title': 'Cleaner', 'location': 'Paris', 'source': 'RozgarLine'},
+]
+
+
+def titles(jobs):
+    return [job['title'] for job in jobs]
+
+
+def test_prefix_and_all_tokens():
+    index = JobIndex(JOBS)
+    assert titles(index.search('cook')) == ['Cook in a Paris restaurant', 'Cooking assistant']
+    assert titles(index.search('cook paris')) == ['Cook in a Paris restaurant']
+    assert titles(index.search('delivery')) == ['Délivery driver']
+    assert index.search('zzz') == []
+    assert index.search('') == JOBS
+
+
+def test_matches_linear_prefix_scan():
+    rng = random.Random(3)
+    words = ['chef', 'cheese', 'chemist', 'care', 'carer', 'cargo', 'driver', 'dry', 'paris', 'lyon']
+    jobs = [{'title': ' '.join(rng.sample(words, 3)), 'location': rng.choice(words)} for _ in range(200)]
+    index = JobIndex(jobs)
+    for query in ['c', 'ch', 'che', 'car', 'cargo', 'd', 'dr', 'x', 'ca ly', 'che dri']:
+        expected = [
+            job for job in jobs
+            if all(any(word.startswith(token) for word in normalize_text(
+                f"{job['title']} {job['location']} ").split()) for token in query.split())
+        ]
+        assert index.search(query) == expected, query
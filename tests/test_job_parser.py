@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from job_sources import JobSource, RozgarLineSource
+
+FIXTURE = Path(__file__).resolve().parent.parent / 'backend' / 'benchmarks' / 'fixtures' / 'rozgarline_home.html'
+
+
+def feed_in_chunks(source, page: str, size: int) -> list:
+    parser = source.create_parser()
+    for start in range(0, len(page), size):
+        parser.feed(page[start:start + size])
+        if parser.done:
+            break
+    parser.close()
+    return parser.jobs
+
+
+@pytest.mark.parametrize('size', [1, 7, 64, 16 * 1024])
+def test_chunk_boundaries_do_not_change_the_result(size):
+    page = FIXTURE.read_text(encoding='utf-8')
+    source = RozgarLineSource(max_jobs=10 ** 6)
+    assert feed_in_chunks(source, page, size) == source.parse(page)
+    assert len(source.parse(page)) > 15
+
+
+def test_links_with_inner_tags_or_other_hosts_are_skipped():
+    page = (
+        '<A HREF="https://rozgarline.me/jobs/cook">Cook &amp; kitchen helper</A>'
+        '<a class="x" href="https://rozgarline.me/jobs/icon"><img src="i.png"> Icon job</a>'
+        "<a href='https://other.example/jobs/driver'>Driver in Lyon</a>"
+        '<a href="https://rozgarline.me/jobs/driver">Delivery driver</a >'
+    )
+    jobs = RozgarLineSource().parse(page)
+    assert jobs == [
+        {'title': 'Cook & kitchen helper', 'url': 'https://rozgarline.me/jobs/cook'},
+        {'title': 'Delivery driver', 'url': 'https://rozgarline.me/jobs/driver'},
+    ]
+
+
+def test_parser_stops_at_max_jobs_and_bounds_the_carry():
+    link = '<a href="https://rozgarline.me/jobs/{0}">Job number {0}</a>'
+    source = RozgarLineSource(max_jobs=3)
+    parser = source.create_parser()
+    parser.feed(''.join(link.format(i) for i in range(10)))
+    assert parser.done
+    assert [job['title'] for job in parser.jobs] == ['Job number 0', 'Job number 1', 'Job number 2']
+
+    parser = source.create_parser()
+    parser.feed('<a href="https://rozgarline.me/jobs/x">' + 'x' * (parser.max_carry + 1))
+    assert parser._carry == ''
+
+
+def test_source_without_parser_cannot_be_created():
+    class Incomplete(JobSource):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,141 @@
+import asyncio
+
+from aiohttp import web
+
+from job_refresher import JobRefresher
+from job_sources import JobAggregator, RozgarLineSource
+
+PAGE = """
+<html><body>
+<a href="https://rozgarline.me/jobs/cook-paris">Cook in a Paris restaurant</a>
+<a href="https://rozgarline.me/jobs/driver-lyon">Delivery driver in Lyon</a>
+<a href="https://rozgarline.me/jobs/more">More jobs</a>
+</body></html>
+"""
+
+
+class Upstream:
+    """Stand-in local do site de vagas: conta requisições, responde 304 ao ETag e pode falhar"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self.not_modified = 0
+        self.failing = False
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failing:
+            return web.Response(status=502)
+        if request.headers.get('If-None-Match') == '"v1"':
+            self.not_modified += 1
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type='text/html', headers={'ETag': '"v1"'})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}/'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+class FakeJobCache:
+    def __init__(self):
+        self.doc = None
+
+    async def find_one(self, query, projection=None):
+        return dict(self.doc) if self.doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        self.doc = dict(update['$set'])
+
+
+class FakeDB:
+    def __init__(self):
+        self.job_cache = FakeJobCache()
+
+
+def make_refresher(upstream: Upstream, interval: float = 3600.0):
+    aggregator = JobAggregator([RozgarLineSource(url=upstream.url)])
+    refresher = JobRefresher(aggregator.fetch_all, FakeDB(), interval=interval)
+    return aggregator, refresher
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    async def scenario():
+        async with Upstream(delay=0.1) as upstream:
+            aggregator, refresher = make_refresher(upstream)
+            try:
+                results = await asyncio.gather(*(refresher.refresh() for _ in range(5)))
+            finally:
+                await aggregator.close()
+
+            assert results == [True] * 5
+            assert upstream.requests == 1
+            assert refresher.refreshes == 1
+            assert [job['title'] for job in refresher.jobs] == [
+                'Cook in a Paris restaurant', 'Delivery driver in Lyon'
+            ]
+
+    asyncio.run(scenario())
+
+
+def test_upstream_failure_keeps_serving_stale_snapshot():
+    async def scenario():
+        async with Upstream() as upstream:
+            # interval=0: todo refresh vai ao upstream
+            aggregator, refresher = make_refresher(upstream, interval=0)
+            cold = JobAggregator([RozgarLineSource(url=upstream.url)])
+            try:
+                assert await refresher.refresh()
+                jobs, updated_at = refresher.jobs, refresher.updated_at
+
+                upstream.failing = True
+                # A fonte falha, mas o aggregator ainda tem as últimas vagas dela
+                assert await aggregator.fetch_all() == jobs
+                assert aggregator.stats()['RozgarLine']['errors'] == 1
+
+                # Sem vagas anteriores em nenhuma fonte, o refresh falha e o snapshot fica
+                refresher.fetch = cold.fetch_all
+                assert not await refresher.refresh()
+            finally:
+                await aggregator.close()
+                await cold.close()
+
+            assert refresher.jobs == jobs
+            assert refresher.updated_at == updated_at
+            assert refresher.failures == 1
+            assert refresher.last_error == 'all job sources failed'
+
+    asyncio.run(scenario())
+
+
+def test_not_modified_reuses_previous_listings():
+    async def scenario():
+        async with Upstream() as upstream:
+            aggregator, refresher = make_refresher(upstream, interval=0)
+            try:
+                assert await refresher.refresh()
+                first = refresher.jobs
+                assert await refresher.refresh()
+            finally:
+                await aggregator.close()
+
+            assert upstream.requests == 2
+            assert upstream.not_modified == 1
+            assert aggregator.stats()['RozgarLine']['not_modified'] == 1
+            assert refresher.jobs == first
+
+    asyncio.run(scenario())
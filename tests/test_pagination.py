@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import apply_cursor, decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def test_round_trip():
+    created_at = datetime(2025, 1, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 'p1')) == [created_at, 'p1']
+
+
+@pytest.mark.parametrize('payload', [
+    [{'$gt': ''}, 'p1'],
+    [{'$dt': 5}, 'p1'],
+    [{'$dt': '2025-01-01T00:00:00+00:00', '$ne': 1}, 'p1'],
+    [{'$dt': '2025-01-01T00:00:00'}, 'p1'],
+    [{'$dt': 'ontem'}, 'p1'],
+    [1, 2],
+    {'created_at': 'x'},
+])
+def test_rejects_untrusted_values(payload):
+    with pytest.raises(ValueError):
+        decode_cursor(raw_cursor(payload))
+
+
+def test_apply_cursor_builds_keyset_filter():
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    query = apply_cursor({'type': 'need'}, [('created_at', -1), ('id', -1)], encode_cursor(created_at, 'p1'))
+    assert query == {'$and': [
+        {'type': 'need'},
+        {'$or': [{'created_at': {'$lt': created_at}}, {'created_at': created_at, 'id': {'$lt': 'p1'}}]}
+    ]}
+
+
+def test_cursor_query_shape_uses_datetime_like_the_feed():
+    from indexes import QUERY_SHAPES
+
+    shape = next(s for s in QUERY_SHAPES if s['endpoint'] == 'get_posts?cursor')
+    first, tie = shape['filter']['$or']
+    assert isinstance(first['created_at']['$lt'], datetime)
+    assert isinstance(tie['created_at'], datetime)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from realtime import LocalBroker, MessageBroker, MessageHub
+
+
+def test_hub_delivers_to_every_connection_of_the_user():
+    async def scenario():
+        hub = MessageHub()
+        first = hub.subscribe('u1')
+        second = hub.subscribe('u1')
+        other = hub.subscribe('u2')
+
+        assert hub.deliver('u1', {'type': 'message'}) == 2
+        assert first.get_nowait() == {'type': 'message'}
+        assert second.get_nowait() == {'type': 'message'}
+        assert other.empty()
+        assert hub.stats()['connections'] == 3
+
+    asyncio.run(scenario())
+
+
+def test_hub_unsubscribe_stops_delivery():
+    async def scenario():
+        hub = MessageHub()
+        queue = hub.subscribe('u1')
+        hub.unsubscribe('u1', queue)
+        hub.unsubscribe('u1', queue)  # idempotente
+
+        assert hub.deliver('u1', {'type': 'message'}) == 0
+        assert queue.empty()
+        assert hub.stats()['connected_users'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_hub_drops_events_for_slow_clients():
+    async def scenario():
+        hub = MessageHub(queue_size=2)
+        queue = hub.subscribe('u1')
+        for i in range(3):
+            hub.deliver('u1', {'n': i})
+
+        assert queue.qsize() == 2
+        assert hub.stats()['dropped'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_local_broker_publishes_into_hub():
+    async def scenario():
+        hub = MessageHub()
+        queue = hub.subscribe('u1')
+        await LocalBroker(hub).publish('u1', {'type': 'message', 'message': {'id': 'm1'}})
+        assert queue.get_nowait()['message']['id'] == 'm1'
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def ws_user():
+    user = server.User(id='ws-user', email='ws@example.com', name='WS', role='migrant')
+    server.user_cache.set(user.id, user)
+    yield user
+    server.user_cache.invalidate(user.id)
+
+
+def wait_for_subscriber(user_id: str, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while user_id not in server.message_hub._subscribers:
+        if time.monotonic() > deadline:
+            raise AssertionError('WebSocket never subscribed')
+        time.sleep(0.01)
+
+
+def test_websocket_receives_published_messages(ws_user):
+    # Sem `with TestClient(...)`: os hooks de startup (Mongo) não rodam
+    client = TestClient(server.app)
+    token = server.create_token(ws_user.id, ws_user.email)
+
+    with client.websocket_connect(f'/api/ws/messages?token={token}') as ws:
+        wait_for_subscriber(ws_user.id)
+        ws.portal.call(server.publish_message, {
+            'id': 'm1', 'from_user_id': 'u2', 'to_user_id': ws_user.id, 'message': 'olá'
+        })
+        event = ws.receive_json()
+
+    assert event == {'type': 'message', 'message': {
+        'id': 'm1', 'from_user_id': 'u2', 'to_user_id': ws_user.id, 'message': 'olá'
+    }}
+    # Ao desconectar, a fila sai do hub
+    deadline = time.monotonic() + 2
+    while ws_user.id in server.message_hub._subscribers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ws_user.id not in server.message_hub._subscribers
+
+
+def test_websocket_rejects_invalid_token():
+    client = TestClient(server.app)
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect('/api/ws/messages?token=not-a-jwt') as ws:
+            ws.receive_json()
+    assert exc.value.code == 1008
+
+
+def test_broker_without_publish_cannot_be_created():
+    class Incomplete(MessageBroker):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(MessageHub())
@@ -0,0 +1,84 @@
+import pickle
+import struct
+
+import numpy as np
+import pytest
+
+from embeddings import Embedder, HashingEmbedder
+from pdf_processor import DEFAULT_INDEX_PATH, WatizatPDFProcessor
+from search_index import tokenize
+from vector_index import (_FAISS_HEADER, FAISS_FLAT_MAGIC, FAISS_METRIC_L2, SemanticRetriever, VectorIndex,
+                          load_pickled_index, split_pickled_index)
+
+
+def test_cosine_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    queries = rng.normal(size=(5, 16)).astype(np.float32)
+    scores, ids = VectorIndex(vectors, metric='cosine').search(queries, k=4)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    assert (ids == np.argsort(-expected, axis=1)[:, :4]).all()
+    assert np.allclose(scores, np.take_along_axis(expected, ids, axis=1), atol=1e-5)
+
+
+@pytest.fixture(scope='module')
+def retriever():
+    return SemanticRetriever.from_pickle(DEFAULT_INDEX_PATH, HashingEmbedder())
+
+
+@pytest.mark.parametrize('query', ['xyzzy', 'olá', 'obrigado', 'onde comer de graça'])
+def test_irrelevant_questions_return_nothing(retriever, query):
+    assert retriever.search(query, 3) == []
+
+
+@pytest.mark.parametrize('query', ['hébergement', 'douche', 'titre de séjour'])
+def test_hits_share_a_word_with_the_question(retriever, query):
+    hits = retriever.search(query, 3)
+    assert hits
+    for chunk, score in hits:
+        assert score >= retriever.min_score
+        assert set(tokenize(query)) & set(tokenize(chunk))
+
+
+def test_keyword_fallback_only_returns_real_matches():
+    processor = WatizatPDFProcessor()
+    assert processor.keyword_search('xyzzy') == []
+    assert any('Restaurants du Coeur' in chunk for chunk in processor.keyword_search('onde comer de graça'))
+    # search() mantém o fallback para os textos gerais
+    assert processor.search('xyzzy') == processor.knowledge_base['geral'][:3]
+
+
+def test_shipped_vectors_are_memory_mapped_outside_the_pickle():
+    with open(DEFAULT_INDEX_PATH, 'rb') as f:
+        metadata = pickle.load(f)
+    assert set(metadata) == {'chunks', 'metric', 'vectors'}
+
+    vectors, metric, chunks = load_pickled_index(DEFAULT_INDEX_PATH)
+    assert isinstance(vectors, np.memmap)
+    assert vectors.shape == (len(chunks), 384)
+    assert metric == 'l2'
+
+
+def test_legacy_pickle_is_split_into_metadata_and_npy(tmp_path):
+    vectors = np.random.default_rng(1).normal(size=(3, 4)).astype(np.float32)
+    faiss = (_FAISS_HEADER.pack(FAISS_FLAT_MAGIC, 4, 3, 0, 0, 1, FAISS_METRIC_L2)
+             + struct.pack('<Q', vectors.size) + vectors.tobytes())
+    path = tmp_path / 'index.pkl'
+    with open(path, 'wb') as f:
+        pickle.dump({'index': np.frombuffer(faiss, dtype=np.uint8), 'chunks': ['a', 'b', 'c']}, f)
+
+    assert split_pickled_index(path) == tmp_path / 'index.npy'
+    loaded, metric, chunks = load_pickled_index(path)
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, vectors)
+    assert (metric, chunks) == ('l2', ['a', 'b', 'c'])
+
+
+def test_embedder_without_encode_cannot_be_created():
+    class Incomplete(Embedder):
+        dim = 8
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from snapshot_cache import SnapshotCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError('mongo down')
+        return self.calls
+
+
+def test_first_get_loads_and_failure_raises():
+    async def scenario():
+        loader = Loader()
+        loader.fail = True
+        cache = SnapshotCache(loader, name='test')
+        with pytest.raises(RuntimeError):
+            await cache.get()
+        loader.fail = False
+        assert await cache.get() == 2
+
+    asyncio.run(scenario())
+
+
+def test_reload_replaces_snapshot():
+    async def scenario():
+        loader = Loader()
+        cache = SnapshotCache(loader, max_age=60)
+        assert await cache.get() == 1
+        await cache.reload()
+        assert await cache.get() == 2
+        assert cache.age < 60
+
+    asyncio.run(scenario())
+
+
+def test_failed_reload_serves_old_value_and_retries_on_next_get():
+    async def scenario():
+        loader = Loader()
+        cache = SnapshotCache(loader, max_age=60)
+        assert await cache.get() == 1
+
+        loader.fail = True
+        await cache.reload()
+        assert cache.failures == 1
+        # Valor antigo continua sendo servido, mas marcado como vencido
+        loader.fail = False
+        assert await cache.get() == 1
+        await asyncio.sleep(0.01)
+        assert await cache.get() == 3
+
+    asyncio.run(scenario())
+
+
+def test_reload_waits_for_in_flight_load():
+    async def scenario():
+        loader = Loader()
+        cache = SnapshotCache(loader, max_age=60)
+        first = asyncio.create_task(cache.get())
+        await asyncio.sleep(0)
+        await cache.reload()
+        assert await first == 1
+        assert loader.calls == 2
+        assert await cache.get() == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,239 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import server
+from pagination import encode_cursor
+from timelines import TimelineStore
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def feed_key(doc):
+    return (doc['created_at'], doc['id'])
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakePosts:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def find(self, query, projection=None):
+        if 'id' in query:
+            ids = set(query['id']['$in'])
+            return FakeCursor([dict(p) for p in self.posts if p['id'] in ids])
+        return FakeCursor([
+            {'created_at': p['created_at'], 'id': p['id']}
+            for p in self.posts if all(p.get(k) == v for k, v in query.items())
+        ])
+
+
+class FakeBuckets:
+    """Implementa só as operações que o TimelineStore usa"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query['_id'], {'_id': query['_id'], 'entries': []})
+        push = update['$push']['entries']
+        doc['entries'] = sorted(doc['entries'] + list(push['$each']), key=feed_key, reverse=True)[:push['$slice']]
+        doc.update(update.get('$set', {}))
+
+    async def update_many(self, query, update):
+        ids = set(update['$pull']['entries']['id']['$in'])
+        for doc in self.docs.values():
+            if any(entry['id'] in ids for entry in doc['entries']):
+                doc['entries'] = [entry for entry in doc['entries'] if entry['id'] not in ids]
+                doc.update(update['$set'])
+
+    def aggregate(self, pipeline):
+        keys = pipeline[0]['$match']['_id']['$in']
+        projection = pipeline[1]['$project']
+        entries_expr, limit = projection['entries']['$slice']
+        after = None
+        if '$filter' in entries_expr:
+            cond = entries_expr['$filter']['cond']['$or']
+            after = (cond[0]['$lt'][1], cond[1]['$and'][1]['$lt'][1])
+        rows = []
+        for key in keys:
+            doc = self.docs.get(key)
+            if doc is None:
+                continue
+            entries = doc['entries']
+            selected = [e for e in entries if after is None or feed_key(e) < after]
+            row = {'_id': key, 'size': len(entries), 'entries': selected[:limit]}
+            if entries:
+                row['last'] = entries[-1]
+            row.update({field: doc[field] for field in ('warm', 'trimmed') if field in doc})
+            rows.append(row)
+        return FakeCursor(rows)
+
+
+class FakeDB:
+    def __init__(self, posts):
+        self.posts = FakePosts(posts)
+        self.timelines = FakeBuckets()
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def make_posts(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f'p{i:05d}',
+            'user_id': 'system',
+            'type': rng.choice(['need', 'offer']),
+            'category': rng.choice(['food', 'legal', 'health']),
+            'created_at': T0 + timedelta(seconds=rng.randint(0, 100000)),
+        }
+        for i in range(count)
+    ]
+
+
+def visible(posts, categories):
+    return [
+        p['id'] for p in sorted(posts, key=feed_key, reverse=True)
+        if p['type'] == 'offer' or p['category'] in categories
+    ]
+
+
+async def warmed_store(db, cap, categories):
+    store = TimelineStore(db, cap=cap)
+    assert await store.page(categories) is None  # frio: aquece em segundo plano
+    assert len(store._tasks) == 1
+    await asyncio.gather(*store._tasks)
+    assert not store._tasks and not store._warming
+    return store
+
+
+def test_pages_follow_feed_order_and_stop_at_horizon():
+    async def scenario():
+        posts = make_posts(2000)
+        db = FakeDB(posts)
+        store = await warmed_store(db, cap=100, categories=['food'])
+
+        served, after = [], None
+        while True:
+            ids = await store.page(['food'], after, 30)
+            if ids is None:
+                break
+            served += ids
+            last = next(p for p in posts if p['id'] == ids[-1])
+            after = feed_key(last)
+
+        expected = visible(posts, ['food'])
+        assert served == expected[:len(served)]
+        assert 30 <= len(served) < len(expected)
+        assert store.deep == 1
+
+    asyncio.run(scenario())
+
+
+def test_small_buckets_serve_the_whole_feed():
+    async def scenario():
+        posts = make_posts(60)
+        store = await warmed_store(FakeDB(posts), cap=500, categories=['food', 'legal'])
+        assert await store.page(['food', 'legal'], None, 100) == visible(posts, ['food', 'legal'])
+
+    asyncio.run(scenario())
+
+
+def test_fan_out_puts_new_post_on_top():
+    async def scenario():
+        posts = make_posts(50)
+        db = FakeDB(posts)
+        store = await warmed_store(db, cap=500, categories=['food'])
+        new = {'id': 'new', 'user_id': 'system', 'type': 'need', 'category': 'food',
+               'created_at': T0 + timedelta(days=30)}
+        posts.append(new)
+        await store.fan_out(new)
+        assert (await store.page(['food'], None, 5))[0] == 'new'
+
+    asyncio.run(scenario())
+
+
+def test_emptied_trimmed_bucket_falls_back_and_rewarms():
+    async def scenario():
+        posts = [
+            {'id': f'o{i}', 'type': 'offer', 'category': 'food', 'created_at': T0 + timedelta(hours=i)}
+            for i in range(2)
+        ] + [
+            {'id': f'n{i}', 'type': 'need', 'category': 'food', 'created_at': T0 + timedelta(minutes=i)}
+            for i in range(6)
+        ]
+        db = FakeDB(posts)
+        store = await warmed_store(db, cap=3, categories=['food'])
+        # Bucket need:food cheio (3 de 6); o admin apaga os 3 mais recentes
+        removed = ['n5', 'n4', 'n3']
+        posts[:] = [p for p in posts if p['id'] not in removed]
+        await store.remove(removed)
+        assert db.timelines.docs['need:food']['entries'] == []
+
+        assert await store.page(['food'], None, 4) is None
+        assert store.cold == 2
+        while store._warming:
+            await asyncio.sleep(0)
+        assert await store.page(['food'], None, 4) == visible(posts, ['food'])[:4]
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def timeline_mode(monkeypatch):
+    posts = make_posts(40)
+    db = FakeDB(posts)
+    user = server.User(id='vol-1', email='vol@example.com', name='Vol', role='volunteer')
+
+    async def find_one(query, projection=None):
+        return {'help_categories': ['food']}
+
+    db.users = type('Users', (), {'find_one': staticmethod(find_one)})()
+    monkeypatch.setattr(server, 'db', db)
+    monkeypatch.setattr(server, 'timelines', TimelineStore(db, cap=500))
+    server.app.dependency_overrides[server.get_current_user] = lambda: user
+    yield posts
+    server.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize('values', [
+    ['2025-01-01', 'x'],
+    [T0.replace(tzinfo=None), 'p1'],
+    [T0, T0],
+    [T0],
+])
+def test_timeline_rejects_malformed_cursor(timeline_mode, values):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            cursor = encode_cursor(*values)
+            return await client.get('/api/posts', params={'cursor': cursor})
+
+    assert asyncio.run(scenario()).status_code == 400
@@ -0,0 +1,125 @@
+import asyncio
+
+from write_behind import WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.calls = 0
+        self.gate = None  # asyncio.Event: segura o insert_many até ser liberado
+        self.entered = asyncio.Event()
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls += 1
+        self.entered.set()
+        if self.gate is not None:
+            await self.gate.wait()
+        self.docs.extend(docs)
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class FakeDB:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+async def until(predicate, timeout: float = 2.0) -> None:
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    async def scenario():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, max_batch=5, flush_interval=60)
+        await buffer.start()
+        for i in range(5):
+            await buffer.put('ai_chats', {'n': i})
+        await until(lambda: len(db['ai_chats'].docs) == 5)
+
+        assert db['ai_chats'].calls == 1
+        assert buffer.stats()['batches'] == 1
+        assert buffer.stats()['pending'] == 0
+        await buffer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_waits_for_the_flush_in_progress_and_drains_the_rest():
+    async def scenario():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, max_batch=2, flush_interval=60)
+        db['messages'].gate = asyncio.Event()
+        await buffer.start()
+        for i in range(5):
+            await buffer.put('messages', {'n': i})
+        for i in range(3):
+            await buffer.put('ai_chats', {'n': i})
+
+        # A tarefa está presa no primeiro insert_many quando o shutdown começa
+        await db['messages'].entered.wait()
+        stop = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0.01)
+        assert not stop.done()
+        await buffer.put('messages', {'n': 5})  # chega durante o shutdown: gravado direto
+        db['messages'].gate.set()
+        await stop
+
+        assert sorted(doc['n'] for doc in db['messages'].docs) == [0, 1, 2, 3, 4, 5]
+        assert [doc['n'] for doc in db['ai_chats'].docs] == [0, 1, 2]
+        assert buffer.stats()['pending'] == 0
+        assert buffer.stats()['dropped'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_flush_returns_unwritten_batches_to_the_buffer():
+    async def scenario():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, max_batch=2, flush_interval=60)
+        db['messages'].gate = asyncio.Event()
+        await buffer.start()
+        for i in range(5):
+            await buffer.put('messages', {'n': i})
+
+        await db['messages'].entered.wait()
+        task = buffer._task
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert [doc['n'] for doc in buffer._pending['messages']] == [0, 1, 2, 3, 4]
+        assert buffer.stats()['pending'] == 5
+
+        db['messages'].gate.set()
+        await buffer.stop()
+        assert sorted(doc['n'] for doc in db['messages'].docs) == [0, 1, 2, 3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_put_waits_for_space_when_the_buffer_is_full():
+    async def scenario():
+        db = FakeDB()
+        buffer = WriteBehindBuffer(db, max_batch=100, flush_interval=60, max_pending=2)
+        await buffer.start()
+        await buffer.put('ai_chats', {'n': 0})
+        await buffer.put('ai_chats', {'n': 1})
+
+        blocked = asyncio.create_task(buffer.put('ai_chats', {'n': 2}))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        assert await buffer.flush() == 2
+        await asyncio.wait_for(blocked, 1)
+        assert buffer.stats()['pending'] == 1
+        await buffer.stop()
+        assert [doc['n'] for doc in db['ai_chats'].docs] == [0, 1, 2]
+
+    asyncio.run(scenario())